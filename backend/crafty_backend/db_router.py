@@ -0,0 +1,105 @@
+"""
+Primary/replica routing with read-your-writes stickiness.
+
+- Reads go to a replica only inside a GET/HEAD request to a view that opts in with
+  ``read_replica = True``; everything else (other views, Celery, shell) uses ``default``.
+- Writes always go to ``default``. Once a request has written, its remaining reads use
+  ``default``, and the response sets a short-lived cookie that keeps the visitor's reads
+  on ``default`` for READ_YOUR_WRITES_WINDOW seconds, longer than the replica lag.
+
+To exercise it locally, point two SQLite files at ``default`` and ``replica1``, set
+READ_REPLICAS = ["replica1"] and run ``migrate --database replica1`` as well. The tests
+(crafty_backend/tests.py) use a ``replica`` alias that mirrors the test database.
+"""
+import random
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+READ_REPLICAS = list(getattr(settings, "READ_REPLICAS", []))
+READ_YOUR_WRITES_WINDOW = getattr(settings, "READ_YOUR_WRITES_WINDOW", 10)  # seconds
+PIN_COOKIE = "db_primary_until"
+# Never read from a replica: a lagging session row would look missing and log the visitor out.
+PRIMARY_ONLY_APPS = {"sessions"}
+
+_use_replica = ContextVar("use_replica", default=False)
+_wrote = ContextVar("wrote", default=False)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if (
+            READ_REPLICAS and _use_replica.get() and not _wrote.get()
+            and model._meta.app_label not in PRIMARY_ONLY_APPS
+        ):
+            return random.choice(READ_REPLICAS)
+        return "default"
+
+    def db_for_write(self, model, **hints):
+        _wrote.set(True)
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # replicas hold the same data as default
+        return True
+
+
+def _pinned(request):
+    try:
+        return float(request.COOKIES.get(PIN_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Must sit above SessionMiddleware so the session save counts as a write.
+    The flags are context variables, which sync_to_async carries to the ORM's
+    thread and back, so async views route the same way.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        replica_token = _use_replica.set(False)
+        wrote_token = _wrote.set(False)
+        try:
+            return self._pin(request, self.get_response(request))
+        finally:
+            _use_replica.reset(replica_token)
+            _wrote.reset(wrote_token)
+
+    async def __acall__(self, request):
+        replica_token = _use_replica.set(False)
+        wrote_token = _wrote.set(False)
+        try:
+            return self._pin(request, await self.get_response(request))
+        finally:
+            _use_replica.reset(replica_token)
+            _wrote.reset(wrote_token)
+
+    def _pin(self, request, response):
+        if _wrote.get() or request.method not in ("GET", "HEAD", "OPTIONS"):
+            response.set_cookie(
+                PIN_COOKIE, str(time.time() + READ_YOUR_WRITES_WINDOW),
+                max_age=READ_YOUR_WRITES_WINDOW, httponly=True, samesite="Lax",
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view_class = getattr(view_func, "view_class", None)
+        if (
+            request.method in ("GET", "HEAD")
+            and getattr(view_class, "read_replica", False)
+            and not _pinned(request)
+        ):
+            _use_replica.set(True)
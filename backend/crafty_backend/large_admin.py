@@ -0,0 +1,68 @@
+"""
+Django admin settings for tables with millions of rows (orders, products, users).
+
+- EstimatedCountPaginator: on Postgres, changelist totals come from planner
+  statistics (pg_class.reltuples, or the EXPLAIN row estimate when filtered);
+  an exact COUNT(*) only runs when the estimate is small.
+- LargeTableAdminMixin: that paginator, no second "full result" count, no filter
+  facet counts, and pk lookups for numeric search terms that can use the primary key.
+  Subclasses should keep ``search_fields`` to lookups an index can serve
+  (``=field`` with an UPPER() index, ``field__startswith`` on unique CharFields,
+  ``field__exact``) instead of the default ``icontains``.
+"""
+import json
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.contrib import admin
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+# below this many (estimated) rows an exact COUNT(*) is cheap enough
+ADMIN_EXACT_COUNT_LIMIT = getattr(settings, "ADMIN_EXACT_COUNT_LIMIT", 10000)
+
+
+def estimated_count(queryset):
+    """
+    Planner estimate of ``queryset.count()`` on Postgres, else None.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return None
+    with connection.cursor() as cursor:
+        if not queryset.query.where:
+            cursor.execute("SELECT reltuples FROM pg_class WHERE oid = to_regclass(%s)", [queryset.model._meta.db_table])
+            row = cursor.fetchone()
+            # -1 until the table has been vacuumed/analyzed once
+            return int(row[0]) if row and row[0] >= 0 else None
+        sql, params = queryset.order_by().query.sql_with_params()
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        raw = cursor.fetchone()[0]
+        return int((json.loads(raw) if isinstance(raw, str) else raw)[0]["Plan"]["Plan Rows"])
+
+
+class EstimatedCountPaginator(Paginator):
+    @cached_property
+    def count(self):
+        estimate = estimated_count(self.object_list) if hasattr(self.object_list, "query") else None
+        if estimate is not None and estimate >= ADMIN_EXACT_COUNT_LIMIT:
+            return estimate
+        return super().count
+
+
+class LargeTableAdminMixin:
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    show_facets = admin.ShowFacets.NEVER
+    # numeric search terms also match these integer fields exactly
+    search_pk_fields = ("pk",)
+
+    def get_search_results(self, request, queryset, search_term):
+        results, may_have_duplicates = super().get_search_results(request, queryset, search_term)
+        term = search_term.strip()
+        if term.isdigit() and self.search_pk_fields:
+            results |= queryset.filter(reduce(or_, (Q(**{field: int(term)}) for field in self.search_pk_fields)))
+        return results, may_have_duplicates
@@ -0,0 +1,128 @@
+"""
+Per-request query budget.
+
+Counts SQL queries and DB time for every request on every connection (works with
+DEBUG off) and compares the count against the view's budget:
+
+- ``QUERY_BUDGETS = {"<url name>": n}`` in settings, else
+- a ``query_budget = n`` attribute on the class-based view, else
+- ``QUERY_BUDGET_DEFAULT``.
+
+Over budget logs a warning, or raises QueryBudgetExceeded when QUERY_BUDGET_RAISE
+is set. The counts are left on the request as ``query_count`` / ``query_time``.
+Each app's tests hold every route to its budget (crafty_backend.testing).
+
+Every connection carries one permanent execute wrapper that adds to the counter
+of the current request, held in a context variable. sync_to_async copies it to the
+ORM's thread, so async views are counted too, without extra thread switches.
+"""
+import logging
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(Exception):
+    """
+    A request ran more SQL queries than its view's budget.
+    """
+
+
+class _QueryCounter:
+    def __init__(self):
+        self.count = 0
+        self.time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.time += time.perf_counter() - started
+
+
+_counter = ContextVar("query_counter", default=None)
+
+
+def _count(execute, sql, params, many, context):
+    counter = _counter.get()
+    if counter is None:
+        return execute(sql, params, many, context)
+    return counter(execute, sql, params, many, context)
+
+
+def _install(connection, **kwargs):
+    if _count not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_count)
+
+
+connection_created.connect(_install)
+
+
+def view_query_budget(resolver_match):
+    if resolver_match is None:
+        return None
+    budgets = getattr(settings, "QUERY_BUDGETS", {})
+    if resolver_match.view_name in budgets:
+        return budgets[resolver_match.view_name]
+    view_class = getattr(resolver_match.func, "view_class", None)
+    budget = getattr(view_class, "query_budget", None)
+    if budget is None:
+        budget = getattr(settings, "QUERY_BUDGET_DEFAULT", None)
+    return budget
+
+
+class QueryBudgetMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        # connections opened before this module was imported
+        for connection in connections.all(initialized_only=True):
+            _install(connection)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        counter = _QueryCounter()
+        token = _counter.set(counter)
+        try:
+            response = self.get_response(request)
+        finally:
+            _counter.reset(token)
+        return self._check(request, response, counter)
+
+    async def __acall__(self, request):
+        counter = _QueryCounter()
+        token = _counter.set(counter)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _counter.reset(token)
+        return self._check(request, response, counter)
+
+    def _check(self, request, response, counter):
+        request.query_count, request.query_time = counter.count, counter.time
+        if settings.DEBUG:
+            response["Server-Timing"] = f'db;dur={counter.time * 1000:.1f};desc="{counter.count} queries"'
+
+        budget = view_query_budget(getattr(request, "resolver_match", None))
+        if budget is not None and counter.count > budget:
+            message = (
+                f"{request.method} {request.path} ({request.resolver_match.view_name}) ran "
+                f"{counter.count} queries in {counter.time * 1000:.1f}ms, budget {budget}"
+            )
+            if getattr(settings, "QUERY_BUDGET_RAISE", False):
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 import os
 from pathlib import Path
 from dotenv import load_dotenv
+from celery.schedules import crontab
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 load_dotenv(BASE_DIR / ".env")
@@ -50,6 +51,10 @@ AUTH_USER_MODEL = "users.User"
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    # counts SQL per request against the view's query budget (crafty_backend/query_budget.py)
+    'crafty_backend.query_budget.QueryBudgetMiddleware',
+    # above SessionMiddleware: session saves count as writes for read-your-writes pinning
+    'crafty_backend.db_router.ReplicaRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -93,6 +98,24 @@ DATABASES = {
     }
 }
 
+# Read replicas: comma-separated hosts, e.g. POSTGRES_REPLICA_HOSTS=db-ro-1,db-ro-2.
+# Catalog views (read_replica = True) read from them; see crafty_backend/db_router.py.
+READ_REPLICAS = []
+for i, host in enumerate(filter(None, os.getenv("POSTGRES_REPLICA_HOSTS", "").split(",")), start=1):
+    DATABASES[f"replica{i}"] = {**DATABASES["default"], "HOST": host.strip()}
+    READ_REPLICAS.append(f"replica{i}")
+DATABASE_ROUTERS = ["crafty_backend.db_router.ReplicaRouter"]
+# Tests run with crafty_backend.test_settings, which adds a mirrored "replica" alias.
+READ_YOUR_WRITES_WINDOW = 10  # seconds a visitor's reads stay on the primary after a write
+
+# Query budgets: requests over budget log a warning (raise when QUERY_BUDGET_RAISE is set).
+# Per-URL ceilings by url name override the view's own ``query_budget``.
+QUERY_BUDGET_DEFAULT = 30
+QUERY_BUDGET_RAISE = os.getenv("QUERY_BUDGET_RAISE", "False") == "True"
+QUERY_BUDGETS = {
+    "admin:index": 20,
+}
+
 
 
 # Password validation
@@ -172,3 +195,35 @@ SITE_NAME = "Crafty"
 # CELERY_RESULT_BACKEND = "redis://localhost:6379/0"
 CELERY_TASK_ALWAYS_EAGER = True
 CELERY_TASK_EAGER_PROPAGATES = True
+CELERY_BEAT_SCHEDULE = {
+    # buyer status digests whose window has passed; the only sender when tasks run eagerly
+    "flush-order-status-digests": {"task": "orders.tasks.flush_status_digests", "schedule": 60.0},
+    # safety net for stock held by abandoned checkouts
+    "release-expired-stock-reservations": {"task": "orders.tasks.release_expired_stock_reservations", "schedule": 60.0},
+    # abandoned pending orders + expired sessions, in bounded batches
+    "reap-stale-rows": {"task": "orders.tasks.reap_stale_rows_task", "schedule": 3600.0},
+    # nightly repair of the seller dashboard rollups
+    "backfill-sales-rollups": {"task": "orders.tasks.backfill_sales_rollups", "schedule": crontab(hour=2, minute=30)},
+    # payments stored by verify/webhooks but not yet checked against the gateway
+    "reconcile-received-payments": {"task": "orders.tasks.reconcile_received_payments", "schedule": 300.0},
+    # payments of orders cancelled because an item sold out before the payment landed
+    "refund-pending-payments": {"task": "orders.tasks.refund_pending_payments", "schedule": 900.0},
+}
+
+# Payment gateway: "razorpay" (default) or "fake" for offline checkout load tests
+PAYMENT_GATEWAY = os.getenv("PAYMENT_GATEWAY", "razorpay")
+PAYMENT_GATEWAY_TIMEOUT = (3.05, 10)  # (connect, read) seconds
+PAYMENT_GATEWAY_POOL_SIZE = 20
+PAYMENT_GATEWAY_MAX_RETRIES = 2
+# Signs Razorpay webhook deliveries (Dashboard -> Webhooks)
+RAZORPAY_WEBHOOK_SECRET = os.getenv("RAZORPAY_WEBHOOK_SECRET", "")
+
+# Stock held by a pending order while the buyer pays (seconds)
+STOCK_RESERVATION_TTL = 15 * 60
+# Abandoned (still pending) orders are deleted after this many seconds
+PENDING_ORDER_TTL = 24 * 60 * 60
+
+# Cart storage for anonymous visitors: "session" (default), "cache" (needs a shared CACHES
+# backend) or "redis" (hash per cart). Logged-in buyers always use the durable DB cart.
+CART_STORE = os.getenv("CART_STORE", "session")
+CART_REDIS_URL = os.getenv("CART_REDIS_URL", "redis://localhost:6379/1")
@@ -0,0 +1,13 @@
+"""
+Settings for the test suite:
+
+    python manage.py test --settings=crafty_backend.test_settings
+
+or ``DJANGO_SETTINGS_MODULE=crafty_backend.test_settings`` for other runners.
+"""
+from .settings import *  # noqa: F401,F403
+from .settings import DATABASES
+
+# A "replica" alias that mirrors the test database: same data, separate
+# connection, so the replica routing tests can see where a query went.
+DATABASES["replica"] = {**DATABASES["default"], "TEST": {"MIRROR": "default"}}
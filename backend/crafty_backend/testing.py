@@ -0,0 +1,104 @@
+"""
+Shared test helpers.
+
+QueryBudgetTestCase requests every named route of an app's URLconf against a
+seeded marketplace and fails when a route runs more SQL queries than its view's
+budget (crafty_backend.query_budget). ``transaction.on_commit`` work the request
+queues is run and counted too, as it would be outside the test transaction.
+"""
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, URLResolver, get_resolver, reverse
+
+from crafty_backend.query_budget import view_query_budget
+from market.seeding import seed_marketplace
+
+# TestCase wraps each view's transaction in a savepoint; in production that is a plain BEGIN/COMMIT
+_TEST_ONLY_SQL = ("SAVEPOINT", "RELEASE SAVEPOINT", "ROLLBACK TO SAVEPOINT")
+
+
+def route_names(urlconf):
+    """
+    Every named route of ``urlconf``, including the ones it includes.
+    """
+    names = set()
+    for pattern in get_resolver(urlconf).url_patterns:
+        if isinstance(pattern, URLPattern) and pattern.name:
+            names.add(pattern.name)
+        elif isinstance(pattern, URLResolver):
+            names |= route_names(pattern.urlconf_name)
+    return names
+
+
+class QueryBudgetTestCase(TestCase):
+    """
+    Subclasses set ``routes`` (route names that must all have a case, usually
+    ``route_names("<app>.urls")``), implement ``cases()`` and call
+    ``assertRoutesWithinBudget()`` from a test.
+    """
+
+    routes = ()
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = seed_marketplace(sellers=6, buyers=3, products=72, order_items=100, days=30, seed=0)
+
+    def setUp(self):
+        cache.clear()
+        self.clients = {None: Client(), "buyer": Client(), "seller": Client()}
+        self.clients["buyer"].force_login(self.data["buyer"])
+        self.clients["seller"].force_login(self.data["seller"])
+        # carts with a line in them, so cart and checkout pages do their real work
+        with self.captureOnCommitCallbacks(execute=True):
+            for who in (None, "buyer"):
+                self.clients[who].post(reverse("add_to_cart", args=[self.data["product"].pk]), {"qty": 1})
+
+    def cases(self):
+        """
+        ``(route name, args, method, who, POST data)`` per route; ``who`` is None,
+        "buyer" or "seller", and string POST data is sent as a JSON body.
+        """
+        return []
+
+    def _request(self, client, method, url, post_data, **extra):
+        if method == "get":
+            return client.get(url, **extra)
+        if isinstance(post_data, str):
+            return client.post(url, post_data, content_type="application/json", **extra)
+        return client.post(url, post_data, **extra)
+
+    def measure(self, name, args=(), method="get", who=None, post_data=None, **extra):
+        """
+        Request the route; returns (response, queries including on_commit work).
+        """
+        with CaptureQueriesContext(connection) as queries:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self._request(self.clients[who], method, reverse(name, args=args), post_data, **extra)
+        count = sum(1 for q in queries.captured_queries if not q["sql"].startswith(_TEST_ONLY_SQL))
+        return response, count
+
+    def assertWithinBudget(self, name, args=(), method="get", who=None, post_data=None, **extra):
+        """
+        Request one route in a subTest; returns the response (None if the request failed).
+        """
+        response = None
+        with self.subTest(name):
+            response, count = self.measure(name, args, method, who, post_data, **extra)
+            self.assertLess(response.status_code, 500)
+            request = response.wsgi_request
+            budget = view_query_budget(request.resolver_match)
+            self.assertIsNotNone(budget)
+            self.assertLessEqual(count, budget, f"{name}: {count} queries, budget {budget}")
+            # what QueryBudgetMiddleware sees: no on_commit work, but the test's savepoints
+            self.assertLessEqual(request.query_count, budget, f"{name}: middleware counted {request.query_count}")
+        return response
+
+    def assertRoutesWithinBudget(self):
+        cases = self.cases()
+        self.assertEqual(sorted(set(self.routes) - {case[0] for case in cases}), [], "routes without a budget case")
+        for name, args, method, who, post_data in cases:
+            self.assertWithinBudget(name, args, method, who, post_data)
+            if name == "logout":
+                self.clients[who].force_login(self.data[who])
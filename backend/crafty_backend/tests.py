@@ -0,0 +1,120 @@
+import time
+from unittest import mock, skipUnless
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.models import Session
+from django.db import connections
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import ResolverMatch, reverse
+from django.views import View
+
+from market.models import Product
+from . import db_router
+from .query_budget import view_query_budget
+from .testing import QueryBudgetTestCase
+from .db_router import PIN_COOKIE, READ_YOUR_WRITES_WINDOW, ReplicaRouter, _use_replica, _wrote
+
+User = get_user_model()
+
+
+@skipUnless("replica" in settings.DATABASES, "needs the 'replica' alias from crafty_backend.test_settings")
+class ReplicaRoutingTests(TransactionTestCase):
+    """
+    ``replica`` mirrors ``default`` in tests: same data, separate connection, so the
+    queries captured on each connection show where a read was routed.
+    """
+
+    databases = {"default", "replica"}
+
+    def setUp(self):
+        patcher = mock.patch.object(db_router, "READ_REPLICAS", ["replica"])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        seller = User.objects.create_user("weaver", password="pw", user_type=User.SELLER)
+        self.product = Product.objects.create(seller=seller, title="Cotton rug", description="Handloom.", price=900)
+
+    def _product_reads(self, path):
+        """
+        GET ``path``; returns (product queries on default, product queries on replica).
+        """
+        table = Product._meta.db_table
+        with CaptureQueriesContext(connections["default"]) as primary, \
+                CaptureQueriesContext(connections["replica"]) as replica:
+            response = self.client.get(path)
+        self.assertEqual(response.status_code, 200)
+        return (
+            [q for q in primary.captured_queries if table in q["sql"]],
+            [q for q in replica.captured_queries if table in q["sql"]],
+        )
+
+    def test_read_replica_view_reads_from_replica(self):
+        primary, replica = self._product_reads(reverse("product_list"))
+        self.assertEqual(primary, [])
+        self.assertNotEqual(replica, [])
+
+    def test_write_pins_reads_to_primary(self):
+        response = self.client.post(reverse("add_to_cart", args=[self.product.pk]), {"qty": 1})
+        self.assertIn(PIN_COOKIE, response.cookies)
+
+        primary, replica = self._product_reads(reverse("product_list"))
+        self.assertNotEqual(primary, [])
+        self.assertEqual(replica, [])
+
+    def test_pin_expires_after_the_window(self):
+        self.client.post(reverse("add_to_cart", args=[self.product.pk]), {"qty": 1})
+        later = time.time() + READ_YOUR_WRITES_WINDOW + 1
+        with mock.patch("crafty_backend.db_router.time.time", return_value=later):
+            primary, replica = self._product_reads(reverse("product_list"))
+        self.assertEqual(primary, [])
+        self.assertNotEqual(replica, [])
+
+    def test_write_in_request_context_pins_later_reads(self):
+        router = ReplicaRouter()
+        replica_token, wrote_token = _use_replica.set(True), _wrote.set(False)
+        try:
+            self.assertEqual(router.db_for_read(Product), "replica")
+            self.assertEqual(router.db_for_read(Session), "default")
+            self.assertEqual(router.db_for_write(Product), "default")
+            self.assertEqual(router.db_for_read(Product), "default")
+        finally:
+            _use_replica.reset(replica_token)
+            _wrote.reset(wrote_token)
+
+
+class ProjectQueryBudgetTests(QueryBudgetTestCase):
+    routes = ("home", "about", "help_center", "shipping", "seller_dashboard")
+
+    def cases(self):
+        return [
+            ("home", [], "get", None, None),
+            ("home", [], "get", "buyer", None),
+            ("about", [], "get", None, None),
+            ("about", [], "get", "buyer", None),
+            ("help_center", [], "get", None, None),
+            ("help_center", [], "get", "buyer", None),
+            ("shipping", [], "get", None, None),
+            ("shipping", [], "get", "buyer", None),
+            ("seller_dashboard", [], "get", "seller", None),
+        ]
+
+    def test_routes_within_query_budget(self):
+        self.assertRoutesWithinBudget()
+
+
+class ViewQueryBudgetTests(SimpleTestCase):
+    def _match(self, budget):
+        view = type("BudgetView", (View,), {"query_budget": budget}).as_view()
+        return ResolverMatch(view, (), {}, url_name="budget_view")
+
+    @override_settings(QUERY_BUDGET_DEFAULT=30, QUERY_BUDGETS={})
+    def test_view_budget_overrides_default(self):
+        self.assertEqual(view_query_budget(self._match(3)), 3)
+        # a view that must not touch the database keeps its zero budget
+        self.assertEqual(view_query_budget(self._match(0)), 0)
+        self.assertEqual(view_query_budget(self._match(None)), 30)
+
+    @override_settings(QUERY_BUDGET_DEFAULT=30, QUERY_BUDGETS={"budget_view": 0})
+    def test_settings_budget_overrides_view(self):
+        self.assertEqual(view_query_budget(self._match(3)), 0)
@@ -1,5 +1,11 @@
 from django.contrib import admin
+from django.contrib.postgres.search import SearchQuery
+from django.db.models import Q
+
+from crafty_backend.large_admin import LargeTableAdminMixin
+
 from .models import ArtistProfile, Category, Product, ProductImage
+from .search import SEARCH_CONFIG, is_fulltext_enabled
 
 
 # Register your models here.
@@ -7,7 +13,9 @@ from .models import ArtistProfile, Category, Product, ProductImage
 @admin.register(ArtistProfile)
 class ArtistProfileAdmin(admin.ModelAdmin):
     list_display = ("display_name", "user", "city", "contact_number")
-    search_fields = ("display_name", "user__username", "city")
+    list_select_related = ("user",)
+    autocomplete_fields = ("user",)
+    search_fields = ("display_name", "=user__username", "city")
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
@@ -18,6 +26,22 @@ class ProductImageInline(admin.TabularInline):
     extra = 1
 
 @admin.register(Product)
-class ProductAdmin(admin.ModelAdmin):
+class ProductAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display = ("title", "seller", "price", "is_active", "created_at", "updated_at")
-    inlines = [ProductImageInline]
\ No newline at end of file
+    list_select_related = ("seller",)
+    autocomplete_fields = ("seller",)
+    ordering = ("-pk",)
+    # plus full-text on the search vector (get_search_results); numeric terms match the id
+    search_fields = ("slug__startswith",)
+    inlines = [ProductImageInline]
+
+    def get_search_results(self, request, queryset, search_term):
+        results, may_have_duplicates = super().get_search_results(request, queryset, search_term)
+        term = search_term.strip()
+        if term:
+            if is_fulltext_enabled():
+                match = Q(search_vector=SearchQuery(term, search_type="websearch", config=SEARCH_CONFIG))
+            else:
+                match = Q(title__icontains=term)
+            results |= queryset.filter(match)
+        return results, may_have_duplicates
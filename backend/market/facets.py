@@ -0,0 +1,67 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+from .models import Category, Product
+
+FACET_CACHE_TTL = getattr(settings, "FACET_CACHE_TTL", 60 * 60)  # seconds; invalidation is explicit
+FACET_VERSION_KEY = "market:facets:version"
+
+
+def _facet_version():
+    version = cache.get(FACET_VERSION_KEY)
+    if version is None:
+        cache.add(FACET_VERSION_KEY, 1, None)
+        version = cache.get(FACET_VERSION_KEY, 1)
+    return version
+
+
+def bump_facet_version():
+    """
+    Invalidate every cached facet payload. Old keys just age out of the cache.
+    """
+    try:
+        cache.incr(FACET_VERSION_KEY)
+    except ValueError:
+        cache.add(FACET_VERSION_KEY, 1, None)
+
+
+def build_facets():
+    """
+    Categories and cities for the product list sidebar, with active-product counts.
+    """
+    categories = [
+        {"name": c.name, "slug": c.slug, "product_count": c.product_count}
+        for c in Category.objects.annotate(
+            product_count=Count("product", filter=Q(product__is_active=True))
+        ).order_by("name")
+    ]
+
+    # cities are free text on ArtistProfile: merge case variants like the old .title() did
+    city_counts = {}
+    rows = (
+        Product.objects.filter(is_active=True)
+        .exclude(seller__artist_profile__city__isnull=True)
+        .exclude(seller__artist_profile__city__exact="")
+        .values_list("seller__artist_profile__city")
+        .annotate(n=Count("id"))
+        .order_by()
+    )
+    for city, n in rows:
+        name = city.strip().title()
+        city_counts[name] = city_counts.get(name, 0) + n
+    cities = [{"name": name, "product_count": n} for name, n in sorted(city_counts.items())]
+
+    return {"categories": categories, "cities": cities}
+
+
+def get_facets():
+    """
+    Cached facet payload; a warm cache costs two cache reads and no queries.
+    """
+    key = f"market:facets:v{_facet_version()}"
+    facets = cache.get(key)
+    if facets is None:
+        facets = build_facets()
+        cache.set(key, facets, FACET_CACHE_TTL)
+    return facets
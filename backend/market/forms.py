@@ -1,5 +1,6 @@
 from django import forms
 from .models import Product, ProductImage, ArtistProfile
+from .importer import import_format
 
 class ProductForm(forms.ModelForm):
     class Meta:
@@ -21,4 +22,20 @@ class ArtistProfileForm(forms.ModelForm):
         widgets = {
             "bio":forms.Textarea(attrs={"rows":4}),
             "display_name": forms.TextInput(attrs={"placeholder":"Your Public Name"}),
-        }
\ No newline at end of file
+        }
+
+class ProductImportForm(forms.Form):
+    data = forms.FileField(label="Products file (CSV or JSONL)")
+    images = forms.FileField(label="Images (ZIP, optional)", required=False)
+
+    def clean_data(self):
+        f = self.cleaned_data["data"]
+        if import_format(f.name) is None:
+            raise forms.ValidationError("Upload a .csv, .jsonl or .ndjson file.")
+        return f
+
+    def clean_images(self):
+        f = self.cleaned_data.get("images")
+        if f and not f.name.lower().endswith(".zip"):
+            raise forms.ValidationError("Images must be uploaded as a .zip file.")
+        return f
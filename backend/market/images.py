@@ -0,0 +1,103 @@
+import io
+import logging
+import os
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+logger = logging.getLogger(__name__)
+
+IMAGE_VARIANT_WIDTHS = tuple(getattr(settings, "IMAGE_VARIANT_WIDTHS", (320, 640, 1024)))
+IMAGE_VARIANT_FORMATS = {
+    # name: (Pillow format, extension, save options)
+    "webp": ("WEBP", "webp", {"quality": 80, "method": 4}),
+    "jpeg": ("JPEG", "jpg", {"quality": 82, "optimize": True, "progressive": True}),
+}
+IMAGE_VARIANT_DIR = "variants"
+
+
+def build_variants(field_file, source, prefix):
+    """
+    Resize ``field_file`` to every configured width (never upscaling) in WebP and JPEG,
+    store the files under ``variants/`` and return the JSON recorded on the image row:
+
+        {"source": <source key>, "webp": {"320": <storage name>, ...}, "jpeg": {...}}
+    """
+    data = {"source": source}
+    try:
+        field_file.open("rb")
+        with Image.open(field_file) as original:
+            original = ImageOps.exif_transpose(original)
+            img = original.convert("RGB")
+    except (UnidentifiedImageError, OSError, ValueError) as e:
+        logger.warning("Cannot build variants for %s: %s", field_file.name, e)
+        data["error"] = True
+        return data
+    finally:
+        field_file.close()
+
+    widths = sorted({w for w in IMAGE_VARIANT_WIDTHS if w < img.width} or {img.width})
+    for name, (fmt, ext, options) in IMAGE_VARIANT_FORMATS.items():
+        data[name] = {}
+        for width in widths:
+            height = max(1, round(img.height * width / img.width))
+            resized = img if width == img.width else img.resize((width, height), Image.LANCZOS)
+            buf = io.BytesIO()
+            resized.save(buf, fmt, **options)
+            path = f"{IMAGE_VARIANT_DIR}/{prefix}-{width}w.{ext}"
+            data[name][str(width)] = default_storage.save(path, ContentFile(buf.getvalue()))
+    return data
+
+
+def delete_variants(variants):
+    for name in IMAGE_VARIANT_FORMATS:
+        for path in (variants or {}).get(name, {}).values():
+            try:
+                default_storage.delete(path)
+            except OSError:
+                pass
+
+
+def variant_prefix(field_file, pk):
+    stem = os.path.splitext(os.path.basename(field_file.name))[0]
+    return f"{stem}-{pk}"
+
+
+class ResponsiveImageMixin:
+    """
+    Template helpers over a JSON ``variants`` field; falls back to the original upload
+    until the background job has produced variants.
+    """
+    variants_field = "variants"
+    image_field = "image"
+
+    def _variants(self):
+        return getattr(self, self.variants_field) or {}
+
+    def _srcset(self, fmt):
+        entries = self._variants().get(fmt) or {}
+        return ", ".join(
+            f"{default_storage.url(path)} {width}w"
+            for width, path in sorted(entries.items(), key=lambda kv: int(kv[0]))
+        )
+
+    @property
+    def webp_srcset(self):
+        return self._srcset("webp")
+
+    @property
+    def jpeg_srcset(self):
+        return self._srcset("jpeg")
+
+    @property
+    def display_url(self):
+        """
+        Smallest JPEG variant (cheap default ``src``), else the original upload.
+        """
+        entries = self._variants().get("jpeg") or {}
+        if entries:
+            return default_storage.url(entries[min(entries, key=int)])
+        image = getattr(self, self.image_field)
+        return image.url if image else ""
@@ -0,0 +1,303 @@
+"""
+Bulk product import from CSV or JSONL, with an optional ZIP of images.
+
+The input is parsed as a stream and validated and inserted in chunks, so memory
+stays flat whatever the file size. Each chunk's images are unpacked, checked and
+stored by a thread pool, then the chunk goes in with one ``bulk_create`` per table
+and batched slug allocation. A row whose fields or images are invalid is skipped
+and reported by line number; the rest of the file still imports.
+
+Columns / keys: ``title``, ``description``, ``price`` (rupees), ``stock``, and
+optionally ``category`` (slug or name), ``is_active``, ``images`` (ZIP member names
+separated by ``|``) and ``alt_text``.
+"""
+import csv
+import io
+import json
+import os
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, transaction
+from PIL import Image, UnidentifiedImageError
+
+from .facets import bump_facet_version
+from .models import Category, Product, ProductImage
+from .product_cache import invalidate_product_detail
+from .search import update_search_vectors
+from .sections import invalidate_sections
+from .slugs import assign_slugs
+
+IMPORT_CHUNK_SIZE = getattr(settings, "PRODUCT_IMPORT_CHUNK_SIZE", 500)
+IMPORT_IMAGE_WORKERS = getattr(settings, "PRODUCT_IMPORT_IMAGE_WORKERS", 4)
+IMPORT_MAX_IMAGES = 6  # per product, as on the product form
+IMPORT_MAX_IMAGE_SIZE = 2 * 1024 * 1024  # as on the product form
+IMPORT_IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp")
+IMPORT_MAX_STOCK = 2147483647  # PositiveIntegerField's upper bound on every database
+MAX_REPORTED_ERRORS = 200
+TRUE_VALUES = ("1", "true", "yes", "y", "on")
+FALSE_VALUES = ("0", "false", "no", "n", "off")
+
+
+class RowError(ValueError):
+    pass
+
+
+def import_format(filename):
+    ext = os.path.splitext(filename or "")[1].lower()
+    return {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl"}.get(ext)
+
+
+def _rows(data, fmt):
+    """
+    Yield ``(line number, dict or RowError)`` from a binary file, one line at a time.
+    """
+    text = io.TextIOWrapper(data, encoding="utf-8-sig", newline="")
+    try:
+        if fmt == "csv":
+            reader = csv.DictReader(text)
+            for row in reader:
+                yield reader.line_num, {k.strip().lower(): (v or "").strip() for k, v in row.items() if k}
+            return
+        for line_no, line in enumerate(text, 1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                yield line_no, RowError(f"invalid JSON: {e}")
+                continue
+            if not isinstance(row, dict):
+                yield line_no, RowError("expected a JSON object")
+                continue
+            yield line_no, {str(k).lower(): v for k, v in row.items()}
+    finally:
+        text.detach()  # leave closing ``data`` to the caller
+
+
+def _text(row, key, max_length=None, required=False):
+    value = row.get(key)
+    value = "" if value is None else str(value).strip()
+    if required and not value:
+        raise RowError(f"{key} is required")
+    if max_length and len(value) > max_length:
+        raise RowError(f"{key} is longer than {max_length} characters")
+    return value
+
+
+def _clean(row, categories):
+    """
+    Validate one row against the Product field rules. Returns (Product, image names, alt text).
+    """
+    title = _text(row, "title", 200, required=True)
+    description = _text(row, "description", required=True)
+    try:
+        price = Decimal(_text(row, "price", required=True)).quantize(Decimal("0.01"))
+    except InvalidOperation:
+        raise RowError("price is not a number")
+    if not price.is_finite():  # "NaN" survives quantize() but not comparisons
+        raise RowError("price is not a number")
+    if price < 0 or price >= Decimal("100000000"):
+        raise RowError("price must be between 0 and 99,999,999.99")
+    try:
+        # not str.isdigit(): it accepts characters like "²" that int() rejects
+        stock = int(_text(row, "stock") or "0")
+    except ValueError:
+        raise RowError("stock must be a whole number >= 0")
+    if not 0 <= stock <= IMPORT_MAX_STOCK:
+        raise RowError(f"stock must be between 0 and {IMPORT_MAX_STOCK:,}")
+    active = _text(row, "is_active").lower() or "true"
+    if active not in TRUE_VALUES + FALSE_VALUES:
+        raise RowError("is_active must be true or false")
+    category = None
+    category_ref = _text(row, "category")
+    if category_ref:
+        category = categories.get(category_ref.lower())
+        if category is None:
+            raise RowError(f"unknown category '{category_ref}'")
+    images = row.get("images")
+    if images is None:
+        images = []
+    elif isinstance(images, str):
+        images = [name.strip() for name in images.split("|") if name.strip()]
+    elif not isinstance(images, list) or not all(isinstance(name, str) for name in images):
+        # JSONL can carry any JSON value here
+        raise RowError("images must be file names separated by '|' or a list of file names")
+    if len(images) > IMPORT_MAX_IMAGES:
+        raise RowError(f"at most {IMPORT_MAX_IMAGES} images per product")
+    product = Product(
+        title=title, description=description, price=price, stock=stock,
+        is_active=active in TRUE_VALUES, category=category,
+    )
+    return product, images, _text(row, "alt_text", 255)
+
+
+class _ImageArchive:
+    """
+    Members of the uploaded ZIP by full name and by base name. ZipFile reads are
+    safe from several threads (they serialize on the underlying file).
+    """
+
+    def __init__(self, fileobj):
+        self.zip = zipfile.ZipFile(fileobj)
+        self.members = {}
+        for info in self.zip.infolist():
+            if not info.is_dir():
+                self.members.setdefault(info.filename, info)
+                self.members.setdefault(os.path.basename(info.filename), info)
+
+    def store(self, name, save=True):
+        """
+        Check one image and save it to storage; returns the storage name.
+        """
+        info = self.members.get(name)
+        if info is None:
+            raise RowError(f"image '{name}' is not in the ZIP")
+        if os.path.splitext(info.filename)[1].lower() not in IMPORT_IMAGE_EXTENSIONS:
+            raise RowError(f"image '{name}': unsupported file type")
+        if info.file_size > IMPORT_MAX_IMAGE_SIZE:
+            raise RowError(f"image '{name}': file too large (max 2MB)")
+        data = self.zip.read(info)
+        try:
+            with Image.open(io.BytesIO(data)) as img:
+                img.verify()
+        except (UnidentifiedImageError, Image.DecompressionBombError, OSError, ValueError):
+            raise RowError(f"image '{name}' is not a valid image")
+        if not save:
+            return name
+        return default_storage.save(f"product/{os.path.basename(info.filename)}", ContentFile(data))
+
+
+def _store_row_images(archive, names, save):
+    stored = []
+    try:
+        for name in names:
+            stored.append(archive.store(name, save))
+    except RowError:
+        if save:
+            for path in stored:
+                default_storage.delete(path)
+        raise
+    return stored
+
+
+def _schedule_variants(image_ids):
+    from .tasks import build_product_image_variants
+    for pk in image_ids:
+        build_product_image_variants.delay(pk)
+
+
+def _insert_chunk(seller, chunk):
+    """
+    Insert ``[(line, product, stored image names, alt text)]``; returns the new
+    (product slugs, image pks). Retried once if a concurrent insert took a slug.
+    """
+    for attempt in range(2):
+        try:
+            with transaction.atomic():
+                products = [product for _, product, _, _ in chunk]
+                for product in products:
+                    product.seller = seller
+                    product.slug = ""
+                Product.objects.bulk_create(assign_slugs(products, "title", 200, fallback="product"))
+                update_search_vectors([p.pk for p in products])
+                images = ProductImage.objects.bulk_create([
+                    ProductImage(product=product, image=path, alt_text=alt_text or product.title, order=i)
+                    for _, product, paths, alt_text in chunk for i, path in enumerate(paths)
+                ])
+                image_ids = [img.pk for img in images]
+                if image_ids:
+                    transaction.on_commit(lambda: _schedule_variants(image_ids), robust=True)
+            return [p.slug for p in products], image_ids
+        except IntegrityError:
+            if attempt:
+                raise
+
+
+def import_products(seller, data, fmt, images=None, chunk_size=IMPORT_CHUNK_SIZE, workers=IMPORT_IMAGE_WORKERS,
+                    dry_run=False, log=None):
+    """
+    Import products for ``seller`` from the binary file ``data`` (``fmt`` "csv" or
+    "jsonl") and the optional ZIP file ``images``. Returns a report::
+
+        {"rows", "created", "images", "failed", "errors": [(line, message), ...], "seconds", "rows_per_second"}
+
+    With ``dry_run`` every row is validated (images included) but nothing is stored.
+    """
+    log = log or (lambda message: None)
+    started = time.perf_counter()
+    categories = {}
+    for category in Category.objects.all():
+        categories[category.name.lower()] = category
+        categories[category.slug.lower()] = category
+    archive = _ImageArchive(images) if images is not None else None
+    report = {"rows": 0, "created": 0, "images": 0, "failed": 0, "errors": []}
+
+    def fail(line, message):
+        report["failed"] += 1
+        if len(report["errors"]) < MAX_REPORTED_ERRORS:
+            report["errors"].append((line, message))
+
+    def flush(chunk, pool):
+        futures = [
+            (row, pool.submit(_store_row_images, archive, row[2], not dry_run) if archive is not None else None)
+            for row in chunk
+        ]
+        ready = []
+        for (line, product, names, alt_text), future in futures:
+            try:
+                if future is not None:
+                    paths = future.result()
+                elif names:
+                    raise RowError("the row lists images but no ZIP was uploaded")
+                else:
+                    paths = []
+            except RowError as e:
+                fail(line, str(e))
+                continue
+            ready.append((line, product, paths, alt_text))
+        if ready and not dry_run:
+            try:
+                slugs, image_ids = _insert_chunk(seller, ready)
+            except Exception:
+                for _, _, paths, _ in ready:
+                    for path in paths:
+                        default_storage.delete(path)
+                raise
+            invalidate_product_detail(slugs=slugs)  # may hold a cached "not found"
+            report["images"] += len(image_ids)
+        report["created"] += len(ready)
+        elapsed = time.perf_counter() - started
+        log(f"{report['rows']} rows, {report['created']} imported, {report['failed']} failed "
+            f"({report['rows'] / elapsed:.0f} rows/s)")
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        chunk = []
+        for line, row in _rows(data, fmt):
+            report["rows"] += 1
+            try:
+                if isinstance(row, RowError):
+                    raise row
+                product, names, alt_text = _clean(row, categories)
+            except RowError as e:
+                fail(line, str(e))
+                continue
+            chunk.append((line, product, names, alt_text))
+            if len(chunk) >= chunk_size:
+                flush(chunk, pool)
+                chunk = []
+        if chunk:
+            flush(chunk, pool)
+
+    if report["created"] and not dry_run:
+        # what the per-row save() signals would have done, once for the whole import
+        invalidate_sections("featured", "trending", "top_artisans")
+        bump_facet_version()
+    report["seconds"] = round(time.perf_counter() - started, 2)
+    report["rows_per_second"] = round(report["rows"] / report["seconds"]) if report["seconds"] else report["rows"]
+    return report
@@ -0,0 +1,191 @@
+import asyncio
+import importlib.util
+import json
+import os
+import socket
+import string
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.urls import reverse
+from django.utils.crypto import get_random_string
+
+from market.models import Product
+
+from .benchmark_views import _percentiles
+
+User = get_user_model()
+
+# {port}, {workers} and {threads} are filled in per run
+SERVERS = {
+    "asgi": ("uvicorn", [
+        "crafty_backend.asgi:application", "--host", "127.0.0.1", "--port", "{port}",
+        "--workers", "{workers}", "--no-access-log", "--log-level", "warning",
+    ]),
+    "wsgi": ("gunicorn", [
+        "crafty_backend.wsgi:application", "--bind", "127.0.0.1:{port}",
+        "--workers", "{workers}", "--threads", "{threads}", "--log-level", "warning",
+    ]),
+}
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _start(server, port, workers, threads):
+    module, args = SERVERS[server]
+    command = [sys.executable, "-m", module] + [
+        arg.format(port=port, workers=workers, threads=threads) for arg in args
+    ]
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE=settings.SETTINGS_MODULE)
+    process = subprocess.Popen(command, cwd=settings.BASE_DIR, env=env, stderr=subprocess.PIPE, text=True)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise CommandError(f"{module} exited: {process.stderr.read()[-2000:]}")
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return process
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise CommandError(f"{module} did not start listening on port {port}.")
+
+
+def _stop(process):
+    process.terminate()
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+def _raw_request(method, path, host, headers, body=b""):
+    lines = [f"{method} {path} HTTP/1.1", f"Host: {host}", "Connection: close", f"Content-Length: {len(body)}"]
+    lines += [f"{name}: {value}" for name, value in headers.items()]
+    return ("\r\n".join(lines) + "\r\n\r\n").encode() + body
+
+
+async def _one(port, payload):
+    # one connection per request: gunicorn's workers close the connection anyway
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    try:
+        writer.write(payload)
+        await writer.drain()
+        response = await reader.read()
+    finally:
+        writer.close()
+    return int(response.split(b" ", 2)[1]) if response.startswith(b"HTTP/") else 0
+
+
+async def _load(port, payload, concurrency, duration):
+    """
+    ``concurrency`` clients sending ``payload`` back to back for ``duration`` seconds.
+    Returns (latencies in ms of the 2xx/3xx responses, error count).
+    """
+    latencies, errors = [], 0
+    deadline = time.perf_counter() + duration
+
+    async def client():
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                status = await _one(port, payload)
+            except OSError:
+                status = 0
+            if 200 <= status < 400:
+                latencies.append((time.perf_counter() - started) * 1000)
+            else:
+                errors += 1
+
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return latencies, errors
+
+
+class Command(BaseCommand):
+    help = (
+        "Start the app under uvicorn (ASGI) and gunicorn (WSGI) in turn and load the async "
+        "cart and catalog endpoints, reporting requests per second and latency for each. "
+        "Run it against a seeded scratch database: the add-to-cart case writes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--servers", nargs="*", choices=sorted(SERVERS), default=["asgi", "wsgi"])
+        parser.add_argument("--workers", type=int, default=2, help="server worker processes")
+        parser.add_argument("--threads", type=int, default=4, help="threads per gunicorn worker")
+        parser.add_argument("--concurrency", type=int, default=32, help="concurrent client connections")
+        parser.add_argument("--duration", type=float, default=5.0, help="seconds per endpoint")
+        parser.add_argument("--warmup", type=float, default=1.0, help="untimed seconds per endpoint first")
+        parser.add_argument("--save", help="write the results to this JSON file")
+
+    def _cases(self):
+        product = Product.objects.filter(is_active=True).order_by("-pk").first()
+        buyer = User.objects.filter(user_type=User.BUYER).order_by("pk").first()
+        if product is None or buyer is None:
+            raise CommandError("Needs products and a buyer; run `manage.py seed_marketplace` first.")
+        client = Client()
+        client.force_login(buyer)
+        session = client.cookies[settings.SESSION_COOKIE_NAME].value
+        csrf = get_random_string(32, string.ascii_letters + string.digits)
+        logged_in = {"Cookie": f"{settings.SESSION_COOKIE_NAME}={session}; {settings.CSRF_COOKIE_NAME}={csrf}"}
+        return [
+            ("cart_count (anonymous)", "GET", reverse("cart_count"), {}, b""),
+            ("cart_count (buyer)", "GET", reverse("cart_count"), logged_in, b""),
+            ("add_to_cart (buyer)", "POST", reverse("add_to_cart", args=[product.pk]), {
+                **logged_in, "X-CSRFToken": csrf, "X-Requested-With": "XMLHttpRequest",
+                "Content-Type": "application/x-www-form-urlencoded",
+            }, b"qty=1"),
+            ("product_list_json", "GET", reverse("product_list_json"), {}, b""),
+        ]
+
+    def handle(self, *args, **options):
+        servers = [s for s in options["servers"] if importlib.util.find_spec(SERVERS[s][0]) is not None]
+        for server in set(options["servers"]) - set(servers):
+            self.stdout.write(self.style.WARNING(f"Skipping {server}: {SERVERS[server][0]} is not installed."))
+        if not servers:
+            raise CommandError("No server to benchmark.")
+        host = next((h for h in settings.ALLOWED_HOSTS if h not in ("*",) and not h.startswith(".")), "localhost")
+        cases = self._cases()
+
+        results = {}
+        self.stdout.write(f"{'endpoint':26} {'server':>6} {'req/s':>9} {'p50':>9} {'p99':>9} {'errors':>7}")
+        for server in servers:
+            port = _free_port()
+            process = _start(server, port, options["workers"], options["threads"])
+            try:
+                for label, method, path, headers, body in cases:
+                    payload = _raw_request(method, path, host, headers, body)
+                    asyncio.run(_load(port, payload, options["concurrency"], options["warmup"]))
+                    latencies, errors = asyncio.run(
+                        _load(port, payload, options["concurrency"], options["duration"])
+                    )
+                    p50, _, p99 = _percentiles(latencies)
+                    rps = len(latencies) / options["duration"]
+                    results.setdefault(label, {})[server] = {
+                        "rps": round(rps, 1), "p50_ms": round(p50, 2), "p99_ms": round(p99, 2), "errors": errors,
+                    }
+                    self.stdout.write(f"{label:26} {server:>6} {rps:9.1f} {p50:7.1f}ms {p99:7.1f}ms {errors:>7}")
+            finally:
+                _stop(process)
+
+        if len(servers) == 2:
+            for label, by_server in results.items():
+                wsgi = by_server["wsgi"]["rps"]
+                self.stdout.write(f"{label:26} asgi/wsgi {by_server['asgi']['rps'] / (wsgi or 1):.2f}x")
+        if options["save"]:
+            with open(options["save"], "w") as fh:
+                json.dump({
+                    "workers": options["workers"], "threads": options["threads"],
+                    "concurrency": options["concurrency"], "duration": options["duration"], "endpoints": results,
+                }, fh, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Saved results to {options['save']}."))
@@ -0,0 +1,142 @@
+import json
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.urls import reverse
+
+from market.models import ArtistProfile, Category, Product
+from orders.models import Order, SellerOrderSummary
+
+User = get_user_model()
+
+
+def _targets():
+    """
+    Rows the benchmark requests, picked from the current database (seed it first).
+    """
+    product = (
+        Product.objects.filter(is_active=True, images__isnull=False, seller__artist_profile__isnull=False)
+        .select_related("seller__artist_profile").order_by("-pk").first()
+    )
+    if product is None:
+        raise CommandError("No active product with images; run `manage.py seed_marketplace` first.")
+    order = Order.objects.exclude(status=Order.STATUS_PENDING).filter(buyer__isnull=False).order_by("-pk").first()
+    summary = SellerOrderSummary.objects.filter(seller=product.seller).order_by("-order_created_at").first()
+    return {
+        "product": product,
+        "seller": product.seller,
+        "buyer": order.buyer if order else User.objects.filter(user_type=User.BUYER).first(),
+        "order": order,
+        "seller_order_id": summary.order_id if summary else None,
+        "city": product.seller.artist_profile.city or "Jaipur",
+        "category": Category.objects.values_list("slug", flat=True).first() or "",
+    }
+
+
+def _cases(t):
+    """
+    (label, url, who) for the main read paths; ``who`` is None, "buyer" or "seller".
+    """
+    product_list = reverse("product_list")
+    cases = [
+        ("home", reverse("home"), None),
+        ("product_list", product_list, None),
+        ("product_list ?sort=asc", f"{product_list}?sort=asc", None),
+        ("product_list ?city", f"{product_list}?city={t['city']}", None),
+        ("product_list ?category", f"{product_list}?category={t['category']}", None),
+        ("product_list ?q", f"{product_list}?q=terracotta", None),
+        ("product_detail", reverse("product_detail", args=[t["product"].slug]), None),
+        ("artist_profile_detail", reverse("artist_profile_detail", args=[t["seller"].artist_profile.slug]), "buyer"),
+        ("cart", reverse("cart"), "buyer"),
+        ("cart_count", reverse("cart_count"), "buyer"),
+        ("checkout", reverse("checkout"), "buyer"),
+        ("buyer_order_list", reverse("buyer_order_list"), "buyer"),
+        ("seller_products", reverse("seller_products"), "seller"),
+        ("seller_order_list", reverse("seller_order_list"), "seller"),
+        ("seller_dashboard", reverse("seller_dashboard"), "seller"),
+    ]
+    if t["order"] is not None:
+        cases.append(("buyer_order_detail", reverse("buyer_order_detail", args=[t["order"].pk]), "buyer"))
+    if t["seller_order_id"] is not None:
+        cases.append(("seller_order_detail", reverse("seller_order_detail", args=[t["seller_order_id"]]), "seller"))
+    return cases
+
+
+def _percentiles(values):
+    if len(values) < 2:
+        return (values or [0.0]) * 3
+    cuts = statistics.quantiles(values, n=100, method="inclusive")
+    return cuts[49], cuts[94], cuts[98]
+
+
+class Command(BaseCommand):
+    help = (
+        "Request the main views through the test client and report p50/p95/p99 latency and "
+        "query counts per route. Save a run with --save and compare later runs with --baseline."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=50, help="timed requests per route")
+        parser.add_argument("--warmup", type=int, default=3, help="untimed requests per route first")
+        parser.add_argument("--only", nargs="*", default=[], help="run only routes whose label contains one of these")
+        parser.add_argument("--save", help="write the results to this JSON file")
+        parser.add_argument("--baseline", help="compare against results saved earlier with --save")
+
+    def handle(self, *args, **options):
+        t = _targets()
+        host = next((h for h in settings.ALLOWED_HOSTS if h not in ("*",) and not h.startswith(".")), "localhost")
+        clients = {who: Client(HTTP_HOST=host) for who in (None, "buyer", "seller")}
+        clients["seller"].force_login(t["seller"])
+        if t["buyer"] is not None:
+            clients["buyer"].force_login(t["buyer"])
+            clients["buyer"].post(reverse("add_to_cart", args=[t["product"].pk]), {"qty": 1})
+
+        baseline = {}
+        if options["baseline"]:
+            with open(options["baseline"]) as fh:
+                baseline = json.load(fh)["routes"]
+
+        results = {}
+        self.stdout.write(f"{'route':32} {'status':>6} {'p50':>8} {'p95':>8} {'p99':>8} {'queries':>8}")
+        for label, url, who in _cases(t):
+            if options["only"] and not any(part in label for part in options["only"]):
+                continue
+            client = clients[who]
+            for _ in range(options["warmup"]):
+                client.get(url)
+            latencies, queries = [], []
+            for _ in range(options["requests"]):
+                started = time.perf_counter()
+                response = client.get(url)
+                latencies.append((time.perf_counter() - started) * 1000)
+                # set by crafty_backend.query_budget.QueryBudgetMiddleware
+                queries.append(getattr(response.wsgi_request, "query_count", 0))
+            p50, p95, p99 = _percentiles(latencies)
+            results[label] = {
+                "status": response.status_code, "p50_ms": round(p50, 2), "p95_ms": round(p95, 2),
+                "p99_ms": round(p99, 2), "queries": round(statistics.fmean(queries), 1),
+            }
+            line = (
+                f"{label:32} {response.status_code:>6} {p50:7.1f}ms {p95:7.1f}ms {p99:7.1f}ms "
+                f"{results[label]['queries']:>8}"
+            )
+            if label in baseline:
+                before = baseline[label]
+                line += (
+                    f"   p95 {(p95 - before['p95_ms']) / (before['p95_ms'] or 1) * 100:+.0f}%"
+                    f" queries {results[label]['queries'] - before['queries']:+.1f}"
+                )
+            self.stdout.write(line)
+
+        if options["save"]:
+            counts = {
+                "products": Product.objects.count(), "artists": ArtistProfile.objects.count(),
+                "orders": Order.objects.count(),
+            }
+            with open(options["save"], "w") as fh:
+                json.dump({"requests": options["requests"], "data": counts, "routes": results}, fh, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Saved results to {options['save']}."))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from market.models import ArtistProfile, ProductImage
+from market.tasks import build_artist_image_variants, build_product_image_variants
+
+
+class Command(BaseCommand):
+    help = "Queue responsive image variant builds for every product/artist image that lacks current ones."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sync", action="store_true", help="Build in this process instead of queueing Celery tasks.")
+
+    def handle(self, *args, **options):
+        run = (lambda task, pk: task(pk)) if options["sync"] else (lambda task, pk: task.delay(pk))
+        queued = 0
+        for img in ProductImage.objects.only("id", "image", "updated_at", "variants").iterator(chunk_size=500):
+            if img.image and img.variants.get("source") != img.variants_source:
+                run(build_product_image_variants, img.pk)
+                queued += 1
+        for profile in ArtistProfile.objects.exclude(image="").exclude(image__isnull=True).only("id", "image", "image_variants").iterator(chunk_size=500):
+            if profile.image_variants.get("source") != profile.image_variants_source:
+                run(build_artist_image_variants, profile.pk)
+                queued += 1
+        self.stdout.write(self.style.SUCCESS(f"{'Built' if options['sync'] else 'Queued'} variants for {queued} images."))
@@ -0,0 +1,51 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from market.importer import IMPORT_CHUNK_SIZE, IMPORT_IMAGE_WORKERS, import_format, import_products
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk-import products for a seller from a CSV or JSONL file, with an optional ZIP of "
+        "images. Streams the file; invalid rows are skipped and reported by line number."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="products file (.csv, .jsonl or .ndjson)")
+        parser.add_argument("--seller", required=True, help="seller username")
+        parser.add_argument("--images", help="ZIP with the images named in the 'images' column")
+        parser.add_argument("--format", choices=("csv", "jsonl"), help="default: from the file extension")
+        parser.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_SIZE)
+        parser.add_argument("--workers", type=int, default=IMPORT_IMAGE_WORKERS, help="image worker threads")
+        parser.add_argument("--dry-run", action="store_true", help="validate everything, store nothing")
+
+    def handle(self, *args, **options):
+        seller = User.objects.filter(username=options["seller"], user_type=User.SELLER).first()
+        if seller is None:
+            raise CommandError(f"No seller named '{options['seller']}'.")
+        fmt = options["format"] or import_format(options["path"])
+        if fmt is None:
+            raise CommandError("Can't tell the format from the file name; pass --format csv or jsonl.")
+
+        images = open(options["images"], "rb") if options["images"] else None
+        try:
+            with open(options["path"], "rb") as data:
+                report = import_products(
+                    seller, data, fmt, images=images, chunk_size=options["chunk_size"],
+                    workers=options["workers"], dry_run=options["dry_run"], log=self.stdout.write,
+                )
+        finally:
+            if images is not None:
+                images.close()
+
+        for line, message in report["errors"]:
+            self.stdout.write(self.style.WARNING(f"line {line}: {message}"))
+        if report["failed"] > len(report["errors"]):
+            self.stdout.write(self.style.WARNING(f"... and {report['failed'] - len(report['errors'])} more"))
+        verb = "would import" if options["dry_run"] else "imported"
+        self.stdout.write(self.style.SUCCESS(
+            f"{report['rows']} rows: {verb} {report['created']} products with {report['images']} images, "
+            f"{report['failed']} failed, in {report['seconds']}s ({report['rows_per_second']} rows/s)."
+        ))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from market.models import Product
+from market.search import ensure_search_index, is_fulltext_enabled, update_search_vectors
+
+
+class Command(BaseCommand):
+    help = "Create the product search GIN index and backfill Product.search_vector (Postgres only)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        if not is_fulltext_enabled():
+            self.stdout.write(self.style.WARNING("Full-text search needs PostgreSQL; nothing to do."))
+            return
+
+        ensure_search_index()
+        batch_size = options["batch_size"]
+        ids = Product.objects.order_by("pk").values_list("pk", flat=True)
+        last_pk, total = 0, 0
+        while True:
+            batch = list(ids.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                break
+            total += update_search_vectors(batch)
+            last_pk = batch[-1]
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt search vectors for {total} products."))
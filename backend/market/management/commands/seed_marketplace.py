@@ -0,0 +1,50 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from market.seeding import SEED_PASSWORD, seed_marketplace
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk-insert a synthetic marketplace (sellers with artist profiles, buyers, products "
+        "with images, orders with mixed item statuses and payments) for benchmarks. Adds to "
+        "the existing data; e.g. --products 100000 --order-items 1000000."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sellers", type=int, default=20)
+        parser.add_argument("--buyers", type=int, default=200)
+        parser.add_argument("--products", type=int, default=1000)
+        parser.add_argument("--images", type=int, default=2, help="images per product")
+        parser.add_argument("--order-items", type=int, default=3000)
+        parser.add_argument("--max-items-per-order", type=int, default=5)
+        parser.add_argument("--days", type=int, default=90, help="spread products and orders over this many days")
+        parser.add_argument("--batch-size", type=int, default=2000)
+        parser.add_argument("--seed", type=int, help="random seed, for a reproducible mix")
+        parser.add_argument("--no-rollups", action="store_true", help="skip rebuilding the daily sales rollups")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        log = lambda message: self.stdout.write(f"[{time.perf_counter() - started:7.1f}s] {message}")
+        try:
+            result = seed_marketplace(
+                sellers=options["sellers"], buyers=options["buyers"], products=options["products"],
+                images_per_product=options["images"], order_items=options["order_items"],
+                max_items_per_order=options["max_items_per_order"], days=options["days"],
+                batch_size=options["batch_size"], seed=options["seed"], rollups=not options["no_rollups"], log=log,
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        elapsed = time.perf_counter() - started
+        counts = result["counts"]
+        rows = sum(counts.values())
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {', '.join(f'{n} {label}' for label, n in counts.items())} "
+            f"in {elapsed:.1f}s ({rows / elapsed:.0f} rows/s)."
+        ))
+        self.stdout.write(
+            f"Log in as {result['seller'].username} (seller) or {result['buyer'].username} (buyer) "
+            f"with password '{SEED_PASSWORD}'."
+        )
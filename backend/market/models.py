@@ -1,5 +1,8 @@
 from django.db import models
-from django.utils.text import slugify
+from django.db.models.functions import Upper
+from django.contrib.postgres.search import SearchVectorField
+from .slugs import allocate_slug, save_with_unique_slug
+from .images import ResponsiveImageMixin
 from django.urls import reverse
 from django.conf import settings
 from decimal import Decimal
@@ -7,7 +10,9 @@ from decimal import Decimal
 # Create your models here.
 User = settings.AUTH_USER_MODEL
 
-class ArtistProfile(models.Model):
+class ArtistProfile(ResponsiveImageMixin, models.Model):
+    variants_field = "image_variants"
+
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name="artist_profile")
     display_name = models.CharField(max_length=120)
     bio = models.TextField(blank=True)
@@ -16,24 +21,32 @@ class ArtistProfile(models.Model):
     city = models.CharField(max_length=80, blank=True)
     location_map_url = models.URLField(blank=True)
     image = models.ImageField(upload_to="artists/", blank=True, null=True)
+    # resized WebP/JPEG copies, written by market.tasks.build_artist_image_variants
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     slug = models.SlugField(max_length=220, unique=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # product list city filter uses city__iexact, which Postgres compiles to UPPER(city) = UPPER(%s)
+            models.Index(Upper("city"), name="artist_city_upper_idx"),
+        ]
+
     def __str__(self):
         return self.display_name or self.user.get_full_name() or self.user.username
+
+    @property
+    def image_variants_source(self):
+        return self.image.name if self.image else ""
     
     def save(self, *args, **kwargs):
-        if not self.slug:
-            base = f"{self.display_name or self.user.username}"
-            sl = slugify(base)[:120]
-            count = 0
-            unique = sl
-            while ArtistProfile.objects.filter(slug=unique).exclude(pk=self.pk).exists():
-                count += 1
-                unique = f"{sl}-{count}"
-            self.slug = unique
-        super().save(*args, **kwargs)
+        if self.slug:
+            return super().save(*args, **kwargs)
+        return save_with_unique_slug(
+            self, lambda: super(ArtistProfile, self).save(*args, **kwargs),
+            self.display_name or self.user.username, max_length=120, fallback="artist",
+        )
 
 class Category(models.Model):
     name = models.CharField(max_length=80, unique=True)
@@ -53,35 +66,50 @@ class Product(models.Model):
     category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # maintained by market.search (title, description, category name, artist name); GIN-indexed on Postgres
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            # catalog listing: is_active filter + newest first / price sort
+            models.Index(fields=["is_active", "-created_at"], name="product_active_recent_idx"),
+            models.Index(fields=["is_active", "price"], name="product_active_price_idx"),
+        ]
 
     def _generate_unique_slug(self):
-        base = self.title or "product"
-        sl = slugify(base)[:200] or "product"
-        unique = sl
-        count = 0
-        while Product.objects.filter(slug=unique).exclude(pk=self.pk).exists():
-            count += 1
-            unique = f"{sl}-{count}"
-        return unique
+        return allocate_slug(Product, self.title, max_length=200, exclude_pk=self.pk, fallback="product")
 
     def save(self, *args, **kwargs):
-        # populate slug if empty
-        if not self.slug:
-            self.slug = self._generate_unique_slug()
-        super().save(*args, **kwargs)
+        # populate slug if empty (retries if a concurrent create takes the same slug)
+        if self.slug:
+            return super().save(*args, **kwargs)
+        return save_with_unique_slug(
+            self, lambda: super(Product, self).save(*args, **kwargs),
+            self.title, max_length=200, fallback="product",
+        )
     
     def __str__(self):
         return self.title
     
-class ProductImage(models.Model):
+class ProductImage(ResponsiveImageMixin, models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="images")
     image = models.ImageField(upload_to="product/")
     alt_text = models.CharField(max_length=255, blank=True)
     order = models.PositiveBigIntegerField(default=0)
     updated_at = models.DateTimeField(auto_now=True, null=True)
+    # resized WebP/JPEG copies, written by market.tasks.build_product_image_variants
+    variants = models.JSONField(default=dict, blank=True, editable=False)
 
     class Meta:
         ordering = ("order",)
+
+    @property
+    def variants_source(self):
+        """
+        Key the variants were built from; a new upload or save (updated_at) invalidates them.
+        """
+        stamp = self.updated_at.isoformat() if self.updated_at else ""
+        return f"{self.image.name}@{stamp}"
     
     def __str__(self):
         return f"Image for {self.product.title}"
\ No newline at end of file
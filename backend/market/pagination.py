@@ -0,0 +1,209 @@
+import base64
+import binascii
+import json
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Q
+
+CURSOR_PARAM = "cursor"
+PAGING_PARAM = "paging"
+
+
+def use_cursor_pagination(request):
+    """
+    Cursor (keyset) pagination is opt-in: globally via ``settings.CURSOR_PAGINATION``
+    or per request with ``?paging=cursor`` (cursor links keep the flag).
+    """
+    if request.GET.get(PAGING_PARAM) == "cursor" or CURSOR_PARAM in request.GET:
+        return True
+    return getattr(settings, "CURSOR_PAGINATION", False)
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+class CursorPage:
+    """
+    Page-like object for templates: iterable, ``has_next``/``has_previous`` and
+    opaque ``next_cursor``/``previous_cursor`` tokens. There is no page number or count.
+    """
+    is_cursor = True
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None, request=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self._request = request
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+    def _querystring(self, token):
+        # keep the active filters, swap page/cursor
+        if self._request is None:
+            return f"{PAGING_PARAM}=cursor&{CURSOR_PARAM}={token}"
+        params = self._request.GET.copy()
+        params.pop("page", None)
+        params[PAGING_PARAM] = "cursor"
+        params[CURSOR_PARAM] = token
+        return params.urlencode()
+
+    @property
+    def next_querystring(self):
+        return self._querystring(self.next_cursor) if self.has_next else ""
+
+    @property
+    def previous_querystring(self):
+        return self._querystring(self.previous_cursor) if self.has_previous else ""
+
+
+class CursorPaginator:
+    """
+    Keyset paginator over ``queryset`` ordered by ``ordering`` (e.g. ``("-created_at", "-id")``).
+
+    Each page is a single ``WHERE (key) > (last key) ORDER BY ... LIMIT per_page + 1``
+    query, so deep pages cost the same as the first one and no COUNT(*) is run.
+    The last ordering field must be unique (use the pk as tiebreaker). Numeric
+    annotations (e.g. the search ``rank``) may be part of the key too.
+    """
+
+    def __init__(self, queryset, per_page, ordering):
+        self.queryset = queryset
+        self.per_page = int(per_page)
+        self.ordering = tuple(ordering)
+        self._fields = [
+            (name.lstrip("-"), name.startswith("-"), self._field(queryset.model, name.lstrip("-")))
+            for name in self.ordering
+        ]
+
+    @staticmethod
+    def _field(model, name):
+        try:
+            return model._meta.get_field(name)
+        except FieldDoesNotExist:
+            return None  # an annotation; its value goes into the token as a JSON number
+
+    # -- token encoding -------------------------------------------------
+
+    def encode_cursor(self, obj, direction):
+        values = [
+            field.value_to_string(obj) if field else getattr(obj, name)
+            for name, _, field in self._fields
+        ]
+        raw = json.dumps({"d": direction, "v": values}, separators=(",", ":")).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+    @staticmethod
+    def _annotation_value(value):
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ValueError(value)
+        return value
+
+    def decode_cursor(self, token):
+        try:
+            raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+            data = json.loads(raw)
+            direction, values = data["d"], data["v"]
+            if direction not in ("n", "p") or len(values) != len(self._fields):
+                raise InvalidCursor(token)
+            return direction, [
+                field.to_python(v) if field else self._annotation_value(v)
+                for (_, _, field), v in zip(self._fields, values)
+            ]
+        except (ValueError, KeyError, TypeError, binascii.Error, json.JSONDecodeError) as e:
+            raise InvalidCursor(token) from e
+
+    # -- querying -------------------------------------------------------
+
+    def _after(self, values, reverse=False):
+        """
+        Build ``(a, b) > (x, y)`` as ``a > x OR (a = x AND b > y)``, honouring per-field direction.
+        """
+        condition = Q()
+        equal = Q()
+        for (name, desc, _), value in zip(self._fields, values):
+            op = "lt" if desc != reverse else "gt"
+            condition |= equal & Q(**{f"{name}__{op}": value})
+            equal &= Q(**{name: value})
+        return condition
+
+    def _page_query(self, token):
+        direction, values = "n", None
+        if token:
+            try:
+                direction, values = self.decode_cursor(token)
+            except InvalidCursor:
+                direction, values = "n", None
+
+        backwards = direction == "p"
+        qs = self.queryset
+        if values is not None:
+            qs = qs.filter(self._after(values, reverse=backwards))
+        if backwards:
+            order = [name[1:] if name.startswith("-") else f"-{name}" for name in self.ordering]
+        else:
+            order = list(self.ordering)
+        return qs.order_by(*order)[: self.per_page + 1], values, backwards
+
+    def _page(self, rows, values, backwards, request):
+        has_more = len(rows) > self.per_page
+        rows = rows[: self.per_page]
+        if backwards:
+            rows.reverse()
+
+        next_cursor = previous_cursor = None
+        if rows:
+            if has_more or backwards:
+                next_cursor = self.encode_cursor(rows[-1], "n")
+            if values is not None and (has_more or not backwards):
+                previous_cursor = self.encode_cursor(rows[0], "p")
+        return CursorPage(rows, next_cursor, previous_cursor, request=request)
+
+    def get_page(self, token=None, request=None):
+        """
+        Return a ``CursorPage``; a missing or tampered token yields the first page.
+        """
+        qs, values, backwards = self._page_query(token)
+        return self._page(list(qs), values, backwards, request)
+
+    async def aget_page(self, token=None, request=None):
+        """
+        ``get_page`` for async views (async ORM, prefetches included).
+        """
+        qs, values, backwards = self._page_query(token)
+        return self._page([obj async for obj in qs], values, backwards, request)
+
+
+class CursorPaginationMixin:
+    """
+    ListView mixin: swap Django's offset pagination for ``CursorPaginator`` when
+    ``use_cursor_pagination`` says so. ``cursor_ordering`` must match the queryset's sort.
+    """
+    cursor_ordering = ("-created_at", "-id")
+
+    def paginate_queryset(self, queryset, page_size):
+        if not use_cursor_pagination(self.request):
+            return super().paginate_queryset(queryset, page_size)
+        page = CursorPaginator(queryset, page_size, self.cursor_ordering).get_page(
+            self.request.GET.get(CURSOR_PARAM), request=self.request
+        )
+        return None, page, page.object_list, page.has_other_pages()
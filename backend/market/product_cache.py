@@ -0,0 +1,92 @@
+"""
+Cached read model for the product detail page, keyed by slug.
+
+A miss loads the product, its seller's artist profile and its ordered images in two
+queries and caches the result (unknown slugs too, briefly). Entries are deleted
+precisely when the product, one of its images or its seller's profile changes
+(market.signals, market.tasks), once the transaction commits.
+"""
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Prefetch
+
+from .models import ArtistProfile, Product, ProductImage
+
+PRODUCT_DETAIL_CACHE_TTL = getattr(settings, "PRODUCT_DETAIL_CACHE_TTL", 60 * 60)  # invalidation is explicit
+PRODUCT_DETAIL_MISSING_TTL = 60  # unknown/inactive slugs
+
+_state = threading.local()
+
+
+def _key(slug):
+    return f"market:product:detail:v1:{slug}"
+
+
+def build_product_detail(slug):
+    """
+    ``{"product", "seller_profile", "images"}`` for an active product, else None.
+
+    Reads the primary: a replica that still has the pre-invalidation row would
+    otherwise be cached for the whole TTL.
+    """
+    product = (
+        Product.objects.using("default")
+        .filter(slug=slug, is_active=True)
+        .select_related("seller__artist_profile")
+        .prefetch_related(Prefetch("images", queryset=ProductImage.objects.using("default").order_by("order", "pk")))
+        .first()
+    )
+    if product is None:
+        return None
+    seller_profile = getattr(product.seller, "artist_profile", None)
+    # keep the seller's User row (password hash etc.) out of the cache
+    Product._meta.get_field("seller").delete_cached_value(product)
+    if seller_profile is not None:
+        ArtistProfile._meta.get_field("user").delete_cached_value(seller_profile)
+    return {"product": product, "seller_profile": seller_profile, "images": list(product.images.all())}
+
+
+def get_product_detail(slug):
+    entry = cache.get(_key(slug))
+    if entry is None:
+        detail = build_product_detail(slug)
+        entry = {"detail": detail}
+        cache.set(_key(slug), entry, PRODUCT_DETAIL_CACHE_TTL if detail else PRODUCT_DETAIL_MISSING_TTL)
+    return entry["detail"]
+
+
+def _pending():
+    if not hasattr(_state, "slugs"):
+        _state.slugs, _state.product_ids, _state.seller_ids = set(), set(), set()
+    return _state
+
+
+def invalidate_product_detail(slugs=(), product_ids=(), seller_ids=()):
+    """
+    Queue the cached pages for the given slugs, products and sellers' products for
+    deletion when the current transaction commits, so a concurrent miss can't
+    re-cache the old rows. Many writes in one transaction (e.g. a product delete
+    cascading to its images) cost one lookup per kind of id.
+    """
+    state = _pending()
+    state.slugs.update(s for s in slugs if s)
+    state.product_ids.update(pk for pk in product_ids if pk is not None)
+    state.seller_ids.update(pk for pk in seller_ids if pk is not None)
+    # one callback per call stays correct when a savepoint rolls back; the first drains the queue
+    transaction.on_commit(flush_product_detail_invalidations, robust=True)
+
+
+def flush_product_detail_invalidations():
+    state = _pending()
+    slugs, product_ids, seller_ids = state.slugs, state.product_ids, state.seller_ids
+    if not (slugs or product_ids or seller_ids):
+        return
+    state.slugs, state.product_ids, state.seller_ids = set(), set(), set()
+    if product_ids:
+        slugs |= set(Product.objects.filter(pk__in=product_ids).values_list("slug", flat=True))
+    if seller_ids:
+        slugs |= set(Product.objects.filter(seller_id__in=seller_ids).values_list("slug", flat=True))
+    cache.delete_many([_key(slug) for slug in slugs])
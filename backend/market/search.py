@@ -0,0 +1,88 @@
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connection, connections
+from django.db.models import F, FloatField, OuterRef, Q, Subquery
+from django.db.models.functions import Cast
+
+from .models import Product
+
+SEARCH_CONFIG = getattr(settings, "SEARCH_CONFIG", "english")
+SEARCH_INDEX_NAME = "market_product_search_gin"
+
+
+def is_fulltext_enabled():
+    """
+    Full-text search needs Postgres; everything else (SQLite in local dev/tests) falls back to icontains.
+    """
+    return connection.vendor == "postgresql"
+
+
+def _document():
+    # Weights: A (title) > B (category / artist) > C (description)
+    return (
+        SearchVector("title", weight="A", config=SEARCH_CONFIG)
+        + SearchVector("category__name", weight="B", config=SEARCH_CONFIG)
+        + SearchVector("seller__artist_profile__display_name", weight="B", config=SEARCH_CONFIG)
+        + SearchVector("description", weight="C", config=SEARCH_CONFIG)
+    )
+
+
+def update_search_vectors(products=None):
+    """
+    Recompute ``Product.search_vector`` with one UPDATE ... SET = (subquery).
+
+    ``products`` may be a queryset, an iterable of pks or None (every product).
+    Returns the number of rows touched. No-op when full-text search is disabled.
+    """
+    if not is_fulltext_enabled():
+        return 0
+    qs = Product.objects.all()
+    if products is not None:
+        qs = products if hasattr(products, "query") else qs.filter(pk__in=list(products))
+    document = (
+        Product.objects.filter(pk=OuterRef("pk"))
+        .annotate(document=_document())
+        .values("document")[:1]
+    )
+    # update() skips save()/signals, so this never re-enters the receivers
+    return qs.order_by().update(search_vector=Subquery(document))
+
+
+def ensure_search_index(using="default"):
+    """
+    Create the GIN index backing full-text search (Postgres only, idempotent).
+    """
+    conn = connections[using]
+    if conn.vendor != "postgresql":
+        return
+    table = Product._meta.db_table
+    with conn.cursor() as cursor:
+        cursor.execute(
+            f'CREATE INDEX IF NOT EXISTS {SEARCH_INDEX_NAME} ON "{table}" USING gin ("search_vector")'
+        )
+
+
+def search_products(queryset, q):
+    """
+    Apply a user search to ``queryset``.
+
+    On Postgres: ranked websearch over the maintained search vector, ordered by
+    relevance (callers may re-order, e.g. for price sorting).
+    Elsewhere: the old icontains match, newest first.
+    """
+    if not q:
+        return queryset
+    if is_fulltext_enabled():
+        query = SearchQuery(q, search_type="websearch", config=SEARCH_CONFIG)
+        return (
+            queryset.filter(search_vector=query)
+            # float8, not ts_rank's float4: the value must round-trip exactly through a page cursor
+            .annotate(rank=Cast(SearchRank(F("search_vector"), query), FloatField()))
+            .order_by("-rank", "-created_at", "-id")
+        )
+    return queryset.filter(
+        Q(title__icontains=q)
+        | Q(description__icontains=q)
+        | Q(category__name__icontains=q)
+        | Q(seller__artist_profile__display_name__icontains=q)
+    )
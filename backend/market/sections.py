@@ -0,0 +1,77 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+# Per-section freshness (seconds). After the TTL an entry is stale: it keeps being
+# served for up to SECTION_STALE_GRACE while a single worker rebuilds it.
+SECTION_TTLS = {
+    "featured": 300,
+    "trending": 60,
+    "top_artisans": 900,
+    **getattr(settings, "HOME_SECTION_TTLS", {}),
+}
+SECTION_STALE_GRACE = getattr(settings, "HOME_SECTION_STALE_GRACE", 600)
+SECTION_LOCK_TIMEOUT = 30  # a crashed rebuild frees the lock after this long
+SECTION_WAIT = 2.0  # cold cache: how long other workers wait for the rebuilder
+SECTION_POLL = 0.05
+
+
+def _key(name):
+    return f"home:section:{name}"
+
+
+def _lock_key(name):
+    return f"home:section:{name}:lock"
+
+
+def _store(name, value):
+    ttl = SECTION_TTLS.get(name, 60)
+    cache.set(_key(name), {"value": value, "fresh_until": time.time() + ttl}, ttl + SECTION_STALE_GRACE)
+    return value
+
+
+def _rebuild(name, builder):
+    try:
+        return _store(name, builder())
+    finally:
+        cache.delete(_lock_key(name))
+
+
+def get_section(name, builder):
+    """
+    Return the cached value of section ``name`` (single-flight, stale-while-revalidate).
+
+    - fresh entry: returned as is
+    - stale entry: the worker that wins the lock rebuilds, everyone else gets the stale copy
+    - no entry: the lock winner builds; others wait up to SECTION_WAIT for it, then build themselves
+    """
+    entry = cache.get(_key(name))
+    if entry is not None and entry["fresh_until"] > time.time():
+        return entry["value"]
+
+    if cache.add(_lock_key(name), 1, SECTION_LOCK_TIMEOUT):
+        return _rebuild(name, builder)
+
+    if entry is not None:
+        return entry["value"]
+
+    deadline = time.monotonic() + SECTION_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(SECTION_POLL)
+        entry = cache.get(_key(name))
+        if entry is not None:
+            return entry["value"]
+    return builder()
+
+
+def invalidate_sections(*names):
+    """
+    Mark sections stale (not deleted), so the next request rebuilds them once while
+    concurrent requests keep getting the old content.
+    """
+    for name in names:
+        entry = cache.get(_key(name))
+        if entry is not None:
+            entry["fresh_until"] = 0
+            cache.set(_key(name), entry, SECTION_STALE_GRACE)
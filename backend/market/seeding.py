@@ -0,0 +1,238 @@
+"""
+Synthetic marketplace data for benchmarks and checks (``manage.py seed_marketplace``).
+
+Everything is written with ``bulk_create`` in batches, which bypasses model signals,
+so the rows those signals normally maintain (artist profiles, seller order summaries,
+search vectors, sales rollups) are written here directly. Sizes like 100k products
+and 1M order items fit in memory: only ``(pk, seller_id, price)`` per product is kept.
+"""
+import random
+import uuid
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+from django.utils.text import slugify
+
+from orders.models import Order, OrderItem, Payment, SellerOrderSummary, aggregate_status
+from orders.rollups import backfill_rollups
+
+from .models import ArtistProfile, Category, Product, ProductImage
+from .search import update_search_vectors
+from .slugs import assign_slugs
+
+User = get_user_model()
+
+SEED_PASSWORD = "crafty-seed"
+
+CATEGORIES = ["Pottery", "Textiles", "Woodwork", "Jewellery", "Metalcraft", "Paintings", "Basketry", "Leather"]
+CITIES = ["Jaipur", "Pune", "Kochi", "Varanasi", "Kutch", "Mysuru", "Shillong", "Bhopal"]
+ADJECTIVES = ["Hand-thrown", "Block-printed", "Carved", "Woven", "Embroidered", "Hammered", "Painted", "Glazed"]
+MATERIALS = ["terracotta", "teak", "brass", "cotton", "silk", "bamboo", "sheesham", "silver"]
+NOUNS = ["vase", "bowl", "stole", "box", "lamp", "bangle", "tray", "wall hanging", "planter", "coaster set"]
+
+# (order status, weight); item statuses are drawn to match, see _item_statuses
+ORDER_MIX = [
+    (Order.STATUS_PENDING, 8), (Order.STATUS_PAID, 12), (Order.STATUS_PROCESSING, 15),
+    (Order.STATUS_SHIPPED, 20), (Order.STATUS_DELIVERED, 40), (Order.STATUS_CANCELLED, 5),
+]
+# items of an order past "paid" are processed independently, so some orders end up mixed
+ITEM_MIX = [
+    (OrderItem.STATUS_PROCESSING, 15), (OrderItem.STATUS_SHIPPED, 25),
+    (OrderItem.STATUS_DELIVERED, 55), (OrderItem.STATUS_CANCELLED, 5),
+]
+
+
+@contextmanager
+def _explicit_timestamps(*fields):
+    """
+    Let ``bulk_create`` keep the ``created_at`` values we set instead of ``now()``,
+    so seeded history is spread over days (process-local, seeding only).
+    """
+    saved = [(field, field.auto_now_add) for field in fields]
+    for field, _ in saved:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, value in saved:
+            field.auto_now_add = value
+
+
+def _weighted(rng, mix):
+    return rng.choices([value for value, _ in mix], weights=[weight for _, weight in mix])[0]
+
+
+def _item_statuses(rng, order_status, count):
+    if order_status in (Order.STATUS_PENDING, Order.STATUS_PAID):
+        return [OrderItem.STATUS_PROCESSING] * count
+    if order_status == Order.STATUS_CANCELLED:
+        return [OrderItem.STATUS_CANCELLED] * count
+    return [_weighted(rng, ITEM_MIX) for _ in range(count)]
+
+
+def _batches(total, batch_size):
+    for start in range(0, total, batch_size):
+        yield start, min(total, start + batch_size)
+
+
+def _seed_users(tag, count, user_type, password, batch_size):
+    users = []
+    for start, stop in _batches(count, batch_size):
+        users += User.objects.bulk_create([
+            User(username=f"seed-{tag}-{user_type}-{i}", email=f"{user_type}{i}-{tag}@example.com",
+                 first_name=user_type.title(), last_name=str(i), user_type=user_type, password=password)
+            for i in range(start, stop)
+        ])
+    return users
+
+
+def _seed_orders(rng, tag, buyers, products, order_items, max_items, history, batch_size, first_product, log):
+    """
+    Orders with 1..``max_items`` lines until ``order_items`` lines exist, each batch
+    in one transaction together with its payments and seller summaries. The first
+    order is paid and contains ``first_product``. Returns ``(orders created, first order)``.
+    """
+    now = timezone.now()
+    created, written, first_order = 0, 0, None
+    while written < order_items:
+        orders, lines = [], []
+        while written < order_items and len(lines) < batch_size:
+            picked = rng.sample(products, min(len(products), rng.randint(1, max_items), order_items - written))
+            if first_order is None and not orders:
+                picked = [first_product] + [p for p in picked if p != first_product][:len(picked) - 1]
+                status = Order.STATUS_PAID
+            else:
+                status = _weighted(rng, ORDER_MIX)
+            statuses = _item_statuses(rng, status, len(picked))
+            quantities = [rng.choice((1, 1, 1, 2, 3)) for _ in picked]
+            order = Order(
+                buyer=rng.choice(buyers), status=aggregate_status(statuses, status),
+                total_amount_inr=sum(price * qty for (_, _, price), qty in zip(picked, quantities)),
+                razorpay_order_id=f"order_seed_{tag}_{created + len(orders)}",
+                created_at=now - timedelta(seconds=rng.randint(0, history)),
+            )
+            orders.append(order)
+            lines.append((order, picked, statuses, quantities))
+            written += len(picked)
+
+        with transaction.atomic(), _explicit_timestamps(Order._meta.get_field("created_at")):
+            Order.objects.bulk_create(orders)
+            items, payments, summaries = [], [], []
+            for order, picked, statuses, quantities in lines:
+                per_seller = {}
+                for (product_id, seller_id, price), status, qty in zip(picked, statuses, quantities):
+                    items.append(OrderItem(order=order, product_id=product_id, unit_price_inr=price,
+                                           quantity=qty, status=status))
+                    row = per_seller.setdefault(seller_id, [Decimal("0.00"), 0, set()])
+                    row[0] += price * qty
+                    row[1] += 1
+                    row[2].add(status)
+                for seller_id, (revenue, count, seller_statuses) in per_seller.items():
+                    summaries.append(SellerOrderSummary(
+                        seller_id=seller_id, order=order, revenue_inr=revenue, item_count=count,
+                        status=aggregate_status(seller_statuses, order.status),
+                        order_status=order.status, order_created_at=order.created_at,
+                    ))
+                if order.status != Order.STATUS_PENDING:
+                    payments.append(Payment(
+                        order=order, razorpay_payment_id=f"pay_seed_{tag}_{order.pk}",
+                        amount_inr=order.total_amount_inr, status=Payment.STATUS_CAPTURED,
+                        reconciled_at=order.created_at, created_at=order.created_at,
+                    ))
+            OrderItem.objects.bulk_create(items, batch_size=batch_size)
+            Payment.objects.bulk_create(payments, batch_size=batch_size)
+            SellerOrderSummary.objects.bulk_create(summaries, batch_size=batch_size)
+        first_order = first_order or orders[0]
+        created += len(orders)
+        log(f"{written}/{order_items} order items in {created} orders")
+    return created, first_order
+
+
+def seed_marketplace(sellers=20, buyers=200, products=1000, images_per_product=2, order_items=3000,
+                     max_items_per_order=5, days=90, batch_size=2000, seed=None, rollups=True, log=None):
+    """
+    Add a synthetic marketplace next to whatever is already in the database.
+
+    Products are spread round-robin over the sellers; orders draw random products and
+    get a realistic mix of order and item statuses (paid orders carry a captured
+    payment). ``created_at`` of products and orders is spread over the last ``days``.
+    ``seed`` makes a run reproducible. Returns the counts and a few known rows::
+
+        {"tag", "counts": {...}, "buyer", "seller", "product", "spare_product", "order"}
+
+    where ``product`` and ``spare_product`` belong to ``seller`` and ``order`` (paid,
+    bought by ``buyer``) contains ``product``.
+    """
+    if sellers < 1 or buyers < 1 or products < 1:
+        raise ValueError("Need at least one seller, buyer and product.")
+    rng = random.Random(seed)
+    tag = uuid.uuid4().hex[:6]  # keeps usernames unique across runs, even with the same seed
+    log = log or (lambda message: None)
+    history = days * 24 * 3600
+    now = timezone.now()
+    password = make_password(SEED_PASSWORD)  # hashing once per user would dominate the run
+
+    categories = [
+        Category.objects.get_or_create(name=name, defaults={"slug": slugify(name)})[0] for name in CATEGORIES
+    ]
+    seller_users = _seed_users(tag, sellers, User.SELLER, password, batch_size)
+    buyer_users = _seed_users(tag, buyers, User.BUYER, password, batch_size)
+    for start, stop in _batches(sellers, batch_size):
+        ArtistProfile.objects.bulk_create(assign_slugs([
+            ArtistProfile(user=u, display_name=f"{rng.choice(ADJECTIVES).split('-')[0]} Crafts {i} {tag}",
+                          city=rng.choice(CITIES), bio="Third-generation artisan.")
+            for i, u in enumerate(seller_users[start:stop], start)
+        ], "display_name", 120, fallback="artist"))
+    log(f"{sellers} sellers with artist profiles, {buyers} buyers")
+
+    rows, samples = [], []
+    with _explicit_timestamps(Product._meta.get_field("created_at")):
+        for start, stop in _batches(products, batch_size):
+            # the first two products of every seller are active and in stock, so samples are usable
+            batch = Product.objects.bulk_create(assign_slugs([
+                Product(
+                    seller=seller_users[i % sellers], category=rng.choice(categories),
+                    title=f"{rng.choice(ADJECTIVES)} {rng.choice(MATERIALS)} {rng.choice(NOUNS)}",
+                    description="Made by hand in small batches; every piece varies slightly.",
+                    price=Decimal(rng.randint(199, 9999)),
+                    stock=100 if i < 2 * sellers else rng.choice((0, 3, 10, 25, 100)),
+                    is_active=i < 2 * sellers or rng.random() > 0.05,
+                    created_at=now - timedelta(seconds=rng.randint(0, history)),
+                )
+                for i in range(start, stop)
+            ], "title", 200, fallback="product"))
+            ProductImage.objects.bulk_create([
+                ProductImage(product=p, image=f"product/seed-{tag}-{p.pk}-{k}.jpg", alt_text=p.title, order=k)
+                for p in batch for k in range(images_per_product)
+            ], batch_size=batch_size)
+            update_search_vectors([p.pk for p in batch])
+            rows += [(p.pk, p.seller_id, p.price) for p in batch]
+            samples += [p for p in batch if p.seller_id == seller_users[0].pk][:2 - len(samples)]
+            log(f"{stop}/{products} products")
+
+    order_count, first_order = 0, None
+    if order_items:
+        first_product = (samples[0].pk, samples[0].seller_id, samples[0].price)
+        order_count, first_order = _seed_orders(rng, tag, buyer_users, rows, order_items, max_items_per_order,
+                                                history, batch_size, first_product, log)
+        if rollups:
+            backfill_rollups(days + 1)
+            log("sales rollups rebuilt")
+
+    return {
+        "tag": tag,
+        "counts": {
+            "sellers": sellers, "buyers": buyers, "products": products,
+            "images": products * images_per_product, "orders": order_count, "order_items": order_items,
+        },
+        "buyer": first_order.buyer if first_order else buyer_users[0],
+        "seller": seller_users[0],
+        "product": samples[0],
+        "spare_product": samples[-1],
+        "order": first_order,
+    }
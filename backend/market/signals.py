@@ -1,39 +1,29 @@
-from django.db.models.signals import pre_save, post_save
+from django.db.models.signals import pre_save, post_save, post_delete, post_migrate
 from django.dispatch import receiver
-from django.utils.text import slugify
 
-from .models import Product, ArtistProfile
-from orders.models import OrderItem, Order
+from django.db import transaction
+
+from .models import Product, ProductImage, ArtistProfile, Category
+from .search import update_search_vectors, ensure_search_index
+from .facets import bump_facet_version
+from .sections import invalidate_sections
+from .product_cache import invalidate_product_detail
+from .slugs import allocate_slug
+from .images import delete_variants
+from .tasks import build_product_image_variants, build_artist_image_variants
 
 
 @receiver(pre_save, sender=ArtistProfile)
 def artistprofile_generate_slug(sender, instance, **kwargs):
+    # save() normally allocates already; this covers callers that bypass it
     if not instance.slug:
-        base = instance.display_name or instance.user.username
-        sl = slugify(base)[:120]
-        unique = sl
-        count = 0
-
-        while ArtistProfile.objects.filter(slug=unique).exclude(pk=instance.pk).exists():
-            count += 1
-            unique = f"{sl}-{count}"
-
-        instance.slug = unique
+        instance.slug = allocate_slug(ArtistProfile, instance.display_name or instance.user.username, max_length=120, exclude_pk=instance.pk, fallback="artist")
 
 
 @receiver(pre_save, sender=Product)
 def product_generate_slug(sender, instance, **kwargs):
     if not instance.slug:
-        base = instance.title
-        sl = slugify(base)[:120]
-        unique = sl
-        count = 0
-
-        while Product.objects.filter(slug=unique).exclude(pk=instance.pk).exists():
-            count += 1
-            unique = f"{sl}-{count}"
-
-        instance.slug = unique
+        instance.slug = allocate_slug(Product, instance.title, max_length=200, exclude_pk=instance.pk, fallback="product")
 
 
 
@@ -51,28 +41,93 @@ def create_artist_profile(sender, instance, created, **kwargs):
 
 
 
-@receiver(post_save, sender=OrderItem)
-def recalc_order_status(sender, instance, **kwargs):
-    order = instance.order
+# Full-text search vector maintenance (no-ops outside Postgres)
+@receiver(post_save, sender=Product)
+def product_update_search_vector(sender, instance, raw=False, **kwargs):
+    if not raw:
+        update_search_vectors([instance.pk])
+
+
+@receiver(post_save, sender=Category)
+def category_update_search_vectors(sender, instance, raw=False, **kwargs):
+    if not raw:
+        update_search_vectors(Product.objects.filter(category=instance))
+
+
+@receiver(post_save, sender=ArtistProfile)
+def artistprofile_update_search_vectors(sender, instance, raw=False, **kwargs):
+    if not raw:
+        update_search_vectors(Product.objects.filter(seller_id=instance.user_id))
+
+
+@receiver(post_migrate)
+def create_search_index(sender, using="default", **kwargs):
+    if sender.name == "market":
+        ensure_search_index(using)
+
+
+# Product list facet cache: any catalog/profile write invalidates it
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=ArtistProfile)
+@receiver(post_delete, sender=ArtistProfile)
+def invalidate_facets(sender, **kwargs):
+    bump_facet_version()
+
+
+# Responsive image variants are built in the background after the upload commits
+@receiver(post_save, sender=ProductImage)
+def productimage_schedule_variants(sender, instance, raw=False, **kwargs):
+    if raw or not instance.image or instance.variants.get("source") == instance.variants_source:
+        return
+    pk = instance.pk
+    transaction.on_commit(lambda: build_product_image_variants.delay(pk), robust=True)
+
+
+@receiver(post_save, sender=ArtistProfile)
+def artistprofile_schedule_variants(sender, instance, raw=False, **kwargs):
+    if raw or instance.image_variants.get("source", "") == instance.image_variants_source:
+        return
+    pk = instance.pk
+    transaction.on_commit(lambda: build_artist_image_variants.delay(pk), robust=True)
+
+
+@receiver(post_delete, sender=ProductImage)
+def productimage_delete_variants(sender, instance, **kwargs):
+    delete_variants(instance.variants)
+
+
+# Home page sections: explicit invalidation (they are served stale until one worker rebuilds)
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+def invalidate_home_product_sections(sender, **kwargs):
+    invalidate_sections("featured", "trending", "top_artisans")
+
 
-    # Fetch all item statuses
-    statuses = list(order.items.values_list("status", flat=True))
+@receiver(post_save, sender=ArtistProfile)
+@receiver(post_delete, sender=ArtistProfile)
+def invalidate_home_artisan_section(sender, **kwargs):
+    invalidate_sections("top_artisans")
 
-    # Priority based logic
-    if all(s == "delivered" for s in statuses):
-        order.status = "delivered"
 
-    elif all(s in ("delivered", "cancelled") for s in statuses):
-        # Mixed delivered + cancelled → treat as delivered
-        order.status = "delivered"
+# Product detail read model: drop exactly the pages that show the changed row
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_product_detail_for_product(sender, instance, **kwargs):
+    invalidate_product_detail(slugs=[instance.slug])
 
-    elif any(s == "shipped" for s in statuses):
-        order.status = "shipped"
 
-    elif any(s == "processing" for s in statuses):
-        order.status = "processing"
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+def invalidate_product_detail_for_image(sender, instance, **kwargs):
+    invalidate_product_detail(product_ids=[instance.product_id])
 
-    else:
-        order.status = "pending"
 
-    order.save(update_fields=["status", "updated_at"])
+@receiver(post_save, sender=ArtistProfile)
+@receiver(post_delete, sender=ArtistProfile)
+def invalidate_product_detail_for_artist(sender, instance, **kwargs):
+    invalidate_product_detail(seller_ids=[instance.user_id])
@@ -0,0 +1,94 @@
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils.text import slugify
+
+SLUG_SAVE_ATTEMPTS = 5
+
+
+def slug_base(text, max_length, fallback="item"):
+    return slugify(text or "")[:max_length].strip("-") or fallback
+
+
+def _taken_suffixes(model, bases, exclude_pk=None):
+    """
+    One query for every slug shaped like ``<base>`` or ``<base>-<n>`` for the given bases.
+
+    Returns ``{base: set(suffix ints)}`` where 0 means the bare base is taken.
+    The ``startswith`` prefix lets Postgres use the slug ``_like`` index.
+    """
+    bases = set(bases)
+    taken = {base: set() for base in bases}
+    if not bases:
+        return taken
+    condition = Q()
+    for base in bases:
+        condition |= Q(slug=base) | Q(slug__startswith=f"{base}-")
+    qs = model._default_manager.filter(condition)
+    if exclude_pk is not None:
+        qs = qs.exclude(pk=exclude_pk)
+    for slug in qs.values_list("slug", flat=True):
+        if slug in taken:
+            taken[slug].add(0)
+        head, _, tail = slug.rpartition("-")
+        if tail.isdigit() and head in taken:
+            taken[head].add(int(tail))
+    return taken
+
+
+def _next_free(base, used):
+    if 0 not in used:
+        used.add(0)
+        return base
+    n = max(used) + 1
+    used.add(n)
+    return f"{base}-{n}"
+
+
+def allocate_slug(model, text, max_length, exclude_pk=None, fallback="item"):
+    """
+    Next free ``<base>`` / ``<base>-<n>`` slug for ``model`` using a single query.
+    """
+    base = slug_base(text, max_length, fallback)
+    return _next_free(base, _taken_suffixes(model, [base], exclude_pk)[base])
+
+
+def assign_slugs(instances, text_attr, max_length, fallback="item", batch_size=400):
+    """
+    Fill ``slug`` on every unsaved instance that lacks one, ready for ``bulk_create``.
+
+    One prefix query per ``batch_size`` distinct bases (two OR terms each, which keeps
+    SQLite under its expression depth limit of 1000); duplicates inside the batch get
+    consecutive suffixes.
+    """
+    pending = [obj for obj in instances if not obj.slug]
+    if not pending:
+        return instances
+    model = type(pending[0])
+    bases = [slug_base(getattr(obj, text_attr), max_length, fallback) for obj in pending]
+    distinct = list(dict.fromkeys(bases))
+    taken = {}
+    for i in range(0, len(distinct), batch_size):
+        taken.update(_taken_suffixes(model, distinct[i:i + batch_size]))
+    for obj, base in zip(pending, bases):
+        obj.slug = _next_free(base, taken[base])
+    return instances
+
+
+def save_with_unique_slug(instance, save, text, max_length, fallback="item"):
+    """
+    Allocate a slug (if missing) and save, re-allocating when a concurrent insert
+    grabbed the same slug first (unique constraint -> IntegrityError).
+    """
+    if instance.slug:
+        return save()
+    model = type(instance)
+    for attempt in range(SLUG_SAVE_ATTEMPTS):
+        instance.slug = allocate_slug(model, text, max_length, exclude_pk=instance.pk, fallback=fallback)
+        try:
+            # savepoint so a lost race doesn't poison an outer transaction
+            with transaction.atomic():
+                return save()
+        except IntegrityError:
+            taken = model._default_manager.filter(slug=instance.slug).exclude(pk=instance.pk).exists()
+            if not taken or attempt == SLUG_SAVE_ATTEMPTS - 1:
+                raise
@@ -0,0 +1,84 @@
+from celery import shared_task
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+
+from .images import build_variants, delete_variants, variant_prefix
+from .models import ArtistProfile, ProductImage
+from .product_cache import invalidate_product_detail
+
+
+@shared_task(bind=True, max_retries=3, default_retry_delay=30)
+def build_product_image_variants(self, image_id):
+    """
+    Generate srcset variants for a ProductImage; skipped if they are already current.
+    """
+    img = ProductImage.objects.filter(pk=image_id).first()
+    if img is None or not img.image:
+        return False
+    source = img.variants_source
+    if img.variants.get("source") == source:
+        return False
+    try:
+        variants = build_variants(img.image, source, prefix=f"product/{variant_prefix(img.image, img.pk)}")
+    except Exception as e:
+        raise self.retry(exc=e)
+    delete_variants(img.variants)
+    # update() keeps updated_at (and so the source key) unchanged and fires no signals
+    ProductImage.objects.filter(pk=img.pk).update(variants=variants)
+    invalidate_product_detail(product_ids=[img.product_id])
+    return True
+
+
+@shared_task(bind=True, max_retries=3, default_retry_delay=30)
+def build_artist_image_variants(self, profile_id):
+    profile = ArtistProfile.objects.filter(pk=profile_id).first()
+    if profile is None:
+        return False
+    source = profile.image_variants_source
+    if profile.image_variants.get("source") == source:
+        return False
+    if not profile.image:
+        variants = {}
+    else:
+        try:
+            variants = build_variants(profile.image, source, prefix=f"artists/{variant_prefix(profile.image, profile.pk)}")
+        except Exception as e:
+            raise self.retry(exc=e)
+    delete_variants(profile.image_variants)
+    ArtistProfile.objects.filter(pk=profile.pk).update(image_variants=variants)
+    invalidate_product_detail(seller_ids=[profile.user_id])
+    return True
+
+
+IMPORT_RESULT_TTL = 24 * 60 * 60
+
+
+def import_result_key(seller_id, import_id):
+    return f"market:import:{seller_id}:{import_id}"
+
+
+@shared_task
+def import_products_upload(import_id, seller_id, data_name, fmt, images_name=None):
+    """
+    Run a seller's uploaded product import (market.importer) and keep the report in
+    the cache for the import page. The uploaded files are deleted afterwards.
+    """
+    from django.contrib.auth import get_user_model
+
+    from .importer import import_products
+
+    images = None
+    report = {"error": "The import stopped unexpectedly; nothing after the last completed chunk was saved."}
+    try:
+        seller = get_user_model().objects.get(pk=seller_id)
+        if images_name:
+            images = default_storage.open(images_name, "rb")
+        with default_storage.open(data_name, "rb") as data:
+            report = import_products(seller, data, fmt, images=images)
+    finally:
+        if images is not None:
+            images.close()
+        for name in filter(None, (data_name, images_name)):
+            default_storage.delete(name)
+        cache.set(import_result_key(seller_id, import_id), report, IMPORT_RESULT_TTL)
+    return {k: v for k, v in report.items() if k != "errors"}
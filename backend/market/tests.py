@@ -1,3 +1,281 @@
+import base64
+import io
+import json
+import tempfile
+import zipfile
+from unittest import mock, skipUnless
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
 from django.test import TestCase
+from django.urls import reverse
+from PIL import Image as PILImage
+
+from crafty_backend.testing import QueryBudgetTestCase, route_names
+from orders.models import Order, OrderItem, SellerOrderSummary
+from .importer import import_products
+from .models import ArtistProfile, Category, Product
+from .views import ProductListJSONView
+
+User = get_user_model()
+
+
+class ProductListSearchPagingTests(TestCase):
+    """
+    Cursor pages of a search must list the same products in the same order as the
+    numbered pages: by relevance on Postgres, newest first elsewhere.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        seller = User.objects.create_user("potter", password="pw", user_type=User.SELLER)
+        # the weaker (description-only) matches are the newest, so date order != relevance order
+        for i in range(5):
+            Product.objects.create(seller=seller, title=f"Teak bowl {i}", description="Hand carved.", price=100 + i)
+        for i in range(5):
+            Product.objects.create(seller=seller, title=f"Serving tray {i}", description="Made from teak offcuts.", price=200 + i)
+
+    def _offset_titles(self, query):
+        titles, page = [], 1
+        while True:
+            page_obj = self.client.get(reverse("product_list"), {**query, "page": page}).context["page_obj"]
+            titles += [p.title for p in page_obj]
+            if not page_obj.has_next():
+                return titles
+            page += 1
+
+    def _cursor_titles(self, query):
+        titles, params = [], {**query, "paging": "cursor"}
+        while True:
+            page_obj = self.client.get(reverse("product_list"), params).context["page_obj"]
+            titles += [p.title for p in page_obj]
+            if not page_obj.has_next:
+                return titles
+            params["cursor"] = page_obj.next_cursor
+
+    def test_cursor_pages_keep_search_order(self):
+        for query in ({"q": "teak"}, {"q": "teak", "sort": "asc"}, {}):
+            with self.subTest(**query):
+                offset = self._offset_titles(query)
+                self.assertEqual(len(offset), 10)
+                self.assertEqual(self._cursor_titles(query), offset)
+
+    def _json_titles(self, query):
+        titles, params = [], dict(query)
+        while True:
+            page = self.client.get(reverse("product_list_json"), params).json()
+            titles += [p["title"] for p in page["results"]]
+            if not page["next"]:
+                return titles
+            params["cursor"] = page["next"]
+
+    def test_json_pages_keep_search_order(self):
+        with mock.patch.object(ProductListJSONView, "page_size", 3):
+            for query in ({"q": "teak"}, {"q": "teak", "sort": "desc"}, {}):
+                with self.subTest(**query):
+                    self.assertEqual(self._json_titles(query), self._offset_titles(query))
+
+    def test_search_is_ranked_on_postgres(self):
+        if connection.vendor != "postgresql":
+            self.skipTest("full-text ranking needs PostgreSQL")
+        for titles in (self._cursor_titles({"q": "teak"}), self._json_titles({"q": "teak"})):
+            self.assertTrue(all(t.startswith("Teak bowl") for t in titles[:5]), titles)
+
+    def test_tampered_rank_cursor_gives_first_page(self):
+        token = base64.urlsafe_b64encode(json.dumps({"d": "n", "v": ["x", "y", "z"]}).encode()).decode()
+        response = self.client.get(reverse("product_list"), {"q": "teak", "paging": "cursor", "cursor": token})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context["page_obj"]), 7)
+
+
+# Tables that grow with traffic; a Seq Scan on any of these in a hot query is a regression.
+HOT_TABLES = {
+    Product._meta.db_table,
+    ArtistProfile._meta.db_table,
+    Order._meta.db_table,
+    OrderItem._meta.db_table,
+    SellerOrderSummary._meta.db_table,
+    User._meta.db_table,
+}
+
+
+def _seq_scans(plan):
+    """
+    Yield relation names of every Seq Scan node in an EXPLAIN (FORMAT JSON) plan tree.
+    """
+    if plan.get("Node Type") == "Seq Scan":
+        yield plan.get("Relation Name")
+    for child in plan.get("Plans", []):
+        yield from _seq_scans(child)
+
+
+@skipUnless(connection.vendor == "postgresql", "query plan checks need PostgreSQL (functional indexes, EXPLAIN JSON)")
+class QueryPlanTests(TestCase):
+    """
+    EXPLAIN the querysets behind the busiest views and fail if any falls back to a
+    sequential scan on a large table.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = User.objects.create_user("potter", password="pw", user_type=User.SELLER)
+        ArtistProfile.objects.create(user=cls.seller, display_name="Potter", city="Pune")
+        cls.buyer = User.objects.create_user("asha", email="asha@example.com", password="pw", user_type=User.BUYER)
+        products = [
+            Product.objects.create(seller=cls.seller, title=f"Bowl {i}", description="Thrown.", price=100 + i)
+            for i in range(20)
+        ]
+        cls.product = products[0]
+        for product in products[:5]:
+            order = Order.objects.create(buyer=cls.buyer, status=Order.STATUS_PAID, total_amount_inr=product.price)
+            OrderItem.objects.create(order=order, product=product, unit_price_inr=product.price)
+
+    def hot_queries(self):
+        active = Product.objects.filter(is_active=True)
+        return [
+            ("product_list: newest", active.order_by("-created_at")[:7]),
+            ("product_list: price asc", active.order_by("price", "-created_at")[:7]),
+            ("product_list: price desc", active.order_by("-price", "-created_at")[:7]),
+            ("product_list: city", active.filter(seller__artist_profile__city__iexact="pune").order_by("-created_at")[:7]),
+            ("edit_profile: email", User.objects.filter(email__iexact="someone@example.com")),
+            ("edit_profile: username", User.objects.filter(username__iexact="someone")),
+            ("orders containing product", OrderItem.objects.filter(product=self.product).values("order_id")),
+            (
+                "buyer_order_list",
+                Order.objects.filter(buyer=self.buyer).exclude(status=Order.STATUS_PENDING).order_by("-created_at")[:12],
+            ),
+            (
+                "seller_order_list",
+                SellerOrderSummary.objects.filter(seller=self.seller)
+                .exclude(order_status=Order.STATUS_PENDING)
+                .select_related("order")
+                .order_by("-order_created_at", "-id")[:12],
+            ),
+        ]
+
+    def test_hot_queries_use_indexes(self):
+        with connection.cursor() as cursor:
+            # make the planner prefer any usable index however small the seeded tables are;
+            # a Seq Scan that survives this means no index can serve the query
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            for label, qs in self.hot_queries():
+                with self.subTest(label):
+                    sql, params = qs.query.sql_with_params()
+                    cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+                    raw = cursor.fetchone()[0]
+                    plan = (json.loads(raw) if isinstance(raw, str) else raw)[0]["Plan"]
+                    self.assertEqual(sorted({rel for rel in _seq_scans(plan) if rel in HOT_TABLES}), [])
+
+
+class MarketQueryBudgetTests(QueryBudgetTestCase):
+    routes = route_names("market.urls")
+
+    def cases(self):
+        data = self.data
+        product, profile = data["product"], data["seller"].artist_profile
+        product_form = {
+            "title": product.title, "category": product.category_id or "", "description": product.description,
+            "price": product.price, "stock": product.stock, "is_active": "on",
+        }
+        return [
+            ("product_list", [], "get", None, None),
+            ("product_list", [], "get", "buyer", None),
+            ("product_list_json", [], "get", None, None),
+            ("product_list_json", [], "get", "buyer", None),
+            ("product_detail", [product.slug], "get", None, None),
+            ("product_detail", [product.slug], "get", "buyer", None),
+            ("seller_products", [], "get", "seller", None),
+            ("product_create", [], "get", "seller", None),
+            ("product_create", [], "post", "seller", {**product_form, "title": "Budget check vase"}),
+            ("product_import", [], "get", "seller", None),
+            ("product_import", [], "post", "seller", {"data": SimpleUploadedFile(
+                "products.csv", b"title,description,price,stock\nBudget check jug,Hand thrown.,650,4\n",
+            )}),
+            ("product_edit", [product.pk], "get", "seller", None),
+            ("product_edit", [product.pk], "post", "seller", {**product_form, "stock": product.stock + 1}),
+            ("product_delete", [data["spare_product"].pk], "post", "seller", {}),
+            ("product_image_delete", [product.images.first().pk], "post", "seller", {}),
+            ("artist_profile_manage", [], "get", "seller", None),
+            ("artist_profile_manage", [], "post", "seller", {
+                "display_name": profile.display_name, "bio": profile.bio, "contact_number": profile.contact_number or "",
+                "city": profile.city or "", "location_map_url": profile.location_map_url or "",
+            }),
+            ("artist_profile_detail", [data["seller"].artist_profile.slug], "get", "buyer", None),
+        ]
+
+    def test_routes_within_query_budget(self):
+        with tempfile.TemporaryDirectory() as media, self.settings(MEDIA_ROOT=media):
+            self.assertRoutesWithinBudget()
+
+
+class ImportProductsTests(TestCase):
+    """
+    A bad row is reported by line number and skipped; the rest of the file still imports.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = User.objects.create_user("potter", password="pw", user_type=User.SELLER)
+        Category.objects.get_or_create(slug="pottery", defaults={"name": "Pottery"})
+
+    def _import(self, text, fmt):
+        return import_products(self.seller, io.BytesIO(text.encode()), fmt)
+
+    def test_csv_row_errors(self):
+        report = self._import(
+            "title,description,price,stock,category\n"
+            "Teak bowl,Hand carved.,450,3,pottery\n"
+            "Jug,Thrown.,cheap,1,\n"
+            "Mug,Thrown.,NaN,1,\n"
+            "Vase,Thrown.,300,\u00b2,\n"
+            "Plate,Thrown.,300,-1,\n"
+            "Bowl,Thrown.,300,2147483648,\n"
+            "Lamp,Cast.,300,1,lighting\n"
+            ",No title.,300,1,\n"
+            "Serving tray,Teak offcuts.,700,2147483647,\n",
+            "csv",
+        )
+        self.assertEqual((report["rows"], report["created"], report["failed"]), (9, 2, 7))
+        self.assertEqual([line for line, _ in report["errors"]], [3, 4, 5, 6, 7, 8, 9])
+        self.assertIn("stock", dict(report["errors"])[5])
+        self.assertIn("stock", dict(report["errors"])[7])
+        self.assertEqual(
+            sorted(Product.objects.filter(seller=self.seller).values_list("title", "stock")),
+            [("Serving tray", 2147483647), ("Teak bowl", 3)],
+        )
+
+    def test_jsonl_row_errors(self):
+        report = self._import(
+            '{"title": "Teak bowl", "description": "Hand carved.", "price": 450, "stock": 3}\n'
+            "{not json\n"
+            '["a list"]\n'
+            '{"title": "Jug", "description": "Thrown.", "price": 300, "stock": 1.5}\n'
+            '{"title": "Mug", "description": "Thrown.", "price": 300, "images": "mug.jpg"}\n'
+            '{"title": "Cup", "description": "Thrown.", "price": 300, "images": 5}\n'
+            '{"title": "Jar", "description": "Thrown.", "price": 300, "images": true}\n'
+            '{"title": "Pot", "description": "Thrown.", "price": 300, "images": ["pot.jpg", {"name": "lid.jpg"}]}\n',
+            "jsonl",
+        )
+        self.assertEqual((report["created"], report["failed"]), (1, 7))
+        self.assertEqual(sorted(line for line, _ in report["errors"]), [2, 3, 4, 5, 6, 7, 8])
+        self.assertIn("images", dict(report["errors"])[6])
+        self.assertEqual(list(Product.objects.filter(seller=self.seller).values_list("title", flat=True)), ["Teak bowl"])
 
-# Create your tests here.
+    def test_decompression_bomb_fails_its_row(self):
+        png = io.BytesIO()
+        PILImage.new("RGB", (10, 10)).save(png, "PNG")
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, "w") as zf:
+            zf.writestr("bowl.png", png.getvalue())
+        archive.seek(0)
+        text = (
+            "title,description,price,images\n"
+            "Bowl,Thrown.,300,bowl.png\n"
+            "Plate,Thrown.,300,\n"
+        )
+        # 100 pixels is over twice this limit, which PIL refuses with DecompressionBombError
+        with mock.patch.object(PILImage, "MAX_IMAGE_PIXELS", 10):
+            report = import_products(self.seller, io.BytesIO(text.encode()), "csv", images=archive, dry_run=True)
+        self.assertEqual((report["created"], report["failed"]), (1, 1))
+        self.assertIn("not a valid image", dict(report["errors"])[2])
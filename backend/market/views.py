@@ -1,4 +1,6 @@
-from django.shortcuts import render, get_list_or_404, redirect, get_object_or_404
+import uuid
+
+from django.shortcuts import render, redirect, get_object_or_404
 from django.views import View
 from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
 from django.contrib.auth.mixins import LoginRequiredMixin
@@ -11,18 +13,32 @@ from django.urls import reverse
 
 from django.views.decorators.http import require_POST
 from django.views.decorators.cache import cache_page
+from django.core.cache import cache
+from django.core.files.storage import default_storage
 from django.utils.decorators import method_decorator
-from django.http import HttpResponseForbidden
+from django.http import HttpResponseForbidden, JsonResponse
 from django.views.generic import TemplateView
 
 from django.http import Http404
 from django.db.models.query import QuerySet
-from django.db.models import Q
+from django.db.models import Q, Sum
+from django.utils import timezone
+from datetime import timedelta
 from decimal import Decimal, InvalidOperation
 
 from django.db import models
 from .models import Product, ProductImage, ArtistProfile, Category
-from .forms import ArtistProfileForm, ProductForm, ProductImageForm
+from .forms import ArtistProfileForm, ProductForm, ProductImageForm, ProductImportForm
+from .importer import import_format
+from .tasks import import_products_upload, import_result_key
+from .search import search_products
+from .pagination import CursorPaginator, use_cursor_pagination, CURSOR_PARAM
+from .facets import get_facets
+from .sections import get_section
+from .product_cache import get_product_detail
+from orders.models import ProductDailyStats, SellerDailyStats
+
+DASHBOARD_DAYS = 30  # days shown in the seller revenue chart
 
 ALLOWED_IMAGE_CONTENT_TYPES = ("image/png", "image/jpeg", "image/jpg", "image/webp")
 MAX_IMAGE_SIZE = 2 * 1024 * 1024
@@ -40,30 +56,40 @@ def validate_image_file(f):
 # Create your views here.
 PAGE_CACHE_TTL  = getattr(settings, "HOME_CACHE_TTL", 30)  # seconds (set to e.g. 60 in dev, 300+ in prod)
 
-@method_decorator(cache_page(PAGE_CACHE_TTL ), name="dispatch")
+def _featured_products():
+    # Featured products (explicitly flagged) fallback to latest if none
+    qs = Product.objects.filter(is_active=True).order_by("-created_at")
+    return list(qs.select_related("seller", "category").prefetch_related("images")[:6])
+
+
+def _trending_products():
+    # Latest products (limit); paginated per request from the cached list
+    qs = Product.objects.filter(is_active=True).order_by("-created_at")
+    return list(qs.select_related("seller", "category").prefetch_related("images")[:8])
+
+
+def _top_artisans():
+    # Top artisans: ArtistProfile with product counts
+    return list(ArtistProfile.objects.select_related("user").annotate(
+        product_count=models.Count("user__product")
+    ).order_by("-product_count", "-id")[:6])
+
+
 class HomeView(TemplateView):
+    """
+    Each section is cached on its own (market.sections): own TTL, single-flight
+    rebuilds, stale content served meanwhile, invalidated by product/artisan writes.
+    """
     template_name = "home.html"
+    read_replica = True
+    query_budget = 6
 
     def get_context_data(self, **kwargs):
         ctx = super().get_context_data(**kwargs)
 
-        # Featured products (explicitly flagged) fallback to latest if none
-        featured_qs = Product.objects.filter(is_active=True).order_by("-created_at")
-        if not featured_qs.exists():
-            featured_qs = Product.objects.filter(is_active=True).order_by("-created_at")
-
-        # Latest products (limit)
-        latest_qs = Product.objects.filter(is_active=True).order_by("-created_at")
-
-        # Top artisans: ArtistProfile with product counts (prefetch/products)
-        artisans_qs = ArtistProfile.objects.select_related("user").annotate(
-            product_count=models.Count("user__product")
-        ).order_by("-product_count", "-id")
-
-        # Optimize product queries: select_related for seller & category, prefetch images
-        featured_products = featured_qs.select_related("seller", "category").prefetch_related("images")[:6]
-        latest_products = latest_qs.select_related("seller", "category").prefetch_related("images")[:8]
-        top_artisans = artisans_qs[:6]
+        featured_products = get_section("featured", _featured_products)
+        latest_products = get_section("trending", _trending_products)
+        top_artisans = get_section("top_artisans", _top_artisans)
 
         # Optional: paginate latest products on homepage (example)
         page = self.request.GET.get("page", 1)
@@ -89,6 +115,7 @@ class HomeView(TemplateView):
 @method_decorator(cache_page(PAGE_CACHE_TTL), name="dispatch")
 class AboutView(TemplateView):
     template_name = "static/about.html"
+    query_budget = 1
 
     def get_context_data(self, **kwargs):
         ctx = super().get_context_data(**kwargs)
@@ -105,6 +132,7 @@ class AboutView(TemplateView):
 @method_decorator(cache_page(PAGE_CACHE_TTL), name="dispatch")
 class HelpCenterView(TemplateView):
     template_name = "static/help_center.html"
+    query_budget = 1
 
     def get_context_data(self, **kwargs):
         ctx = super().get_context_data(**kwargs)
@@ -123,6 +151,7 @@ class HelpCenterView(TemplateView):
 @method_decorator(cache_page(PAGE_CACHE_TTL), name="dispatch")
 class ShippingView(TemplateView):
     template_name = "static/shipping.html"
+    query_budget = 1
 
     def get_context_data(self, **kwargs):
         ctx = super().get_context_data(**kwargs)
@@ -139,111 +168,130 @@ class ShippingView(TemplateView):
         return ctx
     
 
-class ProductListView(View):
-    def get(self, request):
-        q = request.GET.get("q", "").strip()
+def _listing_filters(request):
+    return {key: request.GET.get(key, "").strip() for key in ("q", "category", "min_price", "max_price", "city", "sort")}
 
-        # fetch the filtering fields
-        cat = request.GET.get("category", "").strip()
-        min_price = request.GET.get("min_price", "").strip()
-        max_price = request.GET.get("max_price", "").strip()
-        print(min_price, max_price)
-        city = request.GET.get("city", "").strip()
-        sort = request.GET.get("sort", "").strip()
 
-        products = Product.objects.filter(is_active=True).select_related("category", "seller").prefetch_related("images").order_by("-created_at")
-        if q:
-            products = products.filter(Q(title__icontains=q) | Q(description__icontains=q))
+def _filtered_products(filters):
+    """
+    Active products matching the storefront filters (``_listing_filters``), sorted.
+    """
+    products = Product.objects.filter(is_active=True).select_related("category", "seller").prefetch_related("images").order_by("-created_at")
+    if filters["q"]:
+        # ranked full-text search on Postgres, icontains fallback elsewhere
+        products = search_products(products, filters["q"])
 
-        if cat and cat.lower() not in ("", "all"):
-            products = products.filter(category__slug=cat)
+    cat = filters["category"]
+    if cat and cat.lower() not in ("", "all"):
+        products = products.filter(category__slug=cat)
 
-        # price range safe parsing
+    # price range safe parsing
+    for key, lookup in (("min_price", "price__gte"), ("max_price", "price__lte")):
         try:
-            if min_price:
-                print("MIN PRICE:", min_price)
-                mp = Decimal(min_price)
-                print("MIN PRICE:", mp)
-                products = products.filter(price__gte=mp)
-                print("MIN PRICE:", mp)
-        except (InvalidOperation, ValueError):
-            pass
-        
-        
-        try:
-            if max_price:
-                print("MAX PRICE:", max_price)
-                xp = Decimal(max_price)
-                print("MAX PRICE:", xp)
-                products = products.filter(price__lte=xp)
-                print("MAX PRICE:", xp)
+            if filters[key]:
+                products = products.filter(**{lookup: Decimal(filters[key])})
         except (InvalidOperation, ValueError):
             pass
 
-        if city:
-            products = products.filter(seller__artist_profile__city__iexact=city)
-        
-        if sort=="asc":
-            products = products.order_by("price", "-created_at")
-        elif sort=="desc":
-            products = products.order_by("-price", "-created_at")
-        else:
-            pass
+    if filters["city"]:
+        products = products.filter(seller__artist_profile__city__iexact=filters["city"])
+
+    if filters["sort"] == "asc":
+        products = products.order_by("price", "-created_at")
+    elif filters["sort"] == "desc":
+        products = products.order_by("-price", "-created_at")
+    return products
+
+
+def _cursor_ordering(products, sort):
+    """
+    Keyset for ``_filtered_products``: it must follow the sort option, and ranked
+    searches (Postgres) stay in relevance order.
+    """
+    if sort == "asc":
+        return ("price", "id")
+    if sort == "desc":
+        return ("-price", "-id")
+    if "rank" in products.query.annotations:
+        return ("-rank", "-created_at", "-id")
+    return ("-created_at", "-id")
 
-        paginator = Paginator(products, 7)
-        page_number = request.GET.get("page")
-        page_obj = paginator.get_page(page_number)
+
+class ProductListView(View):
+    read_replica = True  # crafty_backend.db_router
+    query_budget = 6
+
+    def get(self, request):
+        filters = _listing_filters(request)
+        products = _filtered_products(filters)
+
+        if use_cursor_pagination(request):
+            # keyset pages: no COUNT(*), no OFFSET
+            page_obj = CursorPaginator(products, 7, _cursor_ordering(products, filters["sort"])).get_page(request.GET.get(CURSOR_PARAM), request=request)
+        else:
+            paginator = Paginator(products, 7)
+            page_number = request.GET.get("page")
+            page_obj = paginator.get_page(page_number)
         
-        cats = Category.objects.all().order_by("name")
-        cities = (Product.objects.values_list("seller__artist_profile__city", flat=True)
-                  .distinct()
-                  .exclude(seller__artist_profile__city__isnull=True)
-                  .exclude(seller__artist_profile__city__exact="")
-                  .order_by("seller__artist_profile__city")
-                )
-        cities = set(city.title() for city in cities)
-        active_filters = {
-            "q": q,
-            "category": cat,
-            "min_price": min_price,
-            "max_price": max_price,
-            "city": city,
-            "sort": sort,
-        }
+        # sidebar filters come from the versioned facet cache (no queries when warm)
+        facets = get_facets()
+        cats = facets["categories"]
+        cities = facets["cities"]
         
-        return render(request, "market/product_list.html", {"page_obj":page_obj, "q":q, "categories": cats, "cities": cities, "active_filters": active_filters})
+        return render(request, "market/product_list.html", {"page_obj":page_obj, "q":filters["q"], "categories": cats, "cities": cities, "active_filters": filters})
     
 
+class ProductListJSONView(View):
+    """
+    The product listing as JSON (same filters as ProductListView), for scripts and
+    infinite scroll. Async, and keyset-paged only (``?cursor=``), so no COUNT(*).
+    """
+    read_replica = True  # crafty_backend.db_router
+    query_budget = 2
+    page_size = 24
+
+    async def get(self, request):
+        filters = _listing_filters(request)
+        products = _filtered_products(filters)
+        paginator = CursorPaginator(products, self.page_size, _cursor_ordering(products, filters["sort"]))
+        page = await paginator.aget_page(request.GET.get(CURSOR_PARAM))
+        results = []
+        for product in page:
+            images = product.images.all()
+            results.append({
+                "id": product.pk,
+                "title": product.title,
+                "slug": product.slug,
+                "url": reverse("product_detail", args=[product.slug]),
+                "price": str(product.price),
+                "category": product.category.name if product.category else None,
+                "seller": product.seller.username,
+                "image": images[0].display_url if images else None,
+            })
+        return JsonResponse({"results": results, "next": page.next_cursor, "previous": page.previous_cursor})
+
+
 class ProductDetailView(View):
+    read_replica = True
+    query_budget = 3
+
     def get(self, request, slug):
-        product = get_list_or_404(Product, slug=slug, is_active=True)
-        seller_profile = None
-        # if hasattr(product.seller, "artist_profile"):
-        #     seller_profile = product.seller.artist_profile
-        # images = product.images.all()
-        if isinstance(product, (list, tuple, QuerySet)):
-            try:
-                product = product[0]
-            except Exception:
-                raise Http404("Product not found")
-
-        # Safely get seller profile (works even if seller or artist_profile missing)
-        seller_profile = None
-        seller = getattr(product, "seller", None)
-        if seller:
-            seller_profile = getattr(seller, "artist_profile", None)
-
-        images = product.images.all() if hasattr(product, "images") else []
-        return render(request, "market/product_detail.html", {"product":product, "seller_profile":seller_profile, "images":images})
+        # cached read model (market.product_cache): product, seller profile and images
+        detail = get_product_detail(slug)
+        if detail is None:
+            raise Http404("Product not found")
+        return render(request, "market/product_detail.html", detail)
     
 class SellerProductsView(LoginRequiredMixin, View):
+    query_budget = 4
     def get(self, request):
         if request.user.user_type != request.user.SELLER:
             messages.error(request, "Only sellers can access the seller dashboard")
-        products = Product.objects.filter(seller=request.user).order_by("-created_at")
+        products = Product.objects.filter(seller=request.user).order_by("-created_at").prefetch_related("images")
         return render(request, "market/seller/products.html", {"products":products})
     
 class ProductCreateView(LoginRequiredMixin, View):
+    query_budget = 11
     def get(self, request):
         if request.user.user_type != request.user.SELLER:
             messages.error(request, "Only seller can create product.")
@@ -280,7 +328,44 @@ class ProductCreateView(LoginRequiredMixin, View):
             # return redirect("seller_products")
         return render(request, "market/seller/product_form.html", {"form":form})
     
+class ProductImportView(LoginRequiredMixin, View):
+    """
+    Bulk upload: the files are stored and imported by a Celery task (market.importer);
+    the page then shows the task's report, polling until it is ready.
+    """
+    query_budget = 7
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.user.is_authenticated and request.user.user_type != request.user.SELLER:
+            messages.error(request, "Only sellers can import products")
+            return redirect("home")
+        return super().dispatch(request, *args, **kwargs)
+
+    def get(self, request):
+        import_id = request.GET.get("id", "")
+        report = cache.get(import_result_key(request.user.pk, import_id)) if import_id else None
+        return render(request, "market/seller/product_import.html", {
+            "form": ProductImportForm(), "import_id": import_id, "report": report,
+        })
+
+    def post(self, request):
+        form = ProductImportForm(request.POST, request.FILES)
+        if not form.is_valid():
+            return render(request, "market/seller/product_import.html", {"form": form})
+        import_id = uuid.uuid4().hex
+        data = form.cleaned_data["data"]
+        images = form.cleaned_data.get("images")
+        data_name = default_storage.save(f"imports/{import_id}-{data.name}", data)
+        images_name = default_storage.save(f"imports/{import_id}-{images.name}", images) if images else None
+        transaction.on_commit(lambda: import_products_upload.delay(
+            import_id, request.user.pk, data_name, import_format(data.name), images_name,
+        ))
+        messages.success(request, "Upload received. Your products are being imported.")
+        return redirect(f"{reverse('product_import')}?id={import_id}")
+
+
 class ProductUpdateView(LoginRequiredMixin, View):
+    query_budget = 10
     def get_product_or_404(self, pk, user):
         product_qs = Product.objects.filter(pk=pk, seller=user)
         product_obj = product_qs.first()
@@ -327,6 +412,7 @@ class ProductUpdateView(LoginRequiredMixin, View):
 
     
 class ProductDeleteView(LoginRequiredMixin, View):
+    query_budget = 11
     def post(self, request, pk):
         # robust retrieval
         product_qs = Product.objects.filter(pk=pk, seller=request.user)
@@ -346,6 +432,7 @@ class ProductDeleteView(LoginRequiredMixin, View):
         return redirect("seller_products")
 
 class ProductImageDeleteView(LoginRequiredMixin, View):
+    query_budget = 7
     @method_decorator(require_POST)
     def post(self, request, pk):
         img = get_object_or_404(ProductImage, pk=pk)
@@ -357,9 +444,11 @@ class ProductImageDeleteView(LoginRequiredMixin, View):
     
 class SellerDashboardView(LoginRequiredMixin, View):
     """
-    Seller dashboard: shows quick actions and counts.
+    Seller dashboard: shows quick actions, lifetime totals and a daily revenue chart.
     Only accessible to users with user_type == 'seller'.
+    Reads only the per-day rollup rows, so its cost doesn't grow with order history.
     """
+    query_budget = 7
     def get(self, request):
         # guard: only sellers allowed
         if getattr(request.user, "user_type", None) != User.SELLER:
@@ -369,13 +458,46 @@ class SellerDashboardView(LoginRequiredMixin, View):
         # product count for this seller
         products_count = Product.objects.filter(seller=request.user).count()
 
-        # orders_count placeholder (Module 3 will replace with real data)
-        orders_count = 0
-        # if you have an Order model, set orders_count = Order.objects.filter(seller=request.user).count()
+        # sales figures come from the daily rollups (orders.rollups), never from order items
+        today = timezone.localdate()
+        since = today - timedelta(days=DASHBOARD_DAYS - 1)
+        stats = SellerDailyStats.objects.filter(seller=request.user)
+        totals = stats.aggregate(
+            orders=Sum("orders", default=0),
+            units=Sum("units", default=0),
+            revenue=Sum("revenue_inr", default=Decimal("0.00")),
+            cancelled=Sum("cancelled_units", default=0),
+        )
+        daily = {row.day: row for row in stats.filter(day__gte=since)}
+        peak = max((row.revenue_inr for row in daily.values()), default=Decimal("0.00"))
+        chart = []
+        for offset in range(DASHBOARD_DAYS):
+            day = since + timedelta(days=offset)
+            row = daily.get(day)
+            revenue = row.revenue_inr if row else Decimal("0.00")
+            chart.append({
+                "day": day,
+                "orders": row.orders if row else 0,
+                "revenue": revenue,
+                "height": int(revenue * 100 / peak) if peak else 0,  # bar height in %
+            })
+        top_products = (
+            ProductDailyStats.objects.filter(seller=request.user, day__gte=since)
+            .values("product__title", "product__slug")
+            .annotate(units=Sum("units"), revenue=Sum("revenue_inr"))
+            .order_by("-revenue")[:5]
+        )
 
         context = {
             "products_count": products_count,
-            "orders_count": orders_count,
+            "orders_count": totals["orders"],
+            "units_sold": totals["units"],
+            "total_revenue": totals["revenue"],
+            "cancelled_units": totals["cancelled"],
+            "recent_revenue": sum(point["revenue"] for point in chart),
+            "recent_days": DASHBOARD_DAYS,
+            "chart": chart,
+            "top_products": top_products,
         }
         return render(request, "seller/dashboard.html", context)
     
@@ -384,6 +506,7 @@ class CreateOrEditArtistProfileView(LoginRequiredMixin, View):
     If seller already has a profile, show edit form (GET) and handle update (POST).
     Otherwise show create form and handle creation.
     """
+    query_budget = 6
     def dispatch(self, request, *args, **kwargs):
         if getattr(request.user, "user_type", None) != "seller" and not request.user.is_staff:
             return HttpResponseForbidden("Only sellers can create/edit artist profile.")
@@ -418,6 +541,9 @@ class CreateOrEditArtistProfileView(LoginRequiredMixin, View):
     
 
 class ArtistProfileDetailView(LoginRequiredMixin, View):
+    read_replica = True
+    query_budget = 4
+
     def get(self, request,**kwargs):
         profile = None
         if 'slug' in kwargs and kwargs['slug']:
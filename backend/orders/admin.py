@@ -1,4 +1,7 @@
 from django.contrib import admin
+
+from crafty_backend.large_admin import LargeTableAdminMixin
+
 from .models import Order, OrderItem, Payment
 
 
@@ -10,6 +13,10 @@ class OrderItemInline(admin.TabularInline):
     fields = ("product", "unit_price_inr", "quantity", "line_total_inr")
     can_delete = False
 
+    def get_queryset(self, request):
+        # the read-only product column renders str(product) for every row
+        return super().get_queryset(request).select_related("product")
+
     def line_total_inr(self, obj):
         if not obj:
             return "-"
@@ -22,15 +29,24 @@ class OrderItemInline(admin.TabularInline):
     line_total_inr.short_description = "Line total"
 
 @admin.register(Payment)
-class PaymentAdmin(admin.ModelAdmin):
-    list_display = ("id", "order", "razorpay_payment_id", "amount_inr", "created_at")
-    search_fields = ("razorpay_payment_id", "order__id")
+class PaymentAdmin(LargeTableAdminMixin, admin.ModelAdmin):
+    list_display = ("id", "order", "razorpay_payment_id", "amount_inr", "status", "created_at")
+    list_select_related = ("order",)
+    autocomplete_fields = ("order",)
+    ordering = ("-pk",)
+    # numeric terms match the payment or order id (LargeTableAdminMixin)
+    search_fields = ("razorpay_payment_id__exact",)
+    search_pk_fields = ("pk", "order_id")
 
 
 @admin.register(Order)
-class OrderAdmin(admin.ModelAdmin):
+class OrderAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     inlines = [OrderItemInline]
     list_display = ("id", "buyer", "total_amount_inr", "status", "razorpay_order_id", "created_at", "updated_at")
+    list_select_related = ("buyer",)
     list_filter = ("status", "created_at", "updated_at")
-    search_fields = ("buyer__username", "razorpay_order_id")
-    readonly_fields = ("created_at", "updated_at")
\ No newline at end of file
+    autocomplete_fields = ("buyer",)
+    ordering = ("-pk",)
+    # every lookup here has an index; numeric terms match the order id (LargeTableAdminMixin)
+    search_fields = ("=buyer__username", "=buyer__email", "razorpay_order_id__exact")
+    readonly_fields = ("created_at", "updated_at")
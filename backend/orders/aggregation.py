@@ -0,0 +1,108 @@
+import threading
+from contextlib import contextmanager
+
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .models import Order, OrderItem, SellerOrderSummary, aggregate_status
+from .rollups import refresh_rollups_for_orders
+
+_state = threading.local()
+
+
+def _pending():
+    if not hasattr(_state, "status"):
+        _state.status = set()
+        _state.summary = set()
+        _state.deleting = frozenset()
+    return _state
+
+
+@contextmanager
+def orders_being_deleted(order_ids):
+    """
+    Item writes to ``order_ids`` inside the block queue no aggregation: the orders
+    are being deleted (orders.reaper), so there is nothing left to recompute.
+    """
+    state = _pending()
+    previous = state.deleting
+    state.deleting = previous | set(order_ids)
+    try:
+        yield
+    finally:
+        state.deleting = previous
+
+
+def mark_order_dirty(order_id, recompute_status=True):
+    """
+    Queue ``order_id`` for aggregation when the current transaction commits
+    (immediately in autocommit). Any number of item writes to the same order in
+    one transaction cost a single recompute.
+    """
+    state = _pending()
+    if order_id is None or order_id in state.deleting:
+        return
+    (state.status if recompute_status else state.summary).add(order_id)
+    # one callback per mark keeps this correct when a savepoint rolls back;
+    # the first callback to run drains the queue and the rest are no-ops
+    transaction.on_commit(flush_dirty_orders)
+
+
+def flush_dirty_orders():
+    state = _pending()
+    status_ids, summary_ids = state.status, state.summary | state.status
+    if not summary_ids:
+        return
+    state.status, state.summary = set(), set()
+    if status_ids:
+        recompute_order_statuses(status_ids)
+    for order in Order.objects.filter(pk__in=summary_ids):
+        SellerOrderSummary.rebuild_for_order(order)
+    # daily seller/product sales buckets these orders fall into
+    refresh_rollups_for_orders(summary_ids)
+
+
+def recompute_order_statuses(order_ids):
+    """
+    Re-derive ``Order.status`` for a batch with one aggregate query, then one
+    UPDATE per resulting status. Returns ``{order_id: new_status}`` for changed orders.
+    """
+    order_ids = list(order_ids)
+    rows = (
+        OrderItem.objects.filter(order_id__in=order_ids)
+        .values("order_id")
+        .annotate(
+            n_processing=Count("pk", filter=Q(status=OrderItem.STATUS_PROCESSING)),
+            n_shipped=Count("pk", filter=Q(status=OrderItem.STATUS_SHIPPED)),
+            n_delivered=Count("pk", filter=Q(status=OrderItem.STATUS_DELIVERED)),
+            n_cancelled=Count("pk", filter=Q(status=OrderItem.STATUS_CANCELLED)),
+        )
+        .order_by()
+    )
+    item_statuses = {
+        row["order_id"]: {
+            status for status, key in (
+                (OrderItem.STATUS_PROCESSING, "n_processing"),
+                (OrderItem.STATUS_SHIPPED, "n_shipped"),
+                (OrderItem.STATUS_DELIVERED, "n_delivered"),
+                (OrderItem.STATUS_CANCELLED, "n_cancelled"),
+            ) if row[key]
+        }
+        for row in rows
+    }
+
+    changed = {}
+    for order_id, current in Order.objects.filter(pk__in=order_ids).values_list("pk", "status"):
+        new = aggregate_status(item_statuses.get(order_id, ()), current)
+        if new != current:
+            changed[order_id] = new
+
+    by_status = {}
+    for order_id, status in changed.items():
+        by_status.setdefault(status, []).append(order_id)
+    now = timezone.now()
+    for status, ids in by_status.items():
+        # update() skips Order post_save; summaries are rebuilt by the caller
+        Order.objects.filter(pk__in=ids).update(status=status, updated_at=now)
+    return changed
@@ -1,63 +1,115 @@
-from django.shortcuts import get_object_or_404
-from market.models import Product
+from decimal import Decimal
+from django.db.models import Prefetch
+from market.models import Product, ProductImage
+from .cart_store import CartBusy, aget_cart_store, get_cart_store
 
-SESSION_KEY = "cart"
+# Columns the cart/checkout pages actually read from a product row.
+CART_PRODUCT_FIELDS = ("id", "title", "slug", "price", "stock", "is_active", "seller__username")
 
-def get_cart(session):
-    return session.get(SESSION_KEY, {})
+def _product_id(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
 
-def save_cart(session, cart):
-    session[SESSION_KEY] = cart
-    session.modified = True
+def get_cart(session):
+    return {str(pid): qty for pid, qty in get_cart_store(session).lines().items()}
 
 def add_to_cart(session, product_id, qty=1):
-    cart = get_cart(session)
-    cart[str(product_id)] = cart.get(str(product_id), 0) + int(qty)
-    save_cart(session, cart)
+    product_id, qty = _product_id(product_id), int(qty)
+    if product_id is None or qty <= 0:
+        return
+    get_cart_store(session, create=True).incr(product_id, qty)
+
+async def aadd_to_cart(session, product_id, qty=1):
+    product_id, qty = _product_id(product_id), int(qty)
+    if product_id is None or qty <= 0:
+        return
+    store = await aget_cart_store(session, create=True)
+    await store.aincr(product_id, qty)
+
+def set_quantities(session, quantities):
+    """
+    Apply several ``{product_id: qty}`` changes in one store write; qty <= 0 removes the line.
+    """
+    changes = {}
+    for pid, qty in quantities.items():
+        pid = _product_id(pid)
+        if pid is not None:
+            changes[pid] = int(qty)
+    if changes:
+        get_cart_store(session, create=True).update(changes)
 
 def set_quantity(session, product_id, qty):
-    cart = get_cart(session)
-    
-    if int(qty) <= 0:
-        if str(product_id) in cart:
-            del cart[str(product_id)]
-    else:
-        cart[str(product_id)] = int(qty)
-    
-    save_cart(session, cart)
+    set_quantities(session, {product_id: qty})
     
 def remove_from_cart(session, product_id):
-    cart = get_cart(session)
-    cart.pop(str(product_id), None)
-    save_cart(session, cart)
+    product_id = _product_id(product_id)
+    if product_id is not None:
+        get_cart_store(session).remove(product_id)
 
 def clear_cart(session):
-    if SESSION_KEY in session:
-        del session[SESSION_KEY]
-        session.modified = True
+    get_cart_store(session).clear()
+
+def resolve_cart(session):
+    """
+    Price every cart line with a single bulk product query.
+
+    Returns ``(items, total, dropped)``:
+    - ``items``: priced line dicts (product, image, quantity, unit_price_inr, total)
+    - ``total``: exact ``Decimal`` sum of the line totals
+    - ``dropped``: product ids that are missing or inactive; those lines (and
+      non-positive ones) are removed from the cart.
+    """
+    store = get_cart_store(session)
+    quantities = store.lines()
+
+    products = (
+        Product.objects.filter(pk__in=quantities, is_active=True)
+        .select_related("seller")
+        .only(*CART_PRODUCT_FIELDS)
+        .prefetch_related(Prefetch("images", queryset=ProductImage.objects.only("id", "product_id", "image", "order")))
+        .in_bulk()
+    ) if quantities else {}
 
-def cart_items_and_total(session):
-    cart = get_cart(session)
     items = []
-    total = 0
-    for pid, qty in cart.items():
-        product = get_object_or_404(Product, pk=int(pid))
+    total = Decimal("0.00")
+    dropped = []
+    for pid, qty in quantities.items():
+        if qty <= 0:
+            continue
+        product = products.get(pid)
+        if product is None:
+            dropped.append(pid)
+            continue
+        images = product.images.all()
+        line_total = product.price * qty
         items.append({
-            "product":product,
-            "quantity":qty,
-            "unit_price_inr":product.price,
-            "total":product.price * qty
-        }) 
-        total += float(product.price) * qty
-    
+            "product": product,
+            "image": images[0] if images else None,
+            "quantity": qty,
+            "unit_price_inr": product.price,
+            "total": line_total,
+        })
+        total += line_total
+
+    # drop stale lines so the next request doesn't pay for them again
+    kept = {it["product"].pk for it in items}
+    if len(kept) != len(quantities):
+        try:
+            store.remove(*(pid for pid in quantities if pid not in kept))
+        except CartBusy:
+            pass  # another request holds the cart; the next page view retries the cleanup
+
+    return items, total, dropped
+
+def cart_items_and_total(session):
+    items, total, _ = resolve_cart(session)
     return items, total
 
 def cart_total_quantity(session):
-    cart = get_cart(session)
-    total_qty = 0
-    for v in cart.values():
-        try:
-            total_qty += int(v)
-        except Exception:
-            continue
-    return total_qty
+    return sum(qty for qty in get_cart_store(session).lines().values() if qty > 0)
+
+async def acart_total_quantity(session):
+    store = await aget_cart_store(session)
+    return sum(qty for qty in (await store.alines()).values() if qty > 0)
@@ -0,0 +1,393 @@
+import asyncio
+import threading
+import time
+import uuid
+from contextlib import asynccontextmanager, contextmanager
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import SESSION_KEY as AUTH_SESSION_KEY
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from market.models import Product
+from .models import CartItem
+
+# Where anonymous carts live: "session" (default), "cache" (Django cache) or "redis".
+# Logged-in buyers always get a durable cart (CartItem rows).
+CART_STORE = getattr(settings, "CART_STORE", "session")
+CART_REDIS_URL = getattr(settings, "CART_REDIS_URL", "redis://localhost:6379/1")
+CART_TTL = getattr(settings, "CART_TTL", 60 * 60 * 24 * 30)  # anonymous carts expire after 30 days idle
+CART_LOCK_TIMEOUT = 5
+CART_LOCK_WAIT = 2.0
+
+SESSION_KEY = "cart"  # legacy/session cart: {"<product_id>": qty}
+TOKEN_SESSION_KEY = "cart_token"  # id of an anonymous cache/redis cart
+
+
+class CartBusy(Exception):
+    """
+    Another request held the cart lock for longer than ``CART_LOCK_WAIT``; nothing was written.
+    """
+
+
+def _cart_quantities(cart):
+    """
+    Normalise a raw cart mapping into ``{product_id: qty}``, skipping junk entries.
+    """
+    quantities = {}
+    for pid, qty in cart.items():
+        try:
+            quantities[int(pid)] = int(qty)
+        except (TypeError, ValueError):
+            continue
+    return quantities
+
+
+def _split(changes):
+    """
+    ``{pid: qty}`` -> (lines to write, product ids to drop); qty <= 0 removes the line.
+    """
+    keep, drop = {}, []
+    for pid, qty in changes.items():
+        if qty > 0:
+            keep[pid] = qty
+        else:
+            drop.append(pid)
+    return keep, drop
+
+
+class SessionCartStore:
+    """
+    Cart inside the Django session. Every write rewrites the session row, so
+    callers batch changes through ``update``.
+    """
+
+    def __init__(self, session):
+        self.session = session
+
+    def _save(self, cart):
+        self.session[SESSION_KEY] = cart
+        self.session.modified = True
+
+    def lines(self):
+        return _cart_quantities(self.session.get(SESSION_KEY, {}))
+
+    async def alines(self):
+        return _cart_quantities(await self.session.aget(SESSION_KEY, {}))
+
+    def incr(self, product_id, qty):
+        cart = self.session.get(SESSION_KEY, {})
+        cart[str(product_id)] = int(cart.get(str(product_id), 0)) + qty
+        self._save(cart)
+
+    async def aincr(self, product_id, qty):
+        cart = await self.session.aget(SESSION_KEY, {})
+        cart[str(product_id)] = int(cart.get(str(product_id), 0)) + qty
+        await self.session.aset(SESSION_KEY, cart)
+
+    def update(self, changes):
+        keep, drop = _split(changes)
+        cart = self.session.get(SESSION_KEY, {})
+        cart.update({str(pid): qty for pid, qty in keep.items()})
+        for pid in drop:
+            cart.pop(str(pid), None)
+        self._save(cart)
+
+    def remove(self, *product_ids):
+        cart = self.session.get(SESSION_KEY, {})
+        for pid in product_ids:
+            cart.pop(str(pid), None)
+        self._save(cart)
+
+    def clear(self):
+        if SESSION_KEY in self.session:
+            del self.session[SESSION_KEY]
+            self.session.modified = True
+
+
+class CacheCartStore:
+    """
+    Anonymous cart as one Django cache entry. Writes are read-modify-write under a
+    short ``cache.add`` lock, so it needs a shared cache (Redis/Memcached) in production.
+    """
+
+    def __init__(self, token):
+        self.key = f"cart:{token}"
+
+    def lines(self):
+        return dict(cache.get(self.key) or {})
+
+    async def alines(self):
+        return dict(await cache.aget(self.key) or {})
+
+    @contextmanager
+    def _locked(self):
+        lock, token = f"{self.key}:lock", uuid.uuid4().hex
+        deadline = time.monotonic() + CART_LOCK_WAIT
+        while not cache.add(lock, token, CART_LOCK_TIMEOUT):
+            if time.monotonic() >= deadline:
+                raise CartBusy(self.key)
+            time.sleep(0.01)
+        try:
+            yield
+        finally:
+            # only release our own lock: if we overran CART_LOCK_TIMEOUT another worker may hold it now
+            if cache.get(lock) == token:
+                cache.delete(lock)
+
+    @asynccontextmanager
+    async def _alocked(self):
+        lock, token = f"{self.key}:lock", uuid.uuid4().hex
+        deadline = time.monotonic() + CART_LOCK_WAIT
+        while not await cache.aadd(lock, token, CART_LOCK_TIMEOUT):
+            if time.monotonic() >= deadline:
+                raise CartBusy(self.key)
+            await asyncio.sleep(0.01)
+        try:
+            yield
+        finally:
+            if await cache.aget(lock) == token:
+                await cache.adelete(lock)
+
+    def _mutate(self, fn):
+        with self._locked():
+            lines = self.lines()
+            fn(lines)
+            if lines:
+                cache.set(self.key, lines, CART_TTL)
+            else:
+                cache.delete(self.key)
+
+    def incr(self, product_id, qty):
+        def apply(lines):
+            lines[product_id] = lines.get(product_id, 0) + qty
+        self._mutate(apply)
+
+    async def aincr(self, product_id, qty):
+        async with self._alocked():
+            lines = await self.alines()
+            lines[product_id] = lines.get(product_id, 0) + qty
+            await cache.aset(self.key, lines, CART_TTL)
+
+    def update(self, changes):
+        keep, drop = _split(changes)
+
+        def apply(lines):
+            lines.update(keep)
+            for pid in drop:
+                lines.pop(pid, None)
+        self._mutate(apply)
+
+    def remove(self, *product_ids):
+        self.update({pid: 0 for pid in product_ids})
+
+    def clear(self):
+        cache.delete(self.key)
+
+
+_redis = None
+_redis_lock = threading.Lock()
+
+
+def _redis_client():
+    global _redis
+    if _redis is None:
+        with _redis_lock:
+            if _redis is None:
+                import redis
+                _redis = redis.Redis.from_url(CART_REDIS_URL)
+    return _redis
+
+
+class RedisCartStore:
+    """
+    Anonymous cart as a Redis hash (product id -> qty): HINCRBY makes adds atomic
+    per line, and multi-line updates go out in one MULTI/EXEC pipeline.
+    """
+
+    def __init__(self, token, client=None):
+        self.key = f"crafty:cart:{token}"
+        self.client = client or _redis_client()
+
+    def lines(self):
+        return _cart_quantities(self.client.hgetall(self.key))
+
+    # the shared blocking client is thread-safe; keep its round trips off the event loop
+    async def alines(self):
+        return await sync_to_async(self.lines, thread_sensitive=False)()
+
+    def incr(self, product_id, qty):
+        pipe = self.client.pipeline()
+        pipe.hincrby(self.key, product_id, qty)
+        pipe.expire(self.key, CART_TTL)
+        pipe.execute()
+
+    async def aincr(self, product_id, qty):
+        await sync_to_async(self.incr, thread_sensitive=False)(product_id, qty)
+
+    def update(self, changes):
+        keep, drop = _split(changes)
+        pipe = self.client.pipeline()
+        if keep:
+            pipe.hset(self.key, mapping=keep)
+        if drop:
+            pipe.hdel(self.key, *drop)
+        pipe.expire(self.key, CART_TTL)
+        pipe.execute()
+
+    def remove(self, *product_ids):
+        if product_ids:
+            self.client.hdel(self.key, *product_ids)
+
+    def clear(self):
+        self.client.delete(self.key)
+
+
+class UserCartStore:
+    """
+    Durable cart of a logged-in buyer: one CartItem row per line, written with
+    single-row UPDATEs (no session rewrite) and batched upserts.
+    """
+
+    def __init__(self, user_id):
+        self.user_id = user_id
+
+    def _rows(self):
+        return CartItem.objects.filter(user_id=self.user_id)
+
+    def lines(self):
+        return dict(self._rows().values_list("product_id", "quantity"))
+
+    async def alines(self):
+        return {pid: qty async for pid, qty in self._rows().values_list("product_id", "quantity")}
+
+    def incr(self, product_id, qty):
+        if self._rows().filter(product_id=product_id).update(quantity=F("quantity") + qty):
+            return
+        if not Product.objects.filter(pk=product_id).exists():
+            return
+        try:
+            # savepoint: a concurrent add may have inserted the line first
+            with transaction.atomic():
+                CartItem.objects.create(user_id=self.user_id, product_id=product_id, quantity=qty)
+        except IntegrityError:
+            self._rows().filter(product_id=product_id).update(quantity=F("quantity") + qty)
+
+    async def aincr(self, product_id, qty):
+        rows = self._rows().filter(product_id=product_id)
+        if await rows.aupdate(quantity=F("quantity") + qty):
+            return
+        if not await Product.objects.filter(pk=product_id).aexists():
+            return
+        try:
+            # async views run in autocommit, so a losing insert needs no savepoint
+            await CartItem.objects.acreate(user_id=self.user_id, product_id=product_id, quantity=qty)
+        except IntegrityError:
+            await rows.aupdate(quantity=F("quantity") + qty)
+
+    def update(self, changes):
+        keep, drop = _split(changes)
+        with transaction.atomic():
+            if drop:
+                self._rows().filter(product_id__in=drop).delete()
+            if keep:
+                existing = set(Product.objects.filter(pk__in=keep).values_list("pk", flat=True))
+                CartItem.objects.bulk_create(
+                    [CartItem(user_id=self.user_id, product_id=pid, quantity=qty)
+                     for pid, qty in keep.items() if pid in existing],
+                    update_conflicts=True,
+                    unique_fields=["user", "product"],
+                    update_fields=["quantity", "updated_at"],
+                )
+
+    def merge(self, lines):
+        """
+        Add ``lines`` (e.g. an anonymous cart) on top of this cart.
+        """
+        with transaction.atomic():
+            current = self.lines()
+            self.update({pid: current.get(pid, 0) + qty for pid, qty in lines.items() if qty > 0})
+
+    def remove(self, *product_ids):
+        if product_ids:
+            self._rows().filter(product_id__in=product_ids).delete()
+
+    def clear(self):
+        self._rows().delete()
+
+
+def anonymous_cart_store(session, create=False):
+    """
+    The configured store for a visitor who is not logged in.
+
+    Cache/redis carts are keyed by a random token kept in the session (it survives
+    the session key rotation on login). Without a token, and unless ``create`` is set,
+    this falls back to the session cart; a legacy session cart moves into the new
+    store when its token is created.
+    """
+    if CART_STORE not in ("cache", "redis"):
+        return SessionCartStore(session)
+    token = session.get(TOKEN_SESSION_KEY)
+    if token is None and not create:
+        return SessionCartStore(session)
+    store_cls = RedisCartStore if CART_STORE == "redis" else CacheCartStore
+    if token is None:
+        token = session[TOKEN_SESSION_KEY] = uuid.uuid4().hex
+        legacy = SessionCartStore(session)
+        lines = legacy.lines()
+        store = store_cls(token)
+        if lines:
+            store.update(lines)
+            legacy.clear()
+        return store
+    return store_cls(token)
+
+
+def get_cart_store(session, create=False):
+    """
+    Cart store for the visitor owning ``session``: the durable cart once logged in,
+    otherwise ``anonymous_cart_store``.
+    """
+    user_id = session.get(AUTH_SESSION_KEY)
+    if user_id is None:
+        return anonymous_cart_store(session, create=create)
+    store = UserCartStore(user_id)
+    if SESSION_KEY in session:
+        # cart left in the session from before this store existed
+        store.merge(SessionCartStore(session).lines())
+        SessionCartStore(session).clear()
+    return store
+
+
+async def aget_cart_store(session, create=False):
+    """
+    ``get_cart_store`` for async views, through the async session API. The one-off
+    moves (a legacy session cart, a visitor's first cache/redis cart) run the sync code.
+    """
+    user_id = await session.aget(AUTH_SESSION_KEY)
+    if user_id is not None:
+        if await session.ahas_key(SESSION_KEY):
+            return await sync_to_async(get_cart_store)(session, create=create)
+        return UserCartStore(user_id)
+    if CART_STORE not in ("cache", "redis"):
+        return SessionCartStore(session)
+    token = await session.aget(TOKEN_SESSION_KEY)
+    if token is None:
+        return await sync_to_async(anonymous_cart_store)(session, create=create)
+    return (RedisCartStore if CART_STORE == "redis" else CacheCartStore)(token)
+
+
+def merge_anonymous_cart(session, user):
+    """
+    Fold the visitor's anonymous cart into ``user``'s durable cart (on login).
+    """
+    store = anonymous_cart_store(session)
+    lines = store.lines()
+    if lines:
+        UserCartStore(user.pk).merge(lines)
+    store.clear()
+    if SESSION_KEY in session:
+        SessionCartStore(session).clear()
+    session.pop(TOKEN_SESSION_KEY, None)
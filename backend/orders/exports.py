@@ -0,0 +1,140 @@
+"""
+Streaming order exports (CSV / JSONL) for sellers and buyers.
+
+One joined query per export, read with ``iterator(chunk_size=...)`` (a server-side
+cursor on Postgres) and encoded row by row, so memory stays flat and the first
+bytes go out immediately however many orders are exported.
+
+Under ASGI, StreamingHttpResponse reads a sync iterator into a list before sending
+it, so the views wrap the generator with ``aiter_export`` there.
+"""
+import csv
+import json
+from datetime import datetime, time, timedelta
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils import timezone
+
+from .models import Order, OrderItem
+
+EXPORT_CHUNK_SIZE = getattr(settings, "ORDER_EXPORT_CHUNK_SIZE", 2000)
+EXPORT_FORMATS = {"csv": "text/csv", "jsonl": "application/x-ndjson"}
+
+SELLER_COLUMNS = [
+    "order_id", "order_date", "order_status", "buyer", "buyer_name", "item_id", "product_id", "product",
+    "unit_price_inr", "quantity", "line_total_inr", "item_status", "updated_at",
+]
+BUYER_COLUMNS = [
+    "order_id", "order_date", "order_status", "order_total_inr", "item_id", "product_id", "product", "seller",
+    "unit_price_inr", "quantity", "line_total_inr", "item_status", "updated_at",
+]
+
+
+def export_range(since=None, until=None):
+    """
+    Aware datetimes for the inclusive date range ``since``..``until`` (``date`` objects);
+    the last year by default.
+    """
+    until = until or timezone.localdate()
+    since = since or until - timedelta(days=365)
+    start = timezone.make_aware(datetime.combine(since, time.min))
+    end = timezone.make_aware(datetime.combine(until + timedelta(days=1), time.min))
+    return start, end
+
+
+def _items(start, end, using):
+    return (
+        OrderItem.objects.using(using).filter(order__created_at__gte=start, order__created_at__lt=end)
+        .exclude(order__status=Order.STATUS_PENDING)
+        .order_by("order__created_at", "order_id", "id")
+    )
+
+
+def seller_order_items(seller, start, end, using=None):
+    """
+    Rows for every item of ``seller``'s products in orders placed in [start, end).
+    """
+    return _items(start, end, using).filter(product__seller=seller).values_list(
+        "order_id", "order__created_at", "order__status", "order__buyer__username", "order__buyer__first_name",
+        "order__buyer__last_name", "id", "product_id", "product__title", "unit_price_inr", "quantity", "status",
+        "order__updated_at",
+    )
+
+
+def buyer_order_items(buyer, start, end, using=None):
+    """
+    Rows for every item of ``buyer``'s orders placed in [start, end).
+    """
+    return _items(start, end, using).filter(order__buyer=buyer).values_list(
+        "order_id", "order__created_at", "order__status", "order__total_amount_inr", "id", "product_id",
+        "product__title", "product__seller__artist_profile__display_name", "unit_price_inr", "quantity", "status",
+        "order__updated_at",
+    )
+
+
+def _seller_rows(queryset):
+    for (order_id, created, status, username, first, last, item_id, product_id, title,
+         price, qty, item_status, updated) in queryset.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield [
+            order_id, timezone.localtime(created).isoformat(), status,
+            username or "", f"{first} {last}".strip() if username else "",
+            item_id, product_id or "", title or "", price, qty, price * qty, item_status,
+            timezone.localtime(updated).isoformat(),
+        ]
+
+
+def _buyer_rows(queryset):
+    for (order_id, created, status, total, item_id, product_id, title, seller,
+         price, qty, item_status, updated) in queryset.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield [
+            order_id, timezone.localtime(created).isoformat(), status, total,
+            item_id, product_id or "", title or "", seller or "", price, qty, price * qty, item_status,
+            timezone.localtime(updated).isoformat(),
+        ]
+
+
+class _Echo:
+    # csv.writer target that hands each encoded line straight back
+    def write(self, value):
+        return value
+
+
+def _encode(columns, rows, fmt):
+    if fmt == "csv":
+        writer = csv.writer(_Echo())
+        yield writer.writerow(columns)
+        for row in rows:
+            yield writer.writerow(row)
+    else:
+        for row in rows:
+            yield json.dumps(dict(zip(columns, row)), default=str) + "\n"
+
+
+def export_seller_orders(seller, start, end, fmt="csv", using=None):
+    """
+    Generator of CSV lines / JSON lines for a seller's order items. Pass ``using`` to
+    fix the database up front when the generator is consumed outside the request
+    (e.g. by a StreamingHttpResponse, after the routing middleware has returned).
+    """
+    return _encode(SELLER_COLUMNS, _seller_rows(seller_order_items(seller, start, end, using)), fmt)
+
+
+def export_buyer_orders(buyer, start, end, fmt="csv", using=None):
+    return _encode(BUYER_COLUMNS, _buyer_rows(buyer_order_items(buyer, start, end, using)), fmt)
+
+
+async def aiter_export(lines):
+    """
+    Async iterator over an export generator, for StreamingHttpResponse under ASGI.
+    Each step encodes up to EXPORT_CHUNK_SIZE lines in the request's sync thread,
+    where the database cursor lives, so memory stays flat as it does under WSGI.
+    """
+    take = sync_to_async(lambda: "".join(islice(lines, EXPORT_CHUNK_SIZE)))
+    try:
+        while chunk := await take():
+            yield chunk
+    finally:
+        # release the server-side cursor in its own thread, also when the client goes away
+        await sync_to_async(lines.close)()
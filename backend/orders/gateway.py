@@ -0,0 +1,172 @@
+import hashlib
+import hmac
+import os
+import threading
+import time
+import uuid
+
+import razorpay
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+PAYMENT_GATEWAY = getattr(settings, "PAYMENT_GATEWAY", "razorpay")  # "razorpay" or "fake"
+PAYMENT_GATEWAY_TIMEOUT = getattr(settings, "PAYMENT_GATEWAY_TIMEOUT", (3.05, 10))  # (connect, read) seconds
+PAYMENT_GATEWAY_POOL_SIZE = getattr(settings, "PAYMENT_GATEWAY_POOL_SIZE", 20)
+PAYMENT_GATEWAY_MAX_RETRIES = getattr(settings, "PAYMENT_GATEWAY_MAX_RETRIES", 2)
+
+
+class GatewayError(Exception):
+    """
+    The payment gateway could not be reached or rejected the call.
+    """
+
+
+def _signature(secret, razorpay_order_id, razorpay_payment_id):
+    return hmac.new(secret.encode(), f"{razorpay_order_id}|{razorpay_payment_id}".encode(), hashlib.sha256).hexdigest()
+
+
+class RazorpayGateway:
+    """
+    Razorpay client on a pooled ``requests.Session`` with bounded timeouts.
+
+    Retries: connection failures are retried for every call (the request never
+    reached Razorpay); read timeouts and 5xx are retried only for GETs, so an
+    order is never created twice.
+    """
+
+    def __init__(self, key_id, key_secret, timeout=PAYMENT_GATEWAY_TIMEOUT,
+                 pool_size=PAYMENT_GATEWAY_POOL_SIZE, max_retries=PAYMENT_GATEWAY_MAX_RETRIES):
+        self.key_secret = key_secret
+        self.timeout = timeout
+        retry = Retry(
+            total=max_retries,
+            connect=max_retries,
+            read=max_retries,
+            status=max_retries,
+            backoff_factor=0.2,
+            status_forcelist=(500, 502, 503, 504),
+            allowed_methods=frozenset({"GET"}),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        session = requests.Session()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        self.client = razorpay.Client(session=session, auth=(key_id, key_secret))
+
+    def create_order(self, amount_paise, receipt, currency="INR"):
+        try:
+            return self.client.order.create(
+                dict(amount=amount_paise, currency=currency, receipt=receipt, payment_capture=1),
+                timeout=self.timeout,
+            )
+        except (requests.RequestException, razorpay.errors.BadRequestError,
+                razorpay.errors.GatewayError, razorpay.errors.ServerError) as e:
+            raise GatewayError(str(e)) from e
+
+    def fetch_payment(self, payment_id):
+        try:
+            return self.client.payment.fetch(payment_id, timeout=self.timeout)
+        except (requests.RequestException, razorpay.errors.BadRequestError,
+                razorpay.errors.GatewayError, razorpay.errors.ServerError) as e:
+            raise GatewayError(str(e)) from e
+
+    def refund_payment(self, payment_id, amount_paise):
+        try:
+            return self.client.payment.refund(payment_id, {"amount": amount_paise}, timeout=self.timeout)
+        except (requests.RequestException, razorpay.errors.BadRequestError,
+                razorpay.errors.GatewayError, razorpay.errors.ServerError) as e:
+            raise GatewayError(str(e)) from e
+
+    def sign(self, razorpay_order_id, razorpay_payment_id):
+        return _signature(self.key_secret, razorpay_order_id, razorpay_payment_id)
+
+
+class FakeGateway:
+    """
+    In-process stand-in for Razorpay, for local load tests without network access.
+
+    ``latency`` (seconds) simulates the gateway round trip. ``simulate_payment``
+    plays the buyer's browser: it returns a payment id and a valid signature.
+    """
+
+    def __init__(self, key_secret="fake-secret", latency=0.0):
+        self.key_secret = key_secret
+        self.latency = latency
+        self._lock = threading.Lock()
+        self._orders = {}
+        self._payments = {}
+
+    def _wait(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def create_order(self, amount_paise, receipt, currency="INR"):
+        self._wait()
+        order = {"id": f"order_fake_{uuid.uuid4().hex[:14]}", "amount": amount_paise, "currency": currency,
+                 "receipt": receipt, "status": "created"}
+        with self._lock:
+            self._orders[order["id"]] = order
+        return order
+
+    def fetch_payment(self, payment_id):
+        self._wait()
+        with self._lock:
+            payment = self._payments.get(payment_id)
+        if payment is None:
+            raise GatewayError(f"Unknown payment {payment_id}")
+        return payment
+
+    def simulate_payment(self, razorpay_order_id):
+        with self._lock:
+            order = self._orders[razorpay_order_id]
+            payment = {"id": f"pay_fake_{uuid.uuid4().hex[:14]}", "order_id": razorpay_order_id,
+                       "amount": order["amount"], "currency": order["currency"], "status": "captured"}
+            self._payments[payment["id"]] = payment
+        return payment["id"], self.sign(razorpay_order_id, payment["id"])
+
+    def refund_payment(self, payment_id, amount_paise):
+        self._wait()
+        with self._lock:
+            payment = self._payments.get(payment_id)
+            if payment is None:
+                raise GatewayError(f"Unknown payment {payment_id}")
+            if payment.get("amount_refunded", 0) + amount_paise > payment["amount"]:
+                raise GatewayError(f"Refund exceeds the amount of payment {payment_id}")
+            payment["amount_refunded"] = payment.get("amount_refunded", 0) + amount_paise
+            payment["status"] = "refunded"
+        return {"id": f"rfnd_fake_{uuid.uuid4().hex[:14]}", "payment_id": payment_id, "amount": amount_paise}
+
+    def add_payment(self, payment):
+        """
+        Make a payment dict (as sent in webhooks) fetchable, e.g. for webhook replays.
+        """
+        with self._lock:
+            self._payments[payment["id"]] = payment
+
+    def sign(self, razorpay_order_id, razorpay_payment_id):
+        return _signature(self.key_secret, razorpay_order_id, razorpay_payment_id)
+
+
+_gateway = None
+_gateway_lock = threading.Lock()
+
+
+def get_gateway():
+    """
+    Process-wide gateway (one connection pool per worker), built on first use.
+    """
+    global _gateway
+    if _gateway is None:
+        with _gateway_lock:
+            if _gateway is None:
+                key_id = os.getenv("RAZORPAY_KEY_ID") or getattr(settings, "RAZORPAY_KEY_ID", None)
+                key_secret = os.getenv("RAZORPAY_KEY_SECRET") or getattr(settings, "RAZORPAY_KEY_SECRET", None)
+                if PAYMENT_GATEWAY == "fake":
+                    _gateway = FakeGateway(key_secret=key_secret or "fake-secret",
+                                           latency=getattr(settings, "FAKE_GATEWAY_LATENCY", 0.0))
+                else:
+                    _gateway = RazorpayGateway(key_id, key_secret)
+    return _gateway
@@ -0,0 +1,74 @@
+import threading
+import time
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction, OperationalError
+
+from market.models import Product
+from orders.reservations import OutOfStock, reserve_stock
+
+
+class Command(BaseCommand):
+    help = (
+        "Flash-sale check: many threads reserve the same product at once. Fails if stock "
+        "was oversold; reports reservations per second. Uses a throwaway seller/product."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=16)
+        parser.add_argument("--attempts", type=int, default=50, help="reservations tried per thread")
+        parser.add_argument("--stock", type=int, default=500)
+        parser.add_argument("--qty", type=int, default=1)
+
+    def handle(self, *args, **options):
+        threads, attempts, stock, qty = options["threads"], options["attempts"], options["stock"], options["qty"]
+        seller = get_user_model().objects.create(username=f"stockcheck-{uuid.uuid4().hex[:8]}", user_type="seller")
+        product = Product.objects.create(seller=seller, title="Stock reservation check", description="-",
+                                         price="1.00", stock=stock, is_active=False)
+        counts = {"reserved": 0, "sold_out": 0, "errors": 0}
+        lock = threading.Lock()
+        start_gate = threading.Barrier(threads)
+
+        def worker():
+            start_gate.wait()
+            mine = {"reserved": 0, "sold_out": 0, "errors": 0}
+            try:
+                for _ in range(attempts):
+                    try:
+                        with transaction.atomic():
+                            reserve_stock({product.pk: qty})
+                        mine["reserved"] += 1
+                    except OutOfStock:
+                        mine["sold_out"] += 1
+                    except OperationalError:
+                        # e.g. SQLite "database is locked"; Postgres never needs this
+                        mine["errors"] += 1
+            finally:
+                connection.close()
+                with lock:
+                    for k, v in mine.items():
+                        counts[k] += v
+
+        try:
+            pool = [threading.Thread(target=worker) for _ in range(threads)]
+            started = time.perf_counter()
+            for t in pool:
+                t.start()
+            for t in pool:
+                t.join()
+            elapsed = time.perf_counter() - started
+
+            product.refresh_from_db(fields=["stock"])
+            sold = counts["reserved"] * qty
+            self.stdout.write(
+                f"{threads} threads x {attempts} attempts on stock={stock}: "
+                f"{counts['reserved']} reserved, {counts['sold_out']} sold out, {counts['errors']} errors "
+                f"in {elapsed:.2f}s ({counts['reserved'] / elapsed:.0f} reservations/s); stock left {product.stock}"
+            )
+            if sold > stock or product.stock != stock - sold:
+                raise CommandError(f"Oversold: {sold} units reserved from {stock}, stock now {product.stock}")
+            self.stdout.write(self.style.SUCCESS("No oversell."))
+        finally:
+            seller.delete()
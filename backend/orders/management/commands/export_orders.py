@@ -0,0 +1,54 @@
+import sys
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from orders.exports import EXPORT_FORMATS, export_buyer_orders, export_range, export_seller_orders
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream a seller's or buyer's order items as CSV or JSONL (one joined query read in "
+        "chunks, constant memory). Writes to stdout unless --output is given."
+    )
+
+    def add_arguments(self, parser):
+        who = parser.add_mutually_exclusive_group(required=True)
+        who.add_argument("--seller", help="seller username")
+        who.add_argument("--buyer", help="buyer username")
+        parser.add_argument("--format", choices=sorted(EXPORT_FORMATS), default="csv")
+        parser.add_argument("--since", help="YYYY-MM-DD (default: a year before --until)")
+        parser.add_argument("--until", help="YYYY-MM-DD, inclusive (default: today)")
+        parser.add_argument("--output", "-o", help="file to write")
+
+    def handle(self, *args, **options):
+        username = options["seller"] or options["buyer"]
+        user = User.objects.filter(username=username).first()
+        if user is None:
+            raise CommandError(f"No user named '{username}'.")
+        try:
+            since, until = (parse_date(options[k] or "") for k in ("since", "until"))
+        except ValueError:
+            raise CommandError("--since/--until must be YYYY-MM-DD dates.")
+        start, end = export_range(since, until)
+        export = export_seller_orders if options["seller"] else export_buyer_orders
+
+        started = time.perf_counter()
+        out = open(options["output"], "w", encoding="utf-8", newline="") if options["output"] else sys.stdout
+        lines = 0
+        try:
+            for line in export(user, start, end, options["format"]):
+                out.write(line)
+                lines += 1
+        finally:
+            if out is not sys.stdout:
+                out.close()
+        if options["output"]:
+            elapsed = time.perf_counter() - started
+            self.stdout.write(self.style.SUCCESS(
+                f"Wrote {lines} lines to {options['output']} in {elapsed:.2f}s ({lines / elapsed:.0f} lines/s)."
+            ))
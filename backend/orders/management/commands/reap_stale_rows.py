@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from orders.reaper import PENDING_ORDER_TTL, REAPER_BATCH_SIZE, REAPER_MAX_BATCHES, reap_stale_rows
+
+
+class Command(BaseCommand):
+    help = "Delete abandoned pending orders and expired sessions in bounded batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--max-age", type=int, default=PENDING_ORDER_TTL, help="pending order age in seconds")
+        parser.add_argument("--batch-size", type=int, default=REAPER_BATCH_SIZE)
+        parser.add_argument("--max-batches", type=int, default=REAPER_MAX_BATCHES)
+
+    def handle(self, *args, **options):
+        totals = reap_stale_rows(
+            max_age=options["max_age"], batch_size=options["batch_size"], max_batches=options["max_batches"]
+        )
+        for label, n in sorted(totals.items()):
+            self.stdout.write(f"{label}: {n}")
+        self.stdout.write(self.style.SUCCESS(f"Reclaimed {sum(totals.values())} rows."))
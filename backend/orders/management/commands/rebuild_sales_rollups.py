@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from orders.rollups import backfill_rollups
+
+
+class Command(BaseCommand):
+    help = "Backfill / repair the daily seller and product sales rollups from order items."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=None, help="only the last N days (default: all history)")
+
+    def handle(self, *args, **options):
+        days = backfill_rollups(options["days"])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt sales rollups for {days} days."))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from orders.models import Order, SellerOrderSummary
+
+
+class Command(BaseCommand):
+    help = "Backfill / repair the SellerOrderSummary read model from order items."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        total = 0
+        for order in Order.objects.order_by("pk").iterator(chunk_size=options["batch_size"]):
+            SellerOrderSummary.rebuild_for_order(order)
+            total += 1
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt seller summaries for {total} orders."))
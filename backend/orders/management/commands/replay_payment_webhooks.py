@@ -0,0 +1,113 @@
+import json
+import random
+import statistics
+import threading
+import time
+import uuid
+
+import requests
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.urls import reverse
+
+from orders.gateway import FakeGateway, get_gateway
+from orders.models import Order, Payment
+from orders.payments import RAZORPAY_WEBHOOK_SECRET, webhook_signature
+
+
+def _percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))] if values else 0.0
+
+
+class Command(BaseCommand):
+    help = (
+        "Load-test the Razorpay webhook: signs a captured-payment event for each pending order, "
+        "delivers every event several times from many threads and checks that each payment "
+        "was stored exactly once."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--count", type=int, default=100, help="pending orders to pay")
+        parser.add_argument("--duplicates", type=int, default=3, help="deliveries per event")
+        parser.add_argument("--threads", type=int, default=8)
+        parser.add_argument("--event", default="payment.captured")
+        parser.add_argument("--url", help="POST to a running server instead of in-process")
+
+    def handle(self, *args, **options):
+        if not RAZORPAY_WEBHOOK_SECRET:
+            raise CommandError("Set RAZORPAY_WEBHOOK_SECRET to sign the replayed events.")
+        orders = list(
+            Order.objects.filter(status=Order.STATUS_PENDING, razorpay_order_id__isnull=False)
+            .order_by("-pk")[:options["count"]]
+        )
+        if not orders:
+            raise CommandError("No pending orders with a Razorpay order id to replay against.")
+
+        gateway = get_gateway()
+        bodies, payment_ids = [], []
+        for order in orders:
+            entity = {
+                "id": f"pay_replay_{uuid.uuid4().hex[:14]}", "entity": "payment", "order_id": order.razorpay_order_id,
+                "amount": int(order.total_amount_inr * 100), "currency": "INR", "status": "captured",
+            }
+            if isinstance(gateway, FakeGateway):
+                gateway.add_payment(entity)  # so reconciliation can fetch it
+            payment_ids.append(entity["id"])
+            bodies.append(json.dumps({
+                "entity": "event", "event": options["event"], "created_at": int(time.time()),
+                "payload": {"payment": {"entity": entity}},
+            }).encode())
+        deliveries = bodies * options["duplicates"]
+        random.shuffle(deliveries)
+
+        url = options["url"] or reverse("razorpay_webhook")
+        host = next((h for h in settings.ALLOWED_HOSTS if h not in ("*",) and not h.startswith(".")), "localhost")
+        latencies, statuses = [], {}
+        lock = threading.Lock()
+
+        def worker(chunk):
+            if options["url"]:
+                session = requests.Session()
+                post = lambda body, sig: session.post(url, data=body, timeout=10, headers={
+                    "Content-Type": "application/json", "X-Razorpay-Signature": sig}).status_code
+            else:
+                client = Client(raise_request_exception=False, HTTP_HOST=host)
+                post = lambda body, sig: client.post(url, data=body, content_type="application/json",
+                                                     HTTP_X_RAZORPAY_SIGNATURE=sig).status_code
+            mine, codes = [], {}
+            try:
+                for body in chunk:
+                    started = time.perf_counter()
+                    code = post(body, webhook_signature(body))
+                    mine.append(time.perf_counter() - started)
+                    codes[code] = codes.get(code, 0) + 1
+            finally:
+                connection.close()
+                with lock:
+                    latencies.extend(mine)
+                    for code, n in codes.items():
+                        statuses[code] = statuses.get(code, 0) + n
+
+        threads = options["threads"]
+        pool = [threading.Thread(target=worker, args=(deliveries[i::threads],)) for i in range(threads)]
+        started = time.perf_counter()
+        for t in pool:
+            t.start()
+        for t in pool:
+            t.join()
+        elapsed = time.perf_counter() - started
+
+        stored = Payment.objects.filter(razorpay_payment_id__in=payment_ids).count()
+        self.stdout.write(
+            f"{len(deliveries)} deliveries ({len(bodies)} events x {options['duplicates']}) in {elapsed:.2f}s "
+            f"= {len(deliveries) / elapsed:.0f}/s; p50 {_percentile(latencies, 50) * 1000:.1f}ms "
+            f"p95 {_percentile(latencies, 95) * 1000:.1f}ms p99 {_percentile(latencies, 99) * 1000:.1f}ms "
+            f"(mean {statistics.fmean(latencies or [0]) * 1000:.1f}ms); responses {dict(sorted(statuses.items()))}"
+        )
+        self.stdout.write(f"Payments stored: {stored} for {len(bodies)} distinct payment ids")
+        if stored != len(bodies):
+            raise CommandError("Each payment id should be stored exactly once.")
+        self.stdout.write(self.style.SUCCESS("Webhook ingestion is idempotent."))
@@ -26,41 +26,32 @@ class Order(models.Model):
     total_amount_inr = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
     razorpay_order_id = models.CharField(max_length=255, blank=True, null=True)
+    # set while a pending order holds its items' stock (orders.reservations)
+    reserved_until = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # buyer order list: buyer + status filter, newest first
+            models.Index(fields=["buyer", "status", "-created_at"], name="order_buyer_status_recent_idx"),
+            # expired-reservation sweep only scans orders still holding stock
+            models.Index(fields=["reserved_until"], condition=models.Q(reserved_until__isnull=False), name="order_reservation_expiry_idx"),
+            # payment webhooks and the admin search look orders up by gateway order id
+            models.Index(fields=["razorpay_order_id"], name="order_razorpay_order_idx"),
+        ]
+
     def __str__(self):
         return f"Order #{self.pk} - {self.get_status_display()}"
     
     def recalc_status_from_items(self):
         '''
-        Aggregate order status from related OrderItem statuses:
-        - If any item is cancelled and all others cancelled -> order cancelled
-        - If all items delivered -> delivered
-        - If any item shipped and none pending/processing -> shipped
-        - If any item processing -> processing
-        Otherwise leave as paid/pending depending.
+        Aggregate order status from related OrderItem statuses (see aggregate_status).
         '''
-
-        items = list(self.items.all())
-        if not items: return
-        statuses = {item.status for item in items}
-        if statuses <= {OrderItem.STATUS_CANCELLED}:
-            new = Order.STATUS_CANCELLED
-        elif statuses == {OrderItem.STATUS_DELIVERED}:
-            new = Order.STATUS_DELIVERED
-        elif OrderItem.STATUS_SHIPPED in statuses and not (OrderItem.STATUS_PROCESSING in statuses):
-            new = Order.STATUS_SHIPPED
-        elif OrderItem.STATUS_PROCESSING in statuses:
-            new = Order.STATUS_PROCESSING
-        elif self.status == Order.STATUS_PENDING:
-            new = Order.STATUS_PENDING
-        else:
-            new = self.status
-        
-        if new != self.status:
-            self.status = new 
-            self.save()
+        from .aggregation import recompute_order_statuses
+        changed = recompute_order_statuses([self.pk])
+        if self.pk in changed:
+            self.status = changed[self.pk]
 
     def get_seller_total(self, seller_user):
         """
@@ -76,12 +67,7 @@ class Order(models.Model):
         """
         Helper agg. logic: Given a set of item-status strings, return aggregated status.
         """
-        if not statuses: return self.status
-        if statuses <= {OrderItem.STATUS_CANCELLED}: return Order.STATUS_CANCELLED
-        if statuses == {OrderItem.STATUS_DELIVERED}: return Order.STATUS_DELIVERED
-        if OrderItem.STATUS_DELIVERED in statuses and statuses<={OrderItem.STATUS_DELIVERED, OrderItem.STATUS_CANCELLED}: return Order.STATUS_DELIVERED
-        if OrderItem.STATUS_SHIPPED in statuses and OrderItem.STATUS_PROCESSING not in statuses: return Order.STATUS_SHIPPED
-        return self.status
+        return aggregate_status(statuses, self.status)
     
     def get_seller_status(self, seller_user):
         """
@@ -114,12 +100,113 @@ class OrderItem(models.Model):
     quantity = models.PositiveIntegerField(default=1)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PROCESSING)
 
+    class Meta:
+        indexes = [
+            # "orders containing this product/seller" lookups resolve order_id from the index alone
+            models.Index(fields=["product", "order"], name="orderitem_product_order_idx"),
+        ]
+
     def get_total(self):
         return self.unit_price_inr * self.quantity
     
     def __str__(self):
         return f"{self.product} x {self.quantity}"
     
+def aggregate_status(statuses, current):
+    """
+    The single rule set for deriving an order (or per-seller) status from item statuses.
+
+    - no items                         -> unchanged
+    - every item cancelled             -> cancelled
+    - only delivered/cancelled items   -> delivered
+    - untouched (all processing) order that is still pending/paid -> unchanged
+    - any item processing              -> processing
+    - any item shipped                 -> shipped
+    """
+    statuses = set(statuses)
+    if not statuses:
+        return current
+    if statuses <= {OrderItem.STATUS_CANCELLED}:
+        return Order.STATUS_CANCELLED
+    if statuses <= {OrderItem.STATUS_DELIVERED, OrderItem.STATUS_CANCELLED}:
+        return Order.STATUS_DELIVERED
+    if statuses == {OrderItem.STATUS_PROCESSING} and current in (Order.STATUS_PENDING, Order.STATUS_PAID):
+        return current
+    if OrderItem.STATUS_PROCESSING in statuses:
+        return Order.STATUS_PROCESSING
+    if OrderItem.STATUS_SHIPPED in statuses:
+        return Order.STATUS_SHIPPED
+    return current
+
+
+class SellerOrderSummary(models.Model):
+    """
+    Denormalised per-(seller, order) read model for the seller order pages.
+    Kept in sync from OrderItem/Order writes by orders.signals; never edit by hand.
+    """
+    seller = models.ForeignKey(User, on_delete=models.CASCADE, related_name="order_summaries")
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name="seller_summaries")
+    revenue_inr = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal("0.00"))
+    item_count = models.PositiveIntegerField(default=0)
+    status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES, default=Order.STATUS_PENDING)
+    # copied from the order so the list view filters/sorts without a join
+    order_status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES, default=Order.STATUS_PENDING)
+    order_created_at = models.DateTimeField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["seller", "order"], name="uniq_seller_order_summary"),
+        ]
+        indexes = [
+            models.Index(fields=["seller", "-order_created_at", "-id"], name="seller_summary_recent_idx"),
+        ]
+
+    def __str__(self):
+        return f"Order #{self.order_id} / seller {self.seller_id}"
+
+    @classmethod
+    def rebuild_for_order(cls, order):
+        """
+        Recompute every seller's row for ``order`` from its items (one read query),
+        upserting changed rows and deleting rows for sellers no longer on the order.
+        """
+        per_seller = {}
+        for seller_id, status, price, qty in order.items.filter(product__isnull=False).values_list(
+            "product__seller_id", "status", "unit_price_inr", "quantity"
+        ):
+            row = per_seller.setdefault(seller_id, {"revenue": Decimal("0.00"), "count": 0, "statuses": set()})
+            row["revenue"] += price * qty
+            row["count"] += 1
+            row["statuses"].add(status)
+
+        existing = {s.seller_id: s for s in cls.objects.filter(order=order)}
+        to_create, to_update = [], []
+        for seller_id, row in per_seller.items():
+            values = {
+                "revenue_inr": row["revenue"],
+                "item_count": row["count"],
+                "status": order._agg_status(row["statuses"]),
+                "order_status": order.status,
+                "order_created_at": order.created_at,
+            }
+            summary = existing.pop(seller_id, None)
+            if summary is None:
+                to_create.append(cls(seller_id=seller_id, order=order, **values))
+            elif any(getattr(summary, k) != v for k, v in values.items()):
+                for k, v in values.items():
+                    setattr(summary, k, v)
+                summary.updated_at = timezone.now()  # bulk_update skips auto_now
+                to_update.append(summary)
+
+        if to_create:
+            cls.objects.bulk_create(to_create, ignore_conflicts=True)
+        if to_update:
+            cls.objects.bulk_update(to_update, ["revenue_inr", "item_count", "status", "order_status", "order_created_at", "updated_at"])
+        if existing:
+            cls.objects.filter(pk__in=[s.pk for s in existing.values()]).delete()
+
+
 class OrderStatusLog(models.Model):
     order = models.ForeignKey(Order, related_name="status_logs", on_delete=models.CASCADE)
     item = models.ForeignKey(OrderItem, related_name="status_logs", null=True, blank=True, on_delete=models.CASCADE)
@@ -128,13 +215,109 @@ class OrderStatusLog(models.Model):
     new_status = models.CharField(max_length=30)
     note = models.CharField(blank=True, default="")
     created_at = models.DateTimeField(auto_now_add=True)
+    # set once the change went out in a buyer digest email (orders.tasks)
+    notified_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["order"], condition=models.Q(notified_at__isnull=True), name="statuslog_unnotified_idx"),
+        ]
 
 class Payment(models.Model):
+    STATUS_RECEIVED = "received"
+    STATUS_CAPTURED = "captured"
+    STATUS_FAILED = "failed"
+    STATUS_MISMATCH = "mismatch"
+    STATUS_REFUND_PENDING = "refund_pending"
+    STATUS_REFUNDED = "refunded"
+    STATUS_CHOICES = [
+        (STATUS_RECEIVED, "Received"),  # signature verified, gateway check pending
+        (STATUS_CAPTURED, "Captured"),
+        (STATUS_FAILED, "Failed"),
+        (STATUS_MISMATCH, "Amount/order mismatch"),
+        (STATUS_REFUND_PENDING, "Refund pending"),  # order cancelled after payment (sold out)
+        (STATUS_REFUNDED, "Refunded"),
+    ]
+
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name="payments")
-    razorpay_payment_id = models.CharField(max_length=200)
-    razorpay_signature = models.CharField(max_length=300)
+    # unique: checkout retries, double submits and webhook redeliveries all land on one row
+    razorpay_payment_id = models.CharField(max_length=200, unique=True)
+    razorpay_signature = models.CharField(max_length=300, blank=True, default="")
     amount_inr = models.DecimalField(max_digits=10, decimal_places=2)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_RECEIVED)
+    reconciled_at = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(default=timezone.now)
 
+    class Meta:
+        indexes = [
+            # reconciliation sweep only scans payments still waiting for the gateway check
+            models.Index(fields=["created_at"], condition=models.Q(status="received"), name="payment_unreconciled_idx"),
+        ]
+
+    def __str__(self):
+        return f"Payment {self.razorpay_payment_id} for Order {self.order.pk}"
+
+class CartItem(models.Model):
+    """
+    Durable cart line for a logged-in buyer (orders.cart_store.UserCartStore).
+    Anonymous carts live in the session or cache and are merged in on login.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="cart_items")
+    product = models.ForeignKey("market.Product", on_delete=models.CASCADE, related_name="+")
+    quantity = models.PositiveIntegerField(default=1)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "product"], name="uniq_cart_user_product"),
+        ]
+
+    def __str__(self):
+        return f"{self.quantity} x product {self.product_id} for user {self.user_id}"
+
+
+class SellerDailyStats(models.Model):
+    """
+    Per-seller sales rollup for one day (order creation date, current time zone).
+    Maintained by orders.rollups from order writes, plus a nightly backfill.
+    """
+    seller = models.ForeignKey(User, on_delete=models.CASCADE, related_name="daily_stats")
+    day = models.DateField()
+    orders = models.PositiveIntegerField(default=0)
+    units = models.PositiveIntegerField(default=0)
+    revenue_inr = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal("0.00"))
+    cancelled_units = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["seller", "day"], name="uniq_seller_daily_stats"),
+        ]
+
+    def __str__(self):
+        return f"Seller {self.seller_id} on {self.day}"
+
+
+class ProductDailyStats(models.Model):
+    """
+    Per-product sales rollup for one day; ``seller`` is copied so dashboards filter without a join.
+    """
+    product = models.ForeignKey("market.Product", on_delete=models.CASCADE, related_name="daily_stats")
+    seller = models.ForeignKey(User, on_delete=models.CASCADE, related_name="product_daily_stats")
+    day = models.DateField()
+    orders = models.PositiveIntegerField(default=0)
+    units = models.PositiveIntegerField(default=0)
+    revenue_inr = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal("0.00"))
+    cancelled_units = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["product", "day"], name="uniq_product_daily_stats"),
+        ]
+        indexes = [
+            models.Index(fields=["seller", "day"], name="product_stats_seller_day_idx"),
+        ]
+
     def __str__(self):
-        return f"Payment {self.razorpay_payment_id} for Order {self.order.pk}"
\ No newline at end of file
+        return f"Product {self.product_id} on {self.day}"
@@ -0,0 +1,179 @@
+import hashlib
+import hmac
+import logging
+import os
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .gateway import get_gateway
+from .models import Order, OrderItem, Payment
+from .reservations import OutOfStock, confirm_reservation
+
+logger = logging.getLogger(__name__)
+
+RAZORPAY_WEBHOOK_SECRET = os.getenv("RAZORPAY_WEBHOOK_SECRET") or getattr(settings, "RAZORPAY_WEBHOOK_SECRET", "")
+RECONCILE_AFTER = getattr(settings, "PAYMENT_RECONCILE_AFTER", 60)  # sweep picks up payments older than this (s)
+RECONCILE_BATCH_SIZE = getattr(settings, "PAYMENT_RECONCILE_BATCH_SIZE", 200)
+
+# Webhook events that mean the money was taken for the order.
+PAID_EVENTS = ("payment.captured", "order.paid")
+HANDLED_EVENTS = PAID_EVENTS + ("payment.authorized", "payment.failed")
+
+
+def checkout_signature_ok(razorpay_order_id, razorpay_payment_id, signature):
+    expected = get_gateway().sign(razorpay_order_id, razorpay_payment_id)
+    return hmac.compare_digest(expected, signature or "")
+
+
+def webhook_signature(body):
+    return hmac.new(RAZORPAY_WEBHOOK_SECRET.encode(), body, hashlib.sha256).hexdigest()
+
+
+def webhook_signature_ok(body, signature):
+    return bool(RAZORPAY_WEBHOOK_SECRET) and hmac.compare_digest(webhook_signature(body), signature or "")
+
+
+def record_payment(order, razorpay_payment_id, amount_inr, signature=""):
+    """
+    Store a payment once per ``razorpay_payment_id`` (unique), however many times the
+    checkout callback or webhook delivers it. A new row is queued for reconciliation
+    against the gateway after commit. Returns ``(payment, created)``.
+    """
+    payment, created = Payment.objects.get_or_create(
+        razorpay_payment_id=razorpay_payment_id,
+        defaults={"order": order, "amount_inr": amount_inr, "razorpay_signature": signature},
+    )
+    if created:
+        from .tasks import reconcile_payment
+        transaction.on_commit(lambda: reconcile_payment.delay(payment.pk), robust=True)
+    elif signature and not payment.razorpay_signature:
+        Payment.objects.filter(pk=payment.pk).update(razorpay_signature=signature)
+    return payment, created
+
+
+def mark_order_paid(order):
+    """
+    Pending -> paid, turning the stock reservation into a sale. Idempotent: returns
+    False if the order was already processed. Raises OutOfStock (see confirm_reservation).
+    """
+    with transaction.atomic():
+        if not confirm_reservation(order):
+            return False
+        order.status = Order.STATUS_PAID
+        order.save(update_fields=["status", "updated_at"])
+    return True
+
+
+def cancel_oversold_order(order, payment):
+    """
+    The buyer paid after the stock hold expired and an item sold out meanwhile
+    (mark_order_paid raised OutOfStock): cancel the order and its items and refund
+    ``payment`` in the background. Returns False if the order was no longer pending.
+    """
+    with transaction.atomic():
+        locked = Order.objects.select_for_update().only("pk", "status").get(pk=order.pk)
+        if locked.status != Order.STATUS_PENDING:
+            return False
+        OrderItem.objects.filter(order_id=order.pk).update(status=OrderItem.STATUS_CANCELLED)
+        locked.status = Order.STATUS_CANCELLED
+        locked.save(update_fields=["status", "updated_at"])
+        Payment.objects.filter(pk=payment.pk).update(status=Payment.STATUS_REFUND_PENDING)
+        from .tasks import refund_payment
+        transaction.on_commit(lambda: refund_payment.delay(payment.pk), robust=True)
+    order.status = Order.STATUS_CANCELLED
+    return True
+
+
+def refund(payment_pk):
+    """
+    Refund a payment queued by cancel_oversold_order. Safe to retry: if the gateway
+    already shows the money returned, the payment is only marked refunded. Raises
+    GatewayError so the task can retry.
+    """
+    payment = Payment.objects.get(pk=payment_pk)
+    if payment.status != Payment.STATUS_REFUND_PENDING:
+        return payment.status
+    gateway = get_gateway()
+    amount_paise = int(payment.amount_inr * 100)
+    if int(gateway.fetch_payment(payment.razorpay_payment_id).get("amount_refunded", 0)) < amount_paise:
+        gateway.refund_payment(payment.razorpay_payment_id, amount_paise)
+    Payment.objects.filter(pk=payment.pk, status=Payment.STATUS_REFUND_PENDING).update(
+        status=Payment.STATUS_REFUNDED, reconciled_at=timezone.now()
+    )
+    return Payment.STATUS_REFUNDED
+
+
+def pending_refund_payment_ids(batch_size=RECONCILE_BATCH_SIZE):
+    return list(
+        Payment.objects.filter(status=Payment.STATUS_REFUND_PENDING)
+        .order_by("created_at").values_list("pk", flat=True)[:batch_size]
+    )
+
+
+def reconcile(payment_pk):
+    """
+    Check a received payment against the gateway (amount in paise, order id, status)
+    and settle its status. Raises GatewayError so the task can retry.
+    """
+    payment = Payment.objects.select_related("order").get(pk=payment_pk)
+    if payment.status != Payment.STATUS_RECEIVED:
+        return payment.status
+    data = get_gateway().fetch_payment(payment.razorpay_payment_id)
+    paid_paise = int(data.get("amount", 0))
+    expected_paise = int(payment.order.total_amount_inr * 100)
+
+    if data.get("order_id") != payment.order.razorpay_order_id or paid_paise != expected_paise:
+        status = Payment.STATUS_MISMATCH
+        logger.error("Payment %s does not match order %s: %s paise for %s, expected %s paise for %s",
+                     payment.razorpay_payment_id, payment.order_id, paid_paise, data.get("order_id"),
+                     expected_paise, payment.order.razorpay_order_id)
+    elif data.get("status") == "captured":
+        status = Payment.STATUS_CAPTURED
+    elif data.get("status") == "failed":
+        status = Payment.STATUS_FAILED
+    else:
+        return payment.status  # authorized, not captured yet: the sweep looks again later
+
+    Payment.objects.filter(pk=payment.pk, status=Payment.STATUS_RECEIVED).update(
+        status=status, amount_inr=Decimal(paid_paise) / 100, reconciled_at=timezone.now()
+    )
+    return status
+
+
+def unreconciled_payment_ids(batch_size=RECONCILE_BATCH_SIZE):
+    cutoff = timezone.now() - timedelta(seconds=RECONCILE_AFTER)
+    return list(
+        Payment.objects.filter(status=Payment.STATUS_RECEIVED, created_at__lt=cutoff)
+        .order_by("created_at").values_list("pk", flat=True)[:batch_size]
+    )
+
+
+def ingest_webhook(event):
+    """
+    Apply one Razorpay webhook event (already signature-checked). Returns a short
+    result string for the response/logs; unknown orders and events are acknowledged.
+    """
+    event_type = event.get("event")
+    if event_type not in HANDLED_EVENTS:
+        return "ignored"
+    entity = ((event.get("payload") or {}).get("payment") or {}).get("entity") or {}
+    if not entity.get("id") or not entity.get("order_id"):
+        return "ignored"
+    order = Order.objects.filter(razorpay_order_id=entity["order_id"]).first()
+    if order is None:
+        logger.warning("Webhook %s for unknown Razorpay order %s", event_type, entity["order_id"])
+        return "unknown-order"
+
+    payment, created = record_payment(order, entity["id"], Decimal(int(entity.get("amount", 0))) / 100)
+    if event_type in PAID_EVENTS:
+        try:
+            mark_order_paid(order)
+        except OutOfStock as e:
+            if cancel_oversold_order(order, payment):
+                logger.warning("Order %s paid after its reservation expired and product %s sold out; "
+                               "cancelled, refunding payment %s", order.pk, e.product_id, payment.razorpay_payment_id)
+    return "stored" if created else "duplicate"
@@ -0,0 +1,104 @@
+from datetime import timedelta
+from importlib import import_module
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from .aggregation import orders_being_deleted
+from .models import Order, Payment
+from .reservations import release_reservation
+
+# Pending orders (abandoned checkouts) older than this are deleted with their items.
+PENDING_ORDER_TTL = getattr(settings, "PENDING_ORDER_TTL", 24 * 60 * 60)  # seconds
+REAPER_BATCH_SIZE = getattr(settings, "REAPER_BATCH_SIZE", 500)
+REAPER_MAX_BATCHES = getattr(settings, "REAPER_MAX_BATCHES", 100)  # per run, so one run stays bounded
+
+
+def _add_counts(totals, per_model):
+    for label, n in per_model.items():
+        if n:
+            totals[label] = totals.get(label, 0) + n
+
+
+def _delete_orders(order_ids):
+    """
+    Delete pending orders with their items, logs, summaries and payments.
+
+    The OrderItem ``post_delete`` receiver would queue a status/summary/rollup
+    recompute for every order being removed; orders_being_deleted turns that off
+    for these orders. Pending orders are not in the sales rollups and their
+    summaries are cascade-deleted, so nothing needs it.
+    """
+    totals = {}
+    with orders_being_deleted(order_ids):
+        _add_counts(totals, Order.objects.filter(pk__in=order_ids).delete()[1])
+    return totals
+
+
+def reap_pending_orders(max_age=PENDING_ORDER_TTL, batch_size=REAPER_BATCH_SIZE, max_batches=REAPER_MAX_BATCHES):
+    """
+    Delete pending orders older than ``max_age`` seconds that never got a payment,
+    ``batch_size`` orders per DELETE. Expired stock holds are released first.
+    Returns ``{model label: rows deleted}`` (orders, items, summaries, logs, payments).
+
+    Failed attempts do not count as a payment: a buyer whose card was declined
+    and who walked away leaves an abandoned checkout like any other. Payments not
+    yet reconciled, captured or mismatched keep the order.
+    """
+    cutoff = timezone.now() - timedelta(seconds=max_age)
+    live_payments = Payment.objects.filter(order=OuterRef("pk")).exclude(status=Payment.STATUS_FAILED)
+    stale = Order.objects.filter(status=Order.STATUS_PENDING, created_at__lt=cutoff).exclude(Exists(live_payments))
+    totals = {}
+    for _ in range(max_batches):
+        rows = list(stale.order_by("pk").values_list("pk", "reserved_until")[:batch_size])
+        if not rows:
+            break
+        for pk, reserved_until in rows:
+            if reserved_until is not None:
+                release_reservation(pk, expired_only=False)
+        with transaction.atomic():
+            # re-check status/hold under the row locks: a payment may have landed since the batch was read
+            doomed = list(
+                stale.filter(pk__in=[pk for pk, _ in rows], reserved_until__isnull=True)
+                .select_for_update(of=("self",)).values_list("pk", flat=True)
+            )
+            if doomed:
+                _add_counts(totals, _delete_orders(doomed))
+        if len(rows) < batch_size:
+            break
+    return totals
+
+
+def reap_expired_sessions(batch_size=REAPER_BATCH_SIZE, max_batches=REAPER_MAX_BATCHES):
+    """
+    Batched ``clearsessions`` for DB-backed session engines. Returns rows deleted
+    (0 for engines without a session table).
+    """
+    store = import_module(settings.SESSION_ENGINE).SessionStore
+    if not hasattr(store, "get_model_class"):
+        return 0
+    expired = store.get_model_class().objects.filter(expire_date__lt=timezone.now())
+    deleted = 0
+    for _ in range(max_batches):
+        keys = list(expired.values_list("pk", flat=True)[:batch_size])
+        if not keys:
+            break
+        deleted += expired.filter(pk__in=keys).delete()[0]
+        if len(keys) < batch_size:
+            break
+    return deleted
+
+
+def reap_stale_rows(**options):
+    """
+    One reaper pass; returns ``{model label: rows deleted}`` including sessions.
+    """
+    batch_size = options.get("batch_size", REAPER_BATCH_SIZE)
+    max_batches = options.get("max_batches", REAPER_MAX_BATCHES)
+    totals = reap_pending_orders(options.get("max_age", PENDING_ORDER_TTL), batch_size, max_batches)
+    sessions = reap_expired_sessions(batch_size, max_batches)
+    if sessions:
+        totals["sessions.Session"] = sessions
+    return totals
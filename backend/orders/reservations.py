@@ -0,0 +1,111 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from market.models import Product
+from .models import Order, OrderItem
+
+# How long a pending order holds its stock while the buyer pays.
+STOCK_RESERVATION_TTL = getattr(settings, "STOCK_RESERVATION_TTL", 15 * 60)  # seconds
+STOCK_RELEASE_BATCH_SIZE = getattr(settings, "STOCK_RELEASE_BATCH_SIZE", 200)
+
+
+class OutOfStock(Exception):
+    """
+    Not enough stock left for a product; nothing was reserved.
+    """
+
+    def __init__(self, product_id):
+        super().__init__(f"Not enough stock for product {product_id}")
+        self.product_id = product_id
+
+
+def reserve_stock(lines):
+    """
+    Take ``{product_id: qty}`` out of stock with one conditional UPDATE per product:
+
+        UPDATE market_product SET stock = stock - n WHERE id = %s AND stock >= n
+
+    No SELECT ... FOR UPDATE: buyers of a hot product only contend for the instant of
+    the UPDATE, and a short row can never go negative. Raises OutOfStock on the first
+    line that doesn't fit; call it inside the checkout transaction so earlier lines
+    roll back with it. Products are updated in id order to avoid lock-order deadlocks.
+    """
+    for product_id in sorted(lines):
+        qty = lines[product_id]
+        if not Product.objects.filter(pk=product_id, stock__gte=qty).update(stock=F("stock") - qty):
+            raise OutOfStock(product_id)
+
+
+def restock(lines):
+    for product_id in sorted(lines):
+        Product.objects.filter(pk=product_id).update(stock=F("stock") + lines[product_id])
+
+
+def order_lines(order_id):
+    rows = (
+        OrderItem.objects.filter(order_id=order_id, product__isnull=False)
+        .values("product_id").annotate(qty=Sum("quantity")).order_by()
+    )
+    return {row["product_id"]: row["qty"] for row in rows}
+
+
+def reservation_deadline():
+    return timezone.now() + timedelta(seconds=STOCK_RESERVATION_TTL)
+
+
+def release_reservation(order_id, expired_only=True):
+    """
+    Give a pending order's reserved stock back. The order stays pending (the reaper
+    deletes it later) with ``reserved_until`` cleared. Returns True if stock was returned.
+
+    The order row lock serialises this against ``confirm_reservation`` for the same
+    order only; product rows are touched with plain UPDATEs.
+    """
+    with transaction.atomic():
+        qs = Order.objects.select_for_update().filter(
+            pk=order_id, status=Order.STATUS_PENDING, reserved_until__isnull=False
+        )
+        if expired_only:
+            qs = qs.filter(reserved_until__lte=timezone.now())
+        if not qs.exists():
+            return False
+        restock(order_lines(order_id))
+        Order.objects.filter(pk=order_id).update(reserved_until=None, updated_at=timezone.now())
+    return True
+
+
+def release_expired_reservations(order_ids=None, batch_size=STOCK_RELEASE_BATCH_SIZE):
+    """
+    Release every expired reservation (optionally limited to ``order_ids``).
+    Returns the number of orders released.
+    """
+    qs = Order.objects.filter(
+        status=Order.STATUS_PENDING, reserved_until__isnull=False, reserved_until__lte=timezone.now()
+    )
+    if order_ids is not None:
+        qs = qs.filter(pk__in=order_ids)
+    released = 0
+    for order_id in qs.order_by("reserved_until").values_list("pk", flat=True)[:batch_size]:
+        released += release_reservation(order_id)
+    return released
+
+
+def confirm_reservation(order):
+    """
+    Turn the order's reservation into a sale when payment arrives. If the reservation
+    already expired and was released, stock is reserved again (raises OutOfStock when
+    it has sold out since). Returns False if the order is no longer pending.
+    """
+    with transaction.atomic():
+        locked = Order.objects.select_for_update().only("pk", "status", "reserved_until").get(pk=order.pk)
+        if locked.status != Order.STATUS_PENDING:
+            return False
+        if locked.reserved_until is None:
+            reserve_stock(order_lines(order.pk))
+        Order.objects.filter(pk=order.pk).update(reserved_until=None)
+    order.reserved_until = None
+    return True
@@ -0,0 +1,109 @@
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, DecimalField, F, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import Order, OrderItem, ProductDailyStats, SellerDailyStats
+
+METRIC_FIELDS = ["orders", "units", "revenue_inr", "cancelled_units", "updated_at"]
+
+
+def _metrics():
+    live = ~Q(status=OrderItem.STATUS_CANCELLED)
+    return {
+        "orders": Count("order_id", distinct=True),
+        "units": Sum("quantity", filter=live, default=0),
+        "revenue_inr": Sum(
+            F("unit_price_inr") * F("quantity"), filter=live, default=Decimal("0.00"),
+            output_field=DecimalField(max_digits=14, decimal_places=2),
+        ),
+        "cancelled_units": Sum("quantity", filter=Q(status=OrderItem.STATUS_CANCELLED), default=0),
+    }
+
+
+def _day_bounds(day):
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    return start, start + timedelta(days=1)
+
+
+def _upsert(model, rows, unique_fields, stale):
+    """
+    Upsert the recomputed ``rows`` and delete rows of the same buckets that no longer have sales.
+    """
+    model.objects.bulk_create(rows, update_conflicts=True, unique_fields=unique_fields, update_fields=METRIC_FIELDS)
+    keep = [getattr(row, unique_fields[0] + "_id") for row in rows]
+    stale.exclude(**{f"{unique_fields[0]}_id__in": keep}).delete()
+
+
+def refresh_day(day, seller_ids=None):
+    """
+    Recompute the ``day`` buckets (all sellers, or only ``seller_ids``) from order items:
+    two grouped queries bounded by one day of orders, then upserts.
+    Pending (unpaid) orders don't count; cancelled items count as cancellations only.
+    """
+    start, end = _day_bounds(day)
+    items = (
+        OrderItem.objects.filter(order__created_at__gte=start, order__created_at__lt=end, product__isnull=False)
+        .exclude(order__status=Order.STATUS_PENDING)
+    )
+    seller_stats = SellerDailyStats.objects.filter(day=day)
+    product_stats = ProductDailyStats.objects.filter(day=day)
+    if seller_ids is not None:
+        items = items.filter(product__seller_id__in=seller_ids)
+        seller_stats = seller_stats.filter(seller_id__in=seller_ids)
+        product_stats = product_stats.filter(seller_id__in=seller_ids)
+
+    now = timezone.now()
+    per_seller = [
+        SellerDailyStats(seller_id=row.pop("product__seller_id"), day=day, updated_at=now, **row)
+        for row in items.values("product__seller_id").annotate(**_metrics()).order_by()
+    ]
+    per_product = [
+        ProductDailyStats(product_id=row.pop("product_id"), seller_id=row.pop("product__seller_id"),
+                          day=day, updated_at=now, **row)
+        for row in items.values("product_id", "product__seller_id").annotate(**_metrics()).order_by()
+    ]
+    with transaction.atomic():
+        _upsert(SellerDailyStats, per_seller, ["seller", "day"], seller_stats)
+        _upsert(ProductDailyStats, per_product, ["product", "day"], product_stats)
+
+
+def refresh_rollups_for_orders(order_ids):
+    """
+    Incremental update after order/item writes: only the (seller, day) buckets the
+    given orders fall into are recomputed.
+    """
+    buckets = {}
+    for day, seller_id in (
+        OrderItem.objects.filter(order_id__in=order_ids, product__isnull=False)
+        .annotate(day=TruncDate("order__created_at"))
+        .values_list("day", "product__seller_id").distinct()
+    ):
+        buckets.setdefault(day, set()).add(seller_id)
+    for day, seller_ids in buckets.items():
+        refresh_day(day, seller_ids)
+
+
+def backfill_rollups(days=None):
+    """
+    Nightly repair: recompute every seller for the last ``days`` days (all history
+    when None). Catches writes the incremental path can't see, e.g. deleted orders.
+    Returns the number of days refreshed.
+    """
+    today = timezone.localdate()
+    if days is None:
+        first = Order.objects.order_by("created_at").values_list("created_at", flat=True).first()
+        if first is None:
+            return 0
+        start = timezone.localtime(first).date()
+    else:
+        start = today - timedelta(days=days - 1)
+    day, count = start, 0
+    while day <= today:
+        refresh_day(day)
+        day += timedelta(days=1)
+        count += 1
+    return count
@@ -1,17 +1,41 @@
-from django.db.models.signals import post_save
+from django.contrib.auth.signals import user_logged_in
+from django.db.models.signals import post_save, post_delete
+from django.db import transaction
 from django.dispatch import receiver
-from .models import OrderItem, OrderStatusLog
-from .tasks import send_item_status_change_mail
+from .models import Order, OrderItem, OrderStatusLog
+from .aggregation import mark_order_dirty
+from .tasks import schedule_status_digest
+from .cart_store import merge_anonymous_cart
 
-@receiver(post_save, sender=OrderItem)
-def order_item_post_save(sender, instance: OrderItem, created, **kwargs):
+@receiver(post_save, sender=OrderStatusLog)
+def status_log_schedule_digest(sender, instance: OrderStatusLog, created, raw=False, **kwargs):
     """
-    Only trigger when status changed or cerated with status not default.
+    Item status changes are logged by the seller views; buffer them into one buyer digest per order.
     """
-    if created:
-        pass
+    if created and not raw and instance.item_id:
+        order_id = instance.order_id
+        # after commit so the digest task can see the log row
+        transaction.on_commit(lambda: schedule_status_digest(order_id), robust=True)
+
+
+@receiver(post_save, sender=OrderItem)
+@receiver(post_delete, sender=OrderItem)
+def order_item_mark_order_dirty(sender, instance: OrderItem, raw=False, **kwargs):
+    # status + seller summaries are recomputed once per order when the transaction commits
+    if not raw:
+        mark_order_dirty(instance.order_id)
+
+
+@receiver(post_save, sender=Order)
+def order_mark_summaries_dirty(sender, instance: Order, created, raw=False, **kwargs):
+    # order status feeds both order_status and the seller-status fallback
+    if raw or created:
+        return
+    mark_order_dirty(instance.pk, recompute_status=False)
+
 
-    try:
-        send_item_status_change_mail(instance.pk)
-    except Exception:
-        pass
\ No newline at end of file
+@receiver(user_logged_in)
+def merge_cart_on_login(sender, request, user, **kwargs):
+    # whatever the visitor added before logging in joins their durable cart
+    if request is not None and hasattr(request, "session"):
+        merge_anonymous_cart(request.session, user)
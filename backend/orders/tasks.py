@@ -1,45 +1,207 @@
+from datetime import timedelta
+
 from celery import shared_task
+from django.db import transaction
 from django.template.loader import render_to_string
-from django.core.mail import EmailMultiAlternatives
+from django.core.cache import cache
+from django.core.mail import EmailMultiAlternatives, get_connection
 from django.conf import settings
+from django.utils import timezone
 from django.utils.html import strip_tags
 from django.urls import reverse
-from .models import OrderItem
+from .models import OrderStatusLog
+from .reservations import release_expired_reservations
+from .reaper import reap_stale_rows
+from .rollups import backfill_rollups
+from .gateway import GatewayError
+from .payments import pending_refund_payment_ids, reconcile, refund, unreconciled_payment_ids
 
+# Item status changes to one order within this window go out as a single email.
+STATUS_DIGEST_WINDOW = getattr(settings, "ORDER_STATUS_DIGEST_WINDOW", 120)  # seconds
+STATUS_DIGEST_BATCH_SIZE = getattr(settings, "ORDER_STATUS_DIGEST_BATCH_SIZE", 200)  # emails per SMTP connection
 
-@shared_task(bind=True, max_retries=3, default_retry_delay=60)
-def send_item_status_change_mail(self, oid):
+
+def _digest_scheduled_key(order_id):
+    return f"orders:status-digest:scheduled:{order_id}"
+
+
+def schedule_status_digest(order_id):
     """
-    Send mail to Buyer whenever seller change an Order Item status changes.
+    Queue a digest for ``order_id`` once per window; later changes in the window ride along.
+    The task only sends once the window has passed, so with eager Celery (countdown
+    ignored) it is a no-op and the flush_status_digests sweep sends the digest instead.
     """
+    if cache.add(_digest_scheduled_key(order_id), 1, STATUS_DIGEST_WINDOW):
+        send_order_status_digest.apply_async(args=[order_id], countdown=STATUS_DIGEST_WINDOW)
 
-    try:
-        item = OrderItem.objects.select_related("order__buyer", "product_seller").get(pk=oid)
-    except OrderItem.DoesNotExist:
-        return False
-    
-    order = item.order
+
+def _build_digest(order, logs):
     buyer = order.buyer
-    
-    # Prepare Context
+    # latest change per item wins; the email shows the item's current status
+    changes = list({log.item_id: log for log in logs}.values())
     ctx = {
-        "order":order,
-        "item": item,
+        "order": order,
         "buyer": buyer,
+        "changes": changes,
         "site_name": getattr(settings, "SITE_NAME", "Crafty"),
         "logo_url": "",
         "order_url": settings.SITE_URL.rstrip("/") + reverse("buyer_order_detail", args=[order.pk]),
     }
-
-    # Send to buyer
-    subject = f"[{ctx['site_name']}] Update: Your Order # {order.pk} - {item.get_status_display}"
-    html_body = render_to_string("emails/order_item_status_changed.html", ctx)
-    text_body = strip_tags(html_body)
-    msg = EmailMultiAlternatives(subject, text_body, settings.DEFAULT_FROM_EMAIL, [buyer.email])
+    subject = f"[{ctx['site_name']}] Update: Your Order # {order.pk}"
+    if len(changes) == 1:
+        subject += f" - {changes[0].item.get_status_display()}"
+    html_body = render_to_string("emails/order_status_digest.html", ctx)
+    msg = EmailMultiAlternatives(subject, strip_tags(html_body), settings.DEFAULT_FROM_EMAIL, [buyer.email])
     msg.attach_alternative(html_body, "text/html")
+    return msg
+
+
+def _claim_due_logs(order_ids=None):
+    """
+    Mark and return the un-notified item changes of every order whose oldest pending
+    change is at least ``STATUS_DIGEST_WINDOW`` old. Rows locked by a concurrent
+    sender are skipped, so each change is claimed (and mailed) once.
+    """
+    cutoff = timezone.now() - timedelta(seconds=STATUS_DIGEST_WINDOW)
+    pending = OrderStatusLog.objects.filter(notified_at__isnull=True, item__isnull=False)
+    due = pending.filter(created_at__lte=cutoff)
+    if order_ids is not None:
+        due = due.filter(order_id__in=order_ids)
+    with transaction.atomic():
+        logs = list(
+            pending.filter(order_id__in=due.values("order_id"))
+            .select_for_update(skip_locked=True, of=("self",))
+            .select_related("order__buyer", "item__product")
+            .order_by("order_id", "created_at", "pk")
+        )
+        OrderStatusLog.objects.filter(pk__in=[log.pk for log in logs]).update(notified_at=timezone.now())
+    return logs
+
+
+def send_status_digests(order_ids=None):
+    """
+    Send one digest per order whose buffering window has passed (optionally limited
+    to ``order_ids``), over a single reused mail connection per batch. The changes
+    are claimed before sending; if a batch fails, it and the unsent batches are
+    released for the next try. Returns the number of emails sent.
+    """
+    by_order = {}
+    for log in _claim_due_logs(order_ids):
+        by_order.setdefault(log.order_id, []).append(log)
+
+    sent = 0
+    batch = list(by_order.values())
+    for start in range(0, len(batch), STATUS_DIGEST_BATCH_SIZE):
+        chunk = batch[start:start + STATUS_DIGEST_BATCH_SIZE]
+        messages = [
+            _build_digest(order_logs[0].order, order_logs)
+            for order_logs in chunk
+            if order_logs[0].order.buyer and order_logs[0].order.buyer.email
+        ]
+        try:
+            with get_connection() as connection:
+                sent += connection.send_messages(messages) or 0
+        except Exception:
+            unsent = [log.pk for order_logs in batch[start:] for log in order_logs]
+            OrderStatusLog.objects.filter(pk__in=unsent).update(notified_at=None)
+            raise
+    return sent
+
+
+@shared_task(bind=True, max_retries=3, default_retry_delay=60)
+def send_order_status_digest(self, order_id):
+    """
+    Send the buyer one email covering every item status change buffered for this order.
+    The schedule guard expires with the window, so the next change starts a new one.
+    """
     try:
-        msg.send()
+        return send_status_digests([order_id])
     except Exception as e:
         raise self.retry(exc=e)
-    
-    return True
+
+
+@shared_task
+def flush_status_digests():
+    """
+    Periodic sweep (celery beat): send every digest whose window has passed. This is
+    what sends them when Celery runs tasks eagerly, and it catches anything a
+    lost/failed per-order task left behind.
+    """
+    return send_status_digests()
+
+
+@shared_task
+def release_stock_reservation(order_id):
+    """
+    Scheduled at checkout for when the reservation expires; a no-op if the order was paid.
+    """
+    return release_expired_reservations([order_id])
+
+
+@shared_task
+def release_expired_stock_reservations():
+    """
+    Periodic sweep (celery beat): release reservations whose per-order task was lost.
+    """
+    return release_expired_reservations()
+
+
+@shared_task
+def reap_stale_rows_task():
+    """
+    Periodic cleanup (celery beat): abandoned pending orders and expired sessions.
+    Returns ``{model label: rows deleted}``.
+    """
+    return reap_stale_rows()
+
+
+@shared_task
+def backfill_sales_rollups(days=7):
+    """
+    Nightly (celery beat): recompute the recent daily seller/product rollups.
+    """
+    return backfill_rollups(days)
+
+
+@shared_task(bind=True, max_retries=5, default_retry_delay=30)
+def reconcile_payment(self, payment_pk):
+    """
+    Fetch a newly stored payment from the gateway and settle its status (off the buyer's request).
+    """
+    try:
+        return reconcile(payment_pk)
+    except GatewayError as e:
+        raise self.retry(exc=e)
+
+
+@shared_task
+def reconcile_received_payments():
+    """
+    Periodic sweep (celery beat): payments whose reconciliation task was lost or still authorized-only.
+    """
+    ids = unreconciled_payment_ids()
+    for payment_pk in ids:
+        reconcile_payment.delay(payment_pk)
+    return len(ids)
+
+
+@shared_task(bind=True, max_retries=5, default_retry_delay=300)
+def refund_payment(self, payment_pk):
+    """
+    Return the money for an order cancelled after it was paid (orders.payments.cancel_oversold_order).
+    """
+    try:
+        return refund(payment_pk)
+    except GatewayError as e:
+        raise self.retry(exc=e)
+
+
+@shared_task
+def refund_pending_payments():
+    """
+    Periodic sweep (celery beat): refunds whose task was lost or ran out of retries.
+    """
+    ids = pending_refund_payment_ids()
+    for payment_pk in ids:
+        refund_payment.delay(payment_pk)
+    return len(ids)
@@ -0,0 +1,564 @@
+import json
+import threading
+from datetime import timedelta
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.cache import cache
+from django.db import OperationalError, connection, transaction
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from crafty_backend.testing import QueryBudgetTestCase, route_names
+from market.models import Product
+from . import cart_store, payments, tasks
+from .cart_store import CacheCartStore, CartBusy
+from .aggregation import flush_dirty_orders, orders_being_deleted
+from .gateway import FakeGateway
+from .models import Order, OrderItem, OrderStatusLog, Payment, SellerOrderSummary
+from .reaper import reap_pending_orders
+from .reservations import OutOfStock, confirm_reservation, release_reservation, reserve_stock
+from .tasks import (
+    STATUS_DIGEST_WINDOW, flush_status_digests, schedule_status_digest, send_order_status_digest, send_status_digests,
+)
+
+User = get_user_model()
+
+
+class StatusDigestTests(TestCase):
+    """
+    Item status changes are buffered per order and mailed as one digest (locmem backend).
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = User.objects.create_user("weaver", password="pw", user_type=User.SELLER)
+        cls.buyer = User.objects.create_user("asha", email="asha@example.com", password="pw", user_type=User.BUYER)
+        cls.product = Product.objects.create(seller=cls.seller, title="Cotton rug", description="Handloom.", price=900)
+        cls.order = cls._order(cls.buyer, items=3)
+
+    @classmethod
+    def _order(cls, buyer, items=1):
+        order = Order.objects.create(buyer=buyer, status=Order.STATUS_PAID, total_amount_inr=900 * items)
+        for _ in range(items):
+            OrderItem.objects.create(order=order, product=cls.product, unit_price_inr=900)
+        return order
+
+    def setUp(self):
+        cache.clear()
+
+    def _log(self, item, new_status=OrderItem.STATUS_SHIPPED):
+        return OrderStatusLog.objects.create(
+            order_id=item.order_id, item=item, changed_by=self.seller,
+            old_status=OrderItem.STATUS_PROCESSING, new_status=new_status,
+        )
+
+    def _end_window(self):
+        OrderStatusLog.objects.update(created_at=timezone.now() - timedelta(seconds=STATUS_DIGEST_WINDOW + 1))
+
+    def test_several_item_changes_send_one_digest(self):
+        # the shipped config runs tasks eagerly: the per-order task runs at once, inside the window
+        with self.captureOnCommitCallbacks(execute=True):
+            for item in self.order.items.all():
+                self._log(item)
+            self._log(self.order.items.first(), OrderItem.STATUS_DELIVERED)
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(flush_status_digests(), 0)
+
+        # once the window has passed the beat sweep sends one digest
+        self._end_window()
+        self.assertEqual(flush_status_digests(), 1)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ["asha@example.com"])
+        self.assertIn(f"# {self.order.pk}", mail.outbox[0].subject)
+        self.assertFalse(OrderStatusLog.objects.filter(order=self.order, notified_at__isnull=True).exists())
+
+        # nothing left to send for this order
+        self.assertEqual(send_order_status_digest(self.order.pk), 0)
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_changes_inside_the_window_ride_along(self):
+        first = self.order.items.first()
+        self._log(first)
+        self._end_window()
+        self._log(self.order.items.last())
+        self.assertEqual(send_order_status_digest(self.order.pk), 1)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertFalse(OrderStatusLog.objects.filter(notified_at__isnull=True).exists())
+
+    def test_digest_is_scheduled_once_per_window(self):
+        with mock.patch.object(send_order_status_digest, "apply_async") as apply_async:
+            schedule_status_digest(self.order.pk)
+            schedule_status_digest(self.order.pk)
+            apply_async.assert_called_once_with(args=[self.order.pk], countdown=STATUS_DIGEST_WINDOW)
+
+            # the guard expires with the window, so the next change starts a new one
+            cache.clear()
+            schedule_status_digest(self.order.pk)
+            self.assertEqual(apply_async.call_count, 2)
+
+    def test_changes_are_claimed_before_sending(self):
+        self._log(self.order.items.first())
+        self._end_window()
+        inner = []
+
+        def send_messages(messages):
+            # a sweep running while this batch is on the wire finds nothing to send
+            inner.append(send_status_digests())
+            return len(messages)
+
+        with mock.patch("orders.tasks.get_connection") as get_connection:
+            get_connection.return_value.__enter__.return_value.send_messages.side_effect = send_messages
+            self.assertEqual(flush_status_digests(), 1)
+        self.assertEqual(inner, [0])
+
+    def test_failed_send_releases_the_claim(self):
+        self._log(self.order.items.first())
+        self._end_window()
+        with mock.patch("orders.tasks.get_connection", side_effect=ConnectionError("smtp down")):
+            with self.assertRaises(ConnectionError):
+                send_status_digests()
+        self.assertTrue(OrderStatusLog.objects.filter(notified_at__isnull=True).exists())
+        self.assertEqual(send_status_digests(), 1)
+
+    def test_one_mail_connection_per_batch(self):
+        orders = [self.order] + [self._order(self.buyer) for _ in range(4)]
+        for order in orders:
+            self._log(order.items.first())
+        self._end_window()
+
+        with mock.patch.object(tasks, "STATUS_DIGEST_BATCH_SIZE", 2), \
+                mock.patch("orders.tasks.get_connection", wraps=mail.get_connection) as get_connection:
+            self.assertEqual(send_status_digests(), 5)
+        self.assertEqual(get_connection.call_count, 3)
+        self.assertEqual(len(mail.outbox), 5)
+
+
+class CacheCartStoreLockTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.store = CacheCartStore("t0k3n")
+        self.lock = f"{self.store.key}:lock"
+
+    def test_writes_release_the_lock(self):
+        self.store.incr(7, 2)
+        self.store.update({7: 3, 8: 1})
+        self.assertEqual(self.store.lines(), {7: 3, 8: 1})
+        self.assertIsNone(cache.get(self.lock))
+
+    def test_busy_cart_is_not_written_unlocked(self):
+        cache.add(self.lock, "other-worker", 60)
+        with mock.patch.object(cart_store, "CART_LOCK_WAIT", 0.05):
+            with self.assertRaises(CartBusy):
+                self.store.incr(7, 1)
+            with self.assertRaises(CartBusy):
+                async_to_sync(self.store.aincr)(7, 1)
+        self.assertEqual(self.store.lines(), {})
+        # the other worker's lock is left alone
+        self.assertEqual(cache.get(self.lock), "other-worker")
+
+    def test_overrun_lock_is_not_deleted(self):
+        with self.store._locked():
+            # our lock expired mid-write and another worker took it over
+            cache.set(self.lock, "other-worker", 60)
+        self.assertEqual(cache.get(self.lock), "other-worker")
+
+    async def test_async_writes_release_the_lock(self):
+        await self.store.aincr(7, 2)
+        await self.store.aincr(7, 1)
+        self.assertEqual(await self.store.alines(), {7: 3})
+        self.assertIsNone(await cache.aget(self.lock))
+
+    def test_add_to_cart_reports_busy_cart(self):
+        seller = User.objects.create_user("weaver", password="pw", user_type=User.SELLER)
+        product = Product.objects.create(seller=seller, title="Cotton rug", description="Handloom.", price=900)
+        with mock.patch("orders.views.aadd_to_cart", mock.AsyncMock(side_effect=CartBusy("cart:x"))):
+            response = self.client.post(
+                reverse("add_to_cart", args=[product.pk]), {"qty": 1}, headers={"x-requested-with": "XMLHttpRequest"}
+            )
+        self.assertEqual(response.status_code, 409)
+        self.assertFalse(response.json()["success"])
+
+
+class ConcurrentReservationTests(TransactionTestCase):
+    """
+    Flash sale: many threads reserving the last few units of one product must never oversell.
+    """
+
+    THREADS = 8
+    ATTEMPTS = 3
+    STOCK = 5
+
+    def test_reserve_stock_never_oversells(self):
+        seller = User.objects.create_user("weaver", password="pw", user_type=User.SELLER)
+        product = Product.objects.create(seller=seller, title="Cotton rug", description="Handloom.", price=900, stock=self.STOCK)
+        counts = {"reserved": 0, "sold_out": 0}
+        lock = threading.Lock()
+        start_gate = threading.Barrier(self.THREADS)
+
+        def worker():
+            start_gate.wait()
+            try:
+                for _ in range(self.ATTEMPTS):
+                    try:
+                        with transaction.atomic():
+                            reserve_stock({product.pk: 1})
+                        outcome = "reserved"
+                    except OutOfStock:
+                        outcome = "sold_out"
+                    except OperationalError:
+                        # SQLite "database table is locked"; the attempt reserved nothing
+                        continue
+                    with lock:
+                        counts[outcome] += 1
+            finally:
+                connection.close()
+
+        pool = [threading.Thread(target=worker) for _ in range(self.THREADS)]
+        for t in pool:
+            t.start()
+        for t in pool:
+            t.join()
+
+        product.refresh_from_db(fields=["stock"])
+        self.assertGreaterEqual(product.stock, 0)
+        self.assertLessEqual(counts["reserved"], self.STOCK)
+        self.assertGreater(counts["sold_out"], 0)
+        self.assertEqual(product.stock, self.STOCK - counts["reserved"])
+
+
+class ReservationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = User.objects.create_user("weaver", password="pw", user_type=User.SELLER)
+        cls.buyer = User.objects.create_user("asha", password="pw", user_type=User.BUYER)
+        cls.product = Product.objects.create(seller=cls.seller, title="Cotton rug", description="Handloom.", price=900, stock=10)
+
+    def _reserved_order(self, qty=3, held_for=timedelta(minutes=15)):
+        reserve_stock({self.product.pk: qty})
+        order = Order.objects.create(buyer=self.buyer, reserved_until=timezone.now() + held_for)
+        OrderItem.objects.create(order=order, product=self.product, unit_price_inr=900, quantity=qty)
+        return order
+
+    def _stock(self):
+        self.product.refresh_from_db(fields=["stock"])
+        return self.product.stock
+
+    def test_release_expired_only_keeps_live_holds(self):
+        live = self._reserved_order()
+        self.assertFalse(release_reservation(live.pk, expired_only=True))
+        self.assertEqual(self._stock(), 7)
+
+        expired = self._reserved_order(held_for=timedelta(minutes=-1))
+        self.assertTrue(release_reservation(expired.pk, expired_only=True))
+        self.assertEqual(self._stock(), 7)
+        expired.refresh_from_db()
+        self.assertIsNone(expired.reserved_until)
+        self.assertEqual(expired.status, Order.STATUS_PENDING)
+        # already released: nothing more to give back
+        self.assertFalse(release_reservation(expired.pk, expired_only=False))
+        self.assertEqual(self._stock(), 7)
+
+    def test_confirm_keeps_a_live_hold(self):
+        order = self._reserved_order()
+        self.assertTrue(confirm_reservation(order))
+        self.assertIsNone(order.reserved_until)
+        self.assertEqual(self._stock(), 7)
+
+    def test_confirm_after_release_reserves_again(self):
+        order = self._reserved_order(held_for=timedelta(minutes=-1))
+        release_reservation(order.pk)
+        self.assertEqual(self._stock(), 10)
+        self.assertTrue(confirm_reservation(order))
+        self.assertEqual(self._stock(), 7)
+
+    def test_confirm_after_release_when_sold_out(self):
+        order = self._reserved_order(held_for=timedelta(minutes=-1))
+        release_reservation(order.pk)
+        Product.objects.filter(pk=self.product.pk).update(stock=2)
+        with self.assertRaises(OutOfStock):
+            confirm_reservation(order)
+        self.assertEqual(self._stock(), 2)
+
+    def test_confirm_ignores_orders_no_longer_pending(self):
+        order = self._reserved_order()
+        Order.objects.filter(pk=order.pk).update(status=Order.STATUS_PAID)
+        self.assertFalse(confirm_reservation(order))
+        self.assertEqual(self._stock(), 7)
+
+
+class OversoldPaymentTests(TestCase):
+    """
+    Payment lands after the stock hold expired and the last units were sold to
+    someone else: the order is cancelled and the payment refunded.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = User.objects.create_user("weaver", password="pw", user_type=User.SELLER)
+        cls.buyer = User.objects.create_user("asha", password="pw", user_type=User.BUYER)
+        cls.product = Product.objects.create(seller=cls.seller, title="Cotton rug", description="Handloom.", price=900, stock=0)
+
+    def setUp(self):
+        self.gateway = FakeGateway()
+        patcher = mock.patch("orders.payments.get_gateway", return_value=self.gateway)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        razorpay_order = self.gateway.create_order(180000, receipt="r1")
+        # the hold already expired and was released (reserved_until cleared)
+        self.order = Order.objects.create(buyer=self.buyer, total_amount_inr=1800, razorpay_order_id=razorpay_order["id"])
+        OrderItem.objects.create(order=self.order, product=self.product, unit_price_inr=900, quantity=2)
+        self.payment_id, self.signature = self.gateway.simulate_payment(razorpay_order["id"])
+
+    def _assert_cancelled_and_refunded(self):
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, Order.STATUS_CANCELLED)
+        self.assertEqual(set(self.order.items.values_list("status", flat=True)), {OrderItem.STATUS_CANCELLED})
+        payment = Payment.objects.get(razorpay_payment_id=self.payment_id)
+        self.assertEqual(payment.status, Payment.STATUS_REFUNDED)
+        self.assertEqual(self.gateway.fetch_payment(self.payment_id)["amount_refunded"], 180000)
+        self.product.refresh_from_db(fields=["stock"])
+        self.assertEqual(self.product.stock, 0)
+
+    def test_verify_cancels_and_refunds(self):
+        self.client.force_login(self.buyer)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse("verify_payment"), json.dumps({
+                "razorpay_payment_id": self.payment_id, "razorpay_order_id": self.order.razorpay_order_id,
+                "razorpay_signature": self.signature, "order_id": self.order.pk,
+            }), content_type="application/json")
+        self.assertEqual(response.status_code, 409)
+        self.assertIn("refunded", response.json()["error"])
+        self._assert_cancelled_and_refunded()
+
+    def test_webhook_cancels_and_refunds(self):
+        event = {"event": "payment.captured", "payload": {"payment": {"entity": {
+            "id": self.payment_id, "order_id": self.order.razorpay_order_id, "amount": 180000,
+        }}}}
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(payments.ingest_webhook(event), "stored")
+        # a redelivery finds the order cancelled and refunds nothing twice
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(payments.ingest_webhook(event), "duplicate")
+        self._assert_cancelled_and_refunded()
+
+    def test_refund_is_not_repeated(self):
+        payment = Payment.objects.create(
+            order=self.order, razorpay_payment_id=self.payment_id, amount_inr=1800, status=Payment.STATUS_REFUND_PENDING,
+        )
+        # refunded at the gateway, but the task died before recording it
+        self.gateway.refund_payment(self.payment_id, 180000)
+        with mock.patch.object(self.gateway, "refund_payment") as refund_payment:
+            self.assertEqual(tasks.refund_pending_payments(), 1)
+        refund_payment.assert_not_called()
+        payment.refresh_from_db()
+        self.assertEqual(payment.status, Payment.STATUS_REFUNDED)
+
+
+class OrderExportTests(TestCase):
+    """
+    Exports stream from a sync generator under WSGI and an async iterator under ASGI.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = User.objects.create_user("weaver", password="pw", user_type=User.SELLER)
+        cls.buyer = User.objects.create_user("asha", password="pw", user_type=User.BUYER)
+        product = Product.objects.create(seller=cls.seller, title="Cotton rug", description="Handloom.", price=900)
+        # run the aggregation the item writes queue, so it doesn't ride along with a later test's commit
+        with cls.captureOnCommitCallbacks(execute=True):
+            for qty in (1, 2, 3):
+                order = Order.objects.create(buyer=cls.buyer, total_amount_inr=900 * qty, status=Order.STATUS_PAID)
+                OrderItem.objects.create(order=order, product=product, unit_price_inr=900, quantity=qty)
+
+    def _assert_rows(self, lines):
+        self.assertEqual([row["quantity"] for row in map(json.loads, lines)], [1, 2, 3])
+
+    def test_wsgi_streams_sync_lines(self):
+        self.client.force_login(self.seller)
+        response = self.client.get(reverse("seller_order_export"), {"format": "jsonl"})
+        self.assertFalse(response.is_async)
+        self._assert_rows(b"".join(response.streaming_content).splitlines())
+
+    async def test_asgi_streams_async_chunks(self):
+        await self.async_client.aforce_login(self.buyer)
+        with mock.patch("orders.exports.EXPORT_CHUNK_SIZE", 2):
+            response = await self.async_client.get(reverse("buyer_order_export"), {"format": "jsonl"})
+            # consumed without StreamingHttpResponse falling back to list()
+            self.assertTrue(response.is_async)
+            chunks = [chunk async for chunk in response.streaming_content]
+        self.assertEqual([len(chunk.splitlines()) for chunk in chunks], [2, 1])
+        self._assert_rows(b"".join(chunks).splitlines())
+
+
+class ReapPendingOrdersTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = User.objects.create_user("weaver", password="pw", user_type=User.SELLER)
+        cls.buyer = User.objects.create_user("asha", password="pw", user_type=User.BUYER)
+        cls.product = Product.objects.create(seller=cls.seller, title="Cotton rug", description="Handloom.", price=900, stock=10)
+
+    def _order(self, age, status=Order.STATUS_PENDING, items=1, **fields):
+        order = Order.objects.create(buyer=self.buyer, status=status, **fields)
+        for _ in range(items):
+            OrderItem.objects.create(order=order, product=self.product, unit_price_inr=900)
+        Order.objects.filter(pk=order.pk).update(created_at=timezone.now() - age)
+        return order
+
+    def test_reaps_abandoned_checkouts_only(self):
+        day = timedelta(days=1)
+        abandoned = self._order(2 * day, items=2)
+        SellerOrderSummary.objects.create(seller=self.seller, order=abandoned, order_created_at=abandoned.created_at)
+        OrderStatusLog.objects.create(order=abandoned, item=abandoned.items.first(), old_status="processing", new_status="cancelled")
+        reserve_stock({self.product.pk: 1})
+        held = self._order(2 * day, reserved_until=timezone.now() - timedelta(minutes=5))
+        paying = self._order(2 * day)
+        Payment.objects.create(order=paying, razorpay_payment_id="pay_1", amount_inr=900)
+        recent = self._order(timedelta(minutes=5))
+        paid = self._order(2 * day, status=Order.STATUS_PAID)
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            totals = reap_pending_orders(max_age=day.total_seconds(), batch_size=1)
+
+        self.assertEqual(totals, {
+            "orders.Order": 2, "orders.OrderItem": 3, "orders.OrderStatusLog": 1, "orders.SellerOrderSummary": 1,
+        })
+        self.assertEqual(set(Order.objects.values_list("pk", flat=True)), {paying.pk, recent.pk, paid.pk})
+        self.assertFalse(OrderItem.objects.filter(order__in=[abandoned, held]).exists())
+        # the expired hold went back to stock before the order was deleted
+        self.product.refresh_from_db(fields=["stock"])
+        self.assertEqual(self.product.stock, 10)
+        # no aggregation queued for the deleted orders
+        self.assertNotIn(flush_dirty_orders, callbacks)
+
+    def test_only_reaped_orders_skip_aggregation(self):
+        reaped, kept = self._order(timedelta(days=2)), self._order(timedelta(days=2), status=Order.STATUS_PAID)
+        with self.captureOnCommitCallbacks() as callbacks, orders_being_deleted([reaped.pk]):
+            reaped.items.first().delete()
+            self.assertEqual(callbacks, [])
+            kept.items.first().delete()
+        self.assertIn(flush_dirty_orders, callbacks)
+
+    def test_failed_payment_does_not_keep_order(self):
+        day = timedelta(days=1)
+        declined = self._order(2 * day)
+        Payment.objects.create(order=declined, razorpay_payment_id="pay_1", amount_inr=900, status=Payment.STATUS_FAILED)
+        # a failed attempt and then a payment that is still being reconciled
+        retried = self._order(2 * day)
+        Payment.objects.create(order=retried, razorpay_payment_id="pay_2", amount_inr=900, status=Payment.STATUS_FAILED)
+        Payment.objects.create(order=retried, razorpay_payment_id="pay_3", amount_inr=900)
+
+        totals = reap_pending_orders(max_age=day.total_seconds())
+
+        self.assertEqual(totals, {"orders.Order": 1, "orders.OrderItem": 1, "orders.Payment": 1})
+        self.assertEqual(list(Order.objects.values_list("pk", flat=True)), [retried.pk])
+
+
+class SellerOrderDetailTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = User.objects.create_user("weaver", password="pw", user_type=User.SELLER)
+        cls.other = User.objects.create_user("potter", password="pw", user_type=User.SELLER)
+        buyer = User.objects.create_user("asha", password="pw", user_type=User.BUYER)
+        rug = Product.objects.create(seller=cls.seller, title="Cotton rug", description="Handloom.", price=900)
+        pot = Product.objects.create(seller=cls.other, title="Clay pot", description="Wheel-thrown.", price=400)
+        with cls.captureOnCommitCallbacks(execute=True):
+            cls.order = Order.objects.create(buyer=buyer, total_amount_inr=2200, status=Order.STATUS_PAID)
+            OrderItem.objects.create(order=cls.order, product=rug, unit_price_inr=900, quantity=2)
+            OrderItem.objects.create(
+                order=cls.order, product=pot, unit_price_inr=400, quantity=1, status=OrderItem.STATUS_SHIPPED
+            )
+            cls.pot_only = Order.objects.create(buyer=buyer, total_amount_inr=400, status=Order.STATUS_PAID)
+            OrderItem.objects.create(order=cls.pot_only, product=pot, unit_price_inr=400, quantity=1)
+
+    def setUp(self):
+        self.client.force_login(self.seller)
+
+    def test_detail_without_summary_falls_back_to_items(self):
+        # an order placed before rebuild_seller_summaries was run
+        SellerOrderSummary.objects.all().delete()
+        response = self.client.get(reverse("seller_order_detail", args=[self.order.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item.quantity for item in response.context["seller_items"]], [2])
+        self.assertEqual(response.context["seller_revenue"], 1800)
+        self.assertEqual(response.context["seller_status"], Order.STATUS_PROCESSING)
+
+    def test_detail_reads_the_summary(self):
+        response = self.client.get(reverse("seller_order_detail", args=[self.order.pk]))
+        self.assertEqual(response.context["seller_revenue"], 1800)
+        self.assertEqual(response.context["seller_status"], Order.STATUS_PROCESSING)
+
+    def test_other_sellers_order_is_not_found(self):
+        response = self.client.get(reverse("seller_order_detail", args=[self.pot_only.pk]))
+        self.assertEqual(response.status_code, 404)
+
+
+class OrdersQueryBudgetTests(QueryBudgetTestCase):
+    routes = route_names("orders.urls")
+
+    def cases(self):
+        data = self.data
+        order = data["order"]
+        item = order.items.filter(product__seller=data["seller"]).first()
+        return [
+            # a product already in the cart, then a new line
+            ("add_to_cart", [data["product"].pk], "post", None, {"qty": 2}),
+            ("add_to_cart", [data["product"].pk], "post", "buyer", {"qty": 2}),
+            ("add_to_cart", [data["spare_product"].pk], "post", None, {"qty": 1}),
+            ("add_to_cart", [data["spare_product"].pk], "post", "buyer", {"qty": 1}),
+            ("cart_count", [], "get", None, None),
+            ("cart_count", [], "get", "buyer", None),
+            ("cart", [], "get", None, None),
+            ("cart", [], "get", "buyer", None),
+            ("cart", [], "post", None, {"action": "set", "product_id": data["product"].pk, "qty": 3}),
+            ("cart", [], "post", "buyer", {"action": "set", "product_id": data["product"].pk, "qty": 3}),
+            ("checkout", [], "get", "buyer", None),
+            ("verify_payment", [], "post", "buyer", "{}"),
+            ("razorpay_webhook", [], "post", None, "{}"),
+            ("buyer_order_list", [], "get", "buyer", None),
+            ("buyer_order_detail", [order.pk], "get", "buyer", None),
+            ("seller_order_list", [], "get", "seller", None),
+            ("seller_order_detail", [order.pk], "get", "seller", None),
+            ("seller_order_export", [], "get", "seller", None),
+            ("buyer_order_export", [], "get", "buyer", None),
+            ("seller_order_update_status", [order.pk], "post", "seller", {"status": "processing"}),
+            ("seller_orderitem_update_status", [item.pk], "post", "seller", {"status": "shipped"}),
+        ]
+
+    def test_routes_within_query_budget(self):
+        self.assertRoutesWithinBudget()
+
+    def test_payment_flow_within_query_budget(self):
+        gateway = FakeGateway()
+        for target in ("orders.views.get_gateway", "orders.payments.get_gateway"):
+            patcher = mock.patch(target, return_value=gateway)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(payments, "RAZORPAY_WEBHOOK_SECRET", "whsec")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        checkout = self.assertWithinBudget("checkout", method="post", who="buyer", post_data={}).json()
+        payment_id, signature = gateway.simulate_payment(checkout["razorpay_order_id"])
+        verify = self.assertWithinBudget("verify_payment", method="post", who="buyer", post_data=json.dumps({
+            "razorpay_payment_id": payment_id, "razorpay_order_id": checkout["razorpay_order_id"],
+            "razorpay_signature": signature, "order_id": checkout["order_id"],
+        }))
+        self.assertEqual(verify.json()["status"], "ok")
+
+        # second order paid through the webhook instead of the checkout callback
+        self.clients["buyer"].post(reverse("add_to_cart", args=[self.data["product"].pk]), {"qty": 1})
+        checkout = self.assertWithinBudget("checkout", method="post", who="buyer", post_data={}).json()
+        payment_id, _ = gateway.simulate_payment(checkout["razorpay_order_id"])
+        body = json.dumps({"event": "payment.captured", "payload": {"payment": {"entity": {
+            "id": payment_id, "order_id": checkout["razorpay_order_id"], "amount": checkout["amount"],
+        }}}})
+        webhook = self.assertWithinBudget(
+            "razorpay_webhook", method="post", post_data=body,
+            headers={"X-Razorpay-Signature": payments.webhook_signature(body.encode())},
+        )
+        self.assertEqual(webhook.json()["status"], "stored")
+        self.assertEqual(Order.objects.get(pk=checkout["order_id"]).status, Order.STATUS_PAID)
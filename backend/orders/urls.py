@@ -2,7 +2,7 @@ from django.urls import path
 from .views import (
     AddToCartView, CartView, CheckoutView, PaymentVerifyView, CartCountView, 
     BuyerOrderListView, BuyerOrderDeatilView, SellerOrderListView, SellerOrderDeatilView, SellerOrderStatusUpdateView,
-    SellerOrderItemStatusUpdateView
+    SellerOrderItemStatusUpdateView, RazorpayWebhookView, SellerOrderExportView, BuyerOrderExportView
 )
 
 urlpatterns = [
@@ -11,14 +11,17 @@ urlpatterns = [
     path("", CartView.as_view(), name="cart"),
     path("checkout/", CheckoutView.as_view(), name="checkout"),
     path("verify-payment/", PaymentVerifyView.as_view(), name="verify_payment"),
+    path("webhooks/razorpay/", RazorpayWebhookView.as_view(), name="razorpay_webhook"),
     
     # buyer
     path("my/", BuyerOrderListView.as_view(), name="buyer_order_list"),
     path("view/<int:pk>/", BuyerOrderDeatilView.as_view(), name="buyer_order_detail"),
+    path("my/export/", BuyerOrderExportView.as_view(), name="buyer_order_export"),
 
     # seller
     path("seller/", SellerOrderListView.as_view(), name="seller_order_list"),
     path("seller/view/<int:pk>/", SellerOrderDeatilView.as_view(), name="seller_order_detail"),
+    path("seller/export/", SellerOrderExportView.as_view(), name="seller_order_export"),
     path("selelr/<int:pk>/update-status", SellerOrderStatusUpdateView.as_view(), name="seller_order_update_status"),
     path("seller/item/<int:item_pk>/update-status/", SellerOrderItemStatusUpdateView.as_view(), name="seller_orderitem_update_status"),
 ]
@@ -1,32 +1,57 @@
-import os, hmac, hashlib, json, razorpay, traceback
+import os, json, logging, traceback
+from datetime import timedelta
 
 from django.shortcuts import render, redirect, get_object_or_404
 from django.views import View
 from django.conf import settings
 from django.contrib import messages
-from django.http import JsonResponse, HttpResponseBadRequest, HttpResponseForbidden, Http404
+from django.http import JsonResponse, HttpResponseBadRequest, HttpResponseForbidden, Http404, StreamingHttpResponse
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.core.handlers.asgi import ASGIRequest
+from django.utils.decorators import method_decorator
+from django.views.decorators.csrf import csrf_exempt
 
 from django.views.generic import ListView, DetailView
 from django.urls import reverse
-from django.db.models import Prefetch, Q
-
-from .cart import add_to_cart, get_cart, cart_items_and_total, set_quantity, remove_from_cart, clear_cart, cart_total_quantity
-from .models import Order, OrderItem, Payment, OrderStatusLog
+from django.db import router, transaction
+from django.db.models import Exists, OuterRef, Prefetch, Q
+from django.utils.dateparse import parse_date
+
+from .cart import aadd_to_cart, acart_total_quantity, get_cart, resolve_cart, set_quantities, remove_from_cart, clear_cart
+from .cart_store import CartBusy
+from .models import Order, OrderItem, OrderStatusLog, SellerOrderSummary
+from .gateway import get_gateway, GatewayError
+from .reservations import OutOfStock, STOCK_RESERVATION_TTL, release_reservation, reservation_deadline, reserve_stock
+from .exports import EXPORT_FORMATS, aiter_export, export_buyer_orders, export_range, export_seller_orders
+from .payments import (
+    cancel_oversold_order, checkout_signature_ok, ingest_webhook, mark_order_paid, record_payment, webhook_signature_ok,
+)
+from .tasks import release_stock_reservation
+from market.pagination import CursorPaginationMixin
+
+logger = logging.getLogger(__name__)
 
 # Razorpay config
 RAZORPAY_KEY_ID = os.getenv("RAZORPAY_KEY_ID") or settings.RAZORPAY_KEY_ID
 RAZORPAY_KEY_SECRET = os.getenv("RAZORPAY_KEY_SECRET") or settings.RAZORPAY_KEY_SECRET
-client = razorpay.Client(auth=(RAZORPAY_KEY_ID, RAZORPAY_KEY_SECRET))
 
 # Create your views here.
+# Async views: the cart badge and add-to-cart run on every page, and under ASGI
+# (crafty_backend/asgi.py) they no longer tie up a worker thread for a session read.
 class AddToCartView(View):
-    def post(self, request, product_id):
+    query_budget = 5
+    async def post(self, request, product_id):
         qty = int(request.POST.get("qty", 1))
-        add_to_cart(request.session, product_id, qty)
-        total_qty = cart_total_quantity(request.session)
-
         is_ajax = request.headers.get("x-requested-with") == "XMLHttpRequest"
+        try:
+            await aadd_to_cart(request.session, product_id, qty)
+        except CartBusy:
+            if is_ajax:
+                return JsonResponse({"success": False, "error": "Cart is busy, please try again."}, status=409)
+            messages.error(request, "Your cart is being updated, please try again.")
+            return redirect("cart")
+        total_qty = await acart_total_quantity(request.session)
+
         if is_ajax:
             return JsonResponse({"success": True, "count":total_qty})
         
@@ -34,45 +59,54 @@ class AddToCartView(View):
         return redirect("cart")
 
 class CartCountView(View):
-    def get(self, request):
-        total_qty = cart_total_quantity(request.session)
+    query_budget = 2
+    async def get(self, request):
+        total_qty = await acart_total_quantity(request.session)
         return JsonResponse({"count": total_qty})
 
+def _warn_dropped(request, dropped):
+    if dropped:
+        messages.warning(request, "Some items are no longer available and were removed from your cart.")
+
 class CartView(View):
+    query_budget = 5
     def get(self, request):
-        items, total = cart_items_and_total(request.session)
+        items, total, dropped = resolve_cart(request.session)
+        _warn_dropped(request, dropped)
         return render(request, "cart.html", {"items":items, "total":total})
     
     def post(self, request):
+        try:
+            self._apply(request)
+        except CartBusy:
+            messages.error(request, "Your cart is being updated, please try again.")
+        return redirect("cart")
+
+    def _apply(self, request):
         # update quantities or remove
         action = request.POST.get("action")
         pid = request.POST.get("product_id")
-        if action == "set":
-            qty = int(request.POST.get("qty", 1))
-            set_quantity(request.session, pid, qty)
-        elif action == "remove":
+        if action == "remove":
             remove_from_cart(request.session, pid)
-        
-        # updated = False
+
+        # the "set" action and every qty_<id> field go to the cart store as one batched write
+        changes = {}
+        if action == "set":
+            changes[pid] = int(request.POST.get("qty", 1))
         for k, v in request.POST.items():
             if k.startswith("qty_"):
                 try:
-                    product_id = k.split("_", 1)[1]
-                    qty = int(v)
-                    set_quantity(request.session, product_id, qty)
-                    # updated = True
-                except Exception as e:
-                    print("ERROR:", str())
-        
-        # if updated:
-        #     return redirect("cart")
-
-        return redirect("cart")
+                    changes[k.split("_", 1)[1]] = int(v)
+                except ValueError:
+                    continue
+        set_quantities(request.session, changes)
 
 class CheckoutView(LoginRequiredMixin, View):
+    query_budget = 25
     def get(self, request):
         # shwo checkout page with order summary
-        items, total = cart_items_and_total(request.session)
+        items, total, dropped = resolve_cart(request.session)
+        _warn_dropped(request, dropped)
         if not items:
             messages.error(request, "Your cart is empty.")
             return redirect("product_list")
@@ -82,20 +116,34 @@ class CheckoutView(LoginRequiredMixin, View):
     def post(self, request):
         try:
             # create an Order and a Razorpay order
-            items, total = cart_items_and_total(request.session)
+            items, total, dropped = resolve_cart(request.session)
             if not items:
                 return JsonResponse({"error": "Cart is empty"}, status=400)
+            if dropped:
+                # prices shown on the checkout page no longer match the cart
+                return JsonResponse({"error": "Some items are no longer available", "dropped": dropped}, status=409)
             
-            # create order instance
-            order = Order.objects.create(buyer=request.user, total_amount_inr=total, status=Order.STATUS_PENDING)
-            for item in items:
-                OrderItem.objects.create(order=order, product=item["product"], unit_price_inr=item["unit_price_inr"], quantity=item["quantity"])
-
-            # create razorpay order
-            razor_amount = int(float(total)*100)
-            razor_order = client.order.create(dict(amount=razor_amount, currency="INR", receipt=f"order_{order.pk}", payment_capture=1))
+            # reserve stock + create order + items in one transaction; bulk_create skips the per-item post_save work
+            with transaction.atomic():
+                # conditional stock decrements, no row locks held across buyers (orders.reservations)
+                reserve_stock({item["product"].pk: item["quantity"] for item in items})
+                order = Order.objects.create(buyer=request.user, total_amount_inr=total, status=Order.STATUS_PENDING,
+                                             reserved_until=reservation_deadline())
+                OrderItem.objects.bulk_create([
+                    OrderItem(order=order, product=item["product"], unit_price_inr=item["unit_price_inr"], quantity=item["quantity"])
+                    for item in items
+                ])
+                SellerOrderSummary.rebuild_for_order(order)
+                transaction.on_commit(
+                    lambda: release_stock_reservation.apply_async(args=[order.pk], countdown=STOCK_RESERVATION_TTL),
+                    robust=True,
+                )
+
+            # create razorpay order (outside the transaction: no DB locks held during the network call)
+            razor_amount = int(total * 100)
+            razor_order = get_gateway().create_order(razor_amount, receipt=f"order_{order.pk}")
             order.razorpay_order_id = razor_order.get("id")
-            order.save()
+            order.save(update_fields=["razorpay_order_id", "updated_at"])
 
             data = {
                 "razorpay_order_id": order.razorpay_order_id,
@@ -107,18 +155,25 @@ class CheckoutView(LoginRequiredMixin, View):
 
             return JsonResponse(data)
 
+        except OutOfStock as e:
+            # nothing was reserved or created: the whole transaction rolled back
+            return JsonResponse({"error": "Not enough stock", "product_id": e.product_id}, status=409)
+
         except Exception as e:
             traceback.print_exc()
 
             try:
                 if 'order' in locals() and isinstance(order, Order) and order.status==Order.STATUS_PENDING:
+                    release_reservation(order.pk, expired_only=False)
                     order.delete()
             except Exception:
                 pass
 
-            return JsonResponse({"error": "Could not create order", "details":str(e)}, status=500)
+            status = 502 if isinstance(e, GatewayError) else 500
+            return JsonResponse({"error": "Could not create order", "details":str(e)}, status=status)
     
 class PaymentVerifyView(LoginRequiredMixin, View):
+    query_budget = 22
     def post(self, request):
 
         payload = json.loads(request.body.decode("utf-8"))
@@ -131,63 +186,81 @@ class PaymentVerifyView(LoginRequiredMixin, View):
             return HttpResponseForbidden("Signature verification failed.")
         
         # verify signature
-        generated_signature = hmac.new(RAZORPAY_KEY_SECRET.encode(), (razorpay_order_id + "|" + razorpay_payment_id).encode(), hashlib.sha256).hexdigest()
-
-        if not hmac.compare_digest(generated_signature, razorpay_signature):
+        if not checkout_signature_ok(razorpay_order_id, razorpay_payment_id, razorpay_signature):
             return HttpResponseForbidden("Signature verification failed.")
         
-        # get order and verify the amount
         order = get_object_or_404(Order, pk=order_id, razorpay_order_id=razorpay_order_id)
-        try:
-            payment_data  = client.payment.fetch(razorpay_payment_id)
-            paid_amount = int(payment_data.get("amount", 0))/100
 
-        except Exception:
-            paid_amount = None
-        
-        if paid_amount is not None and paid_amount != order.total_amount_inr:
-            return HttpResponseForbidden("Amount Mismatch") # amounts mismatch - suspicious
-        
-        Payment.objects.create(order=order, razorpay_payment_id=razorpay_payment_id, razorpay_signature=razorpay_signature, amount_inr=paid_amount or order.total_amount_inr)
-        order.status = Order.STATUS_PAID
-        order.save()
+        # stored once per payment id; the gateway fetch / amount check runs in the background (reconcile_payment)
+        payment, _ = record_payment(order, razorpay_payment_id, order.total_amount_inr, signature=razorpay_signature)
+        try:
+            # reserved stock becomes a sale (re-reserved if the hold already expired); no-op if already paid
+            mark_order_paid(order)
+        except OutOfStock as e:
+            # the money is taken but the goods are gone: cancel and refund (orders.payments)
+            if cancel_oversold_order(order, payment):
+                logger.warning("Order %s paid after its reservation expired and product %s sold out; cancelled, refunding payment %s", order.pk, e.product_id, razorpay_payment_id)
+            return JsonResponse({
+                "error": "Some items sold out before payment completed. The order was cancelled and your payment will be refunded.",
+                "product_id": e.product_id,
+            }, status=409)
 
         clear_cart(request.session) # clear session cart
         
         return JsonResponse({"status":"ok", "order_id":order.pk})
-    
+
+
+@method_decorator(csrf_exempt, name="dispatch")
+class RazorpayWebhookView(View):
+    """
+    Razorpay webhook receiver: checks ``X-Razorpay-Signature`` over the raw body, stores
+    the payment idempotently and acknowledges at once. Redeliveries are harmless.
+    """
+    query_budget = 19
+    def post(self, request):
+        if not webhook_signature_ok(request.body, request.headers.get("X-Razorpay-Signature")):
+            return HttpResponseBadRequest("Invalid signature.")
+        try:
+            event = json.loads(request.body.decode("utf-8"))
+        except ValueError:
+            return HttpResponseBadRequest("Invalid JSON.")
+        return JsonResponse({"status": ingest_webhook(event)})
 
 
 # Buyer Views
-class BuyerOrderListView(LoginRequiredMixin, ListView):
+class BuyerOrderListView(LoginRequiredMixin, CursorPaginationMixin, ListView):
     model = Order
     template_name = "orders/buyer_order_list.html"
     context_object_name = "orders"
     paginate_by = 12
+    query_budget = 6
 
     def get_queryset(self):
         # only the orders belongs to the logged-in buyer
-        qs = Order.objects.filter(buyer=self.request.user).exclude(status="pending").order_by("-created_at").prefetch_related("items__product")
+        qs = Order.objects.filter(buyer=self.request.user).exclude(status="pending").order_by("-created_at", "-id").prefetch_related("items__product")
         return qs
 
 class BuyerOrderDeatilView(LoginRequiredMixin, DetailView):
     model = Order
     template_name = "orders/buyer_order_detail.html"
     context_object_name = "order"
+    query_budget = 8
 
     def get_queryset(self):
         # Only order that belongs to the logged-in buyer
         qs = Order.objects.all()
         if not self.request.user.is_staff:
             qs = qs.filter(buyer=self.request.user)
-        return qs.prefetch_related("items__product", "payments")
+        return qs.prefetch_related("items__product__seller", "items__product__images", "payments")
 
 # Seller Views
-class SellerOrderListView(LoginRequiredMixin, ListView):
+class SellerOrderListView(LoginRequiredMixin, CursorPaginationMixin, ListView):
     model = Order
     template_name = "orders/seller_order_list.html"
     context_object_name = "orders"
     paginate_by = 12
+    cursor_ordering = ("-order_created_at", "-id")
+    query_budget = 4
 
     def dispatch(self, request, *args, **kwargs):
         # ensure the user is seller
@@ -196,21 +269,24 @@ class SellerOrderListView(LoginRequiredMixin, ListView):
         return super().dispatch(request, *args, **kwargs)
     
     def get_queryset(self):
-        # Orders that contain items for products owned by this seller
-        seller_items = OrderItem.objects.filter(product__seller=self.request.user).values_list("order_id", flat=True)
-        qs = Order.objects.filter(pk__in=seller_items).exclude(status="pending").order_by("-created_at").prefetch_related(
-            Prefetch("items", queryset=OrderItem.objects.select_related("product"))
+        # One indexed query over the per-seller read model (seller, -order_created_at, -id)
+        return (
+            SellerOrderSummary.objects.filter(seller=self.request.user)
+            .exclude(order_status=Order.STATUS_PENDING)
+            .select_related("order")
+            .order_by("-order_created_at", "-id")
         )
-        return qs
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        seller = self.request.user
-        orders = context.get("orders") or context.get("object_list") or []
-        for order in orders:
-            order.seller_revenue = order.get_seller_total(seller)
-            order.seller_status = order.get_seller_status(seller)
-            order.seller_status_display = order.get_seller_status_display(seller)
+        orders = []
+        for summary in context.get("object_list") or []:
+            order = summary.order
+            order.seller_revenue = summary.revenue_inr
+            order.seller_status = summary.status
+            order.seller_status_display = summary.get_status_display()
+            orders.append(order)
+        context["orders"] = orders
         return context
         
 
@@ -218,6 +294,7 @@ class SellerOrderDeatilView(LoginRequiredMixin, DetailView):
     model = Order
     template_name = "orders/seller_order_detail.html"
     context_object_name = "order"
+    query_budget = 8
 
     def dispatch(self, request, *args, **kwargs):
         if getattr(request.user, "user_type", None)!="seller" and not request.user.is_staff:
@@ -225,28 +302,31 @@ class SellerOrderDeatilView(LoginRequiredMixin, DetailView):
         return super().dispatch(request, *args, **kwargs)
     
     def get_queryset(self):
-        seller_order_ids = OrderItem.objects.filter(product__seller=self.request.user).values_list("order_id", flat=True)
-        qs = Order.objects.filter(pk__in=seller_order_ids)
+        # the items decide access: orders placed before their summaries were built have none yet
+        seller_items = OrderItem.objects.filter(order=OuterRef("pk"), product__seller=self.request.user)
+        qs = Order.objects.filter(Exists(seller_items))
         qs = qs.prefetch_related(Prefetch("items", queryset=OrderItem.objects.select_related("product")))
         return qs
     
     def get_context_data(self, **kwargs):
         ctx = super().get_context_data(**kwargs)
-        seller_items = self.object.items.filter(product__seller=self.request.user).select_related("product")
-        ctx["seller_items"] = seller_items
         seller = self.request.user
         order = ctx["order"]
-        seller_revenue = sum(
-            item.unit_price_inr * item.quantity
-            for item in order.items.all()
-            if item.product and item.product.seller == seller
-        )
-        ctx["seller_revenue"] = seller_revenue
-        ctx["seller_status"] = order.get_seller_status(seller)
-        ctx["seller_status_display"] = order.get_seller_status_display(seller)
+        ctx["seller_items"] = [item for item in order.items.all() if item.product and item.product.seller_id == seller.pk]
+        summary = SellerOrderSummary.objects.filter(seller=seller, order=order).first()
+        if summary is None:
+            # not backfilled yet (rebuild_seller_summaries): work it out from the prefetched items
+            summary = SellerOrderSummary(
+                revenue_inr=sum(item.unit_price_inr * item.quantity for item in ctx["seller_items"]),
+                status=order._agg_status({item.status for item in ctx["seller_items"]}),
+            )
+        ctx["seller_revenue"] = summary.revenue_inr
+        ctx["seller_status"] = summary.status
+        ctx["seller_status_display"] = summary.get_status_display()
         return ctx
 
 class SellerOrderStatusUpdateView(LoginRequiredMixin, View):
+    query_budget = 16
     # Seller can change the status of the product.
 
     def post(self, request, pk):
@@ -273,6 +353,7 @@ class SellerOrderStatusUpdateView(LoginRequiredMixin, View):
         return redirect(reverse("seller_order_list"))
     
 class SellerOrderItemStatusUpdateView(LoginRequiredMixin, View):
+    query_budget = 25
     def post(self, request, item_pk):
         if getattr(request.user, "user_type", None) != "seller" and not request.user.is_staff:
             return HttpResponseForbidden("Not Allowed.")
@@ -285,13 +366,15 @@ class SellerOrderItemStatusUpdateView(LoginRequiredMixin, View):
         if new_status not in allowed:
             return HttpResponseBadRequest("Invalid stauts.")
         old = item.status
-        item.status = new_status
-        item.save()
-        
-        # log 
-        OrderStatusLog.objects.create(order=item.order, item=item, changed_by=request.user, old_status=old, new_status=new_status)
-        # aggragate order status
-        item.order.recalc_status_from_items()
+        with transaction.atomic():
+            item.status = new_status
+            item.save(update_fields=["status"])
+            # log 
+            OrderStatusLog.objects.create(order=item.order, item=item, changed_by=request.user, old_status=old, new_status=new_status)
+        # order status + seller summary were aggregated once, on commit
+        item.order.refresh_from_db(fields=["status"])
+
+        summary = SellerOrderSummary.objects.filter(seller=request.user, order=item.order).first()
 
         # return JSON 
         xrw = request.headers.get("X-Requested-With") or request.headers.get("x-requested-with")
@@ -299,11 +382,49 @@ class SellerOrderItemStatusUpdateView(LoginRequiredMixin, View):
                     "ok": True,
                     "item_status": item.status,
                     "item_status_display": dict(OrderItem.STATUS_CHOICES).get(item.status, item.status),
-                    "seller_status": item.order.get_seller_status(request.user),
-                    "seller_status_display": item.order.get_seller_status_display(request.user),
+                    "seller_status": summary.status if summary else item.order.status,
+                    "seller_status_display": summary.get_status_display() if summary else item.order.get_status_display(),
                     "order_status": item.order.status,
                     "order_status_display": item.order.get_status_display(),
                 }
         if xrw and xrw.lower() == "xmlhttprequest":
             return JsonResponse(payload)
-        return redirect(reverse("seller_order_detail", args=[item.order.pk]))
\ No newline at end of file
+        return redirect(reverse("seller_order_detail", args=[item.order.pk]))
+
+
+# Exports: CSV / JSONL of order items, streamed (orders.exports)
+def _export_response(request, export):
+    fmt = request.GET.get("format", "csv")
+    if fmt not in EXPORT_FORMATS:
+        return HttpResponseBadRequest("format must be csv or jsonl")
+    try:
+        since, until = (parse_date(request.GET.get(k) or "") for k in ("since", "until"))
+    except ValueError:
+        return HttpResponseBadRequest("since/until must be YYYY-MM-DD dates")
+    start, end = export_range(since, until)
+    # pick the database now: the body is generated after the routing middleware has returned
+    rows = export(request.user, start, end, fmt, using=router.db_for_read(OrderItem))
+    if isinstance(request, ASGIRequest):
+        rows = aiter_export(rows)
+    response = StreamingHttpResponse(rows, content_type=f"{EXPORT_FORMATS[fmt]}; charset=utf-8")
+    filename = f"crafty-orders-{start:%Y-%m-%d}-to-{end - timedelta(days=1):%Y-%m-%d}.{fmt}"
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
+
+
+class SellerOrderExportView(LoginRequiredMixin, View):
+    read_replica = True
+    query_budget = 2
+
+    def get(self, request):
+        if getattr(request.user, "user_type", None) != "seller":
+            return HttpResponseForbidden("Only sellers can export seller orders.")
+        return _export_response(request, export_seller_orders)
+
+
+class BuyerOrderExportView(LoginRequiredMixin, View):
+    read_replica = True
+    query_budget = 2
+
+    def get(self, request):
+        return _export_response(request, export_buyer_orders)
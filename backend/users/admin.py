@@ -1,10 +1,15 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
+
+from crafty_backend.large_admin import LargeTableAdminMixin
+
 from .models import User
 
 @admin.register(User)
-class CustomUserAdmin(UserAdmin):
+class CustomUserAdmin(LargeTableAdminMixin, UserAdmin):
     fieldsets = UserAdmin.fieldsets + (
         (None, {"fields": ("user_type",)}),
     )
     list_display = ("username", "email", "first_name", "last_name", "user_type", "is_staff")
+    # also used by the buyer/seller autocompletes; "=" is iexact, served by the UPPER() indexes
+    search_fields = ("=username", "=email", "username__startswith")
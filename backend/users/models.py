@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models.functions import Upper
 from django.contrib.auth.models import AbstractUser
 
 # Create your models here.
@@ -12,6 +13,13 @@ class User(AbstractUser):
 
     user_type = models.CharField(max_length=10, choices=USER_TYPE_CHOICES, default=BUYER)
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # UserProfileForm uniqueness checks use __iexact (UPPER(...) on Postgres)
+            models.Index(Upper("email"), name="user_email_upper_idx"),
+            models.Index(Upper("username"), name="user_username_upper_idx"),
+        ]
+
     @property
     def initials(self):
         first = (self.first_name or "").strip()
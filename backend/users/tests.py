@@ -1,3 +1,28 @@
-from django.test import TestCase
+from crafty_backend.testing import QueryBudgetTestCase, route_names
+from market.seeding import SEED_PASSWORD
 
-# Create your tests here.
+
+class UsersQueryBudgetTests(QueryBudgetTestCase):
+    routes = route_names("users.urls")
+
+    def cases(self):
+        buyer = self.data["buyer"]
+        return [
+            ("signup", [], "get", None, None),
+            ("login", [], "get", None, None),
+            # both log the anonymous client in
+            ("signup", [], "post", None, {
+                "username": "budget-check", "first_name": "Budget", "email": "budget-check@example.com",
+                "user_type": "buyer", "password1": "Kq7-vase-Lm29!", "password2": "Kq7-vase-Lm29!",
+            }),
+            ("login", [], "post", None, {"username": buyer.username, "password": SEED_PASSWORD}),
+            ("logout", [], "post", "buyer", {}),
+            ("profile", [], "get", "buyer", None),
+            ("edit_profile", [], "get", "buyer", None),
+            ("edit_profile", [], "post", "buyer", {
+                "username": buyer.username, "first_name": "Asha", "last_name": "", "email": buyer.email,
+            }),
+        ]
+
+    def test_routes_within_query_budget(self):
+        self.assertRoutesWithinBudget()
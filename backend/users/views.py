@@ -13,6 +13,7 @@ from django.urls import reverse
 # Create your views here.
 class SignUpView(View):
     template_name = "auth/signup.html"
+    query_budget = 21
 
     def get(self, request):
         form = SignUpForm()
@@ -33,6 +34,7 @@ class SignUpView(View):
     
 class LoginView(View):
     template_name = "auth/login.html"
+    query_budget = 9
 
     def get(self, request):
         form = LoginForm()
@@ -47,18 +49,21 @@ class LoginView(View):
         return render(request, self.template_name, {"form":form})
 
 class LogoutView(View):
+    query_budget = 4
     def post(self, request):
         logout(request)
         return redirect("/")
     
 class ProfileView(LoginRequiredMixin, View):
     template_name = "auth/profile.html"
+    query_budget = 2
 
     def get(self, request):
         return render(request, self.template_name)
     
 class UserProfileEditView(LoginRequiredMixin, View):
     template_name = "auth/edit_profile.html"
+    query_budget = 6
 
     def get(self, request):
         user = request.user